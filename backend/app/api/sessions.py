@@ -0,0 +1,266 @@
+# Session loading and per-session artifacts shared by the routers. Analysis modules
+# (pandas, numpy, scipy, pyarrow) are imported inside the functions to keep the app
+# import cheap: they load on first use, or earlier through the background warm-up.
+import io
+import os
+import tempfile
+import traceback
+from typing import Optional
+from fastapi import HTTPException
+from app.core.executors import run_io, run_cpu
+from app.core.metrics import span, record_bytes
+from app.core.gcs import get_bucket
+from app.core.session_cache import session_cache, CachedSession
+from app.core.catalog import catalog
+
+async def download_file_content(file_url: str, storage_path: Optional[str] = None) -> io.BytesIO:
+    with span("download"):
+        if storage_path:
+            try:
+                bucket = await run_io(get_bucket)
+                blob = bucket.blob(storage_path)
+                content = await run_io(blob.download_as_bytes)
+                record_bytes("download", len(content))
+                return io.BytesIO(content)
+            except Exception as e:
+                print(f"GCS Download failed for {storage_path}: {e}")
+                # Fallback to URL if GCS fails (though unlikely if path is correct)
+
+        # URL Fallback
+        # If the URL is our own backend download URL, we could potentially optimize, but requests.get works fine.
+        import requests
+        response = await run_io(requests.get, file_url)
+        if response.status_code != 200:
+            raise HTTPException(status_code=400, detail=f"Failed to download file from {file_url}")
+        record_bytes("download", len(response.content))
+        return io.BytesIO(response.content)
+
+async def load_session(file_url: str, storage_path: Optional[str] = None, channels=None):
+    """
+    Downloads and parses a session, going through the parsed-session cache.
+
+    Sessions stored in GCS are cached under (storage_path, generation), so repeated
+    requests on the same file skip both the download and the CSV parse. On a miss
+    the Parquet sidecar is read instead of the CSV when one exists.
+
+    Args:
+        file_url (str): Download URL, used when the session is not in GCS.
+        storage_path (str): GCS path of the session.
+        channels (tuple): Channels the calling analysis reads (telemetry.ANALYSIS_CHANNELS).
+            Only one-shot loads that are not cached keep just these; cached sessions hold
+            telemetry.SESSION_CHANNELS, shared by every analysis.
+
+    Returns:
+        CachedSession: Parsed session (df, metadata) and its derived artifacts.
+    """
+    from app.core.data_loader import load_csv
+    from app.core.telemetry import SESSION_CHANNELS
+    from app.core.session_store import sidecar_path
+
+    blob = None
+    cache_key = None
+    if storage_path:
+        try:
+            bucket = await run_io(get_bucket)
+            blob = await run_io(bucket.get_blob, storage_path)
+            if blob is not None:
+                cache_key = (storage_path, blob.generation or blob.etag)
+        except Exception as e:
+            print(f"GCS metadata lookup failed for {storage_path}: {e}")
+
+    if cache_key is not None:
+        cached = session_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    # The file goes to a temporary path handed to the parsing process: neither the
+    # download nor a buffer of it is pickled across, only the parsed frame comes back
+    fd, path = tempfile.mkstemp(prefix="session-")
+    os.close(fd)
+    try:
+        downloaded = False
+        if blob is not None:
+            # Prefer the Parquet sidecar written at upload time, if it matches this CSV generation
+            try:
+                sidecar = await run_io(bucket.get_blob, sidecar_path(storage_path))
+                if sidecar is not None and (sidecar.metadata or {}).get("source_generation") == str(blob.generation):
+                    await run_io(sidecar.download_to_filename, path)
+                    downloaded = True
+            except Exception as e:
+                print(f"Sidecar download failed for {storage_path}: {e}")
+
+        if not downloaded and blob is not None:
+            try:
+                await run_io(blob.download_to_filename, path, if_generation_match=blob.generation)
+                downloaded = True
+            except Exception as e:
+                print(f"GCS Download failed for {storage_path}: {e}")
+                cache_key = None
+        if downloaded:
+            record_bytes("download", os.path.getsize(path))
+        else:
+            file_obj = await download_file_content(file_url, storage_path if blob is None else None)
+            with open(path, "wb") as f:
+                f.write(file_obj.getbuffer())
+            del file_obj
+
+        try:
+            # Parsing is self-contained CPU work, done in the process pool; only the channels
+            # the analyses read are kept, as compact dtypes
+            wanted = SESSION_CHANNELS if cache_key is not None or channels is None else channels
+            df, metadata = await run_cpu(load_csv, path, wanted)
+            record_bytes("parse", os.path.getsize(path))
+        except Exception as e:
+            traceback.print_exc()
+            raise HTTPException(status_code=400, detail="Invalid CSV format")
+    finally:
+        os.remove(path)
+
+    if cache_key is not None:
+        return session_cache.put(cache_key, df, metadata)
+    return CachedSession(df, metadata, int(df.memory_usage(index=True).sum()))
+
+def get_lap_index(session):
+    """Lap index of a session, built once and reused by every binding/reference request."""
+    from app.core.lap_index import LapIndex
+    return session.get_derived("lap_index", lambda: LapIndex.from_metadata(session.df, session.metadata))
+
+def get_track_geometry(session):
+    """
+    Track geometry of a session (projection, smoothing, curvature, corners, distance).
+
+    Built once per cached session and persisted next to the blob in GCS, so that
+    other workers and restarts load it instead of recomputing.
+    """
+    from app.core.track_geometry import TrackGeometry, geometry_path
+    from app.core.binding_analyzer import build_track_geometry
+
+    def build():
+        storage_path, generation = session.key if session.key else (None, None)
+        bucket = None
+        if storage_path:
+            try:
+                bucket = get_bucket()
+                blob = bucket.get_blob(geometry_path(storage_path))
+                if blob is not None and (blob.metadata or {}).get("source_generation") == str(generation):
+                    return TrackGeometry.from_bytes(blob.download_as_bytes())
+            except Exception as e:
+                print(f"Geometry load failed for {storage_path}: {e}")
+
+        geometry = build_track_geometry(get_lap_index(session))
+
+        if bucket is not None:
+            try:
+                blob = bucket.blob(geometry_path(storage_path))
+                blob.metadata = {"source_generation": str(generation)}
+                blob.upload_from_string(geometry.to_bytes(), content_type="application/octet-stream")
+            except Exception as e:
+                print(f"Geometry upload failed for {storage_path}: {e}")
+        return geometry
+
+    return session.get_derived("geometry", build)
+
+def get_path_pyramid(session):
+    """
+    Level-of-detail path of a session (see track_path.PathPyramid), built once on its
+    baseline lap: the fastest lap the track geometry is built on.
+    """
+    from app.core.track_path import build_path_pyramid
+
+    def build():
+        rows = None
+        lap_index, geometry = get_timed_laps(session)
+        if geometry is not None and lap_index.lap_length(geometry.lap_number) > 0:
+            rows = lap_index.rows(geometry.lap_number)
+        return build_path_pyramid(session.df, rows)
+
+    return session.get_derived("path_pyramid", build)
+
+def get_lap_geometry(session):
+    """
+    Lap index and track geometry of a session; geometry is None without GPS channels,
+    and both are None for an export without a 'Time' channel (nothing to index laps on).
+    """
+    if 'Time' not in session.df.columns:
+        return None, None
+    lap_index = get_lap_index(session)
+    if 'GPS Latitude' not in session.df.columns or 'GPS Longitude' not in session.df.columns:
+        return lap_index, None
+    return lap_index, get_track_geometry(session)
+
+def get_timed_laps(session):
+    """
+    Lap index and geometry used to time and align laps; (lap_index, None) without GPS.
+
+    Sessions without beacons are split into laps by GPS start/finish line crossings,
+    with a geometry built on those laps.
+    """
+    from app.core.lap_index import LapIndex
+    from app.core.analyzer import gps_lap_boundaries
+    from app.core.binding_analyzer import build_track_geometry
+
+    lap_index, geometry = get_lap_geometry(session)
+    if geometry is not None and len(lap_index) < 2:
+        boundaries = session.get_derived("gps_boundaries", lambda: gps_lap_boundaries(session.df))
+        if boundaries and len(boundaries) > 2:
+            lap_index = session.get_derived("gps_lap_index", lambda: LapIndex(session.df, boundaries))
+            geometry = session.get_derived("gps_geometry", lambda: build_track_geometry(lap_index))
+    return lap_index, geometry
+
+def compute_session_sectors(session, n_sectors):
+    """Mini-sector table of a session (see sectors.sector_table), None without GPS."""
+    from app.core.sectors import sector_table
+    lap_index, geometry = get_timed_laps(session)
+    if geometry is None:
+        return None
+    return sector_table(lap_index, geometry, n_sectors)
+
+def get_lap_matrix(session, channels=None, step=None):
+    """
+    Distance-aligned lap matrix of a session (see lap_alignment.align_laps), None without GPS.
+
+    step defaults to lap_alignment.ALIGN_STEP_M.
+    """
+    from app.core.lap_alignment import align_laps, ALIGN_STEP_M
+    step = ALIGN_STEP_M if step is None else step
+
+    def build():
+        lap_index, geometry = get_timed_laps(session)
+        if geometry is None:
+            return None
+        return align_laps(lap_index, geometry, channels=channels, step=step)
+
+    if channels is None and step == ALIGN_STEP_M:
+        # Only the default matrix is kept with the session, custom ones are one-off
+        return session.get_derived("lap_matrix", build)
+    return build()
+
+def catalog_session(storage_path, session, **kwargs):
+    """
+    Stores a parsed session in the catalog: lap metrics, circuit features and the
+    per-corner feature table used by the cross-session corner history.
+    """
+    from app.core.analyzer import compute_lap_metrics, compute_circuit_characteristics
+    from app.core.binding_analyzer import corner_feature_table
+
+    lap_index, geometry = get_lap_geometry(session)
+    catalog.upsert_session(
+        storage_path,
+        session.metadata,
+        lap_metrics=compute_lap_metrics(session.df, session.metadata, lap_index, geometry),
+        characteristics=compute_circuit_characteristics(session.df, get_path_pyramid(session)),
+        corners=corner_feature_table(
+            session.df,
+            session.metadata,
+            lap_index=lap_index,
+            geometry=geometry
+        ) if geometry is not None else None,
+        **kwargs
+    )
+
+
+def get_session_tree(session):
+    """KDTree of the session samples in the baseline frame, built once per session."""
+    from app.core.binding_analyzer import build_session_tree
+    return session.get_derived("session_tree", lambda: build_session_tree(get_track_geometry(session)))
+
@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import functools
+from collections import OrderedDict
+from concurrent.futures import Future
+from app.core.metrics import span
+
+# Point the client at a local stub LLM server (tests, offline dev) instead of api.mistral.ai
+MISTRAL_SERVER_URL = os.getenv("MISTRAL_SERVER_URL")
+AI_CACHE_SIZE = int(os.getenv("AI_CACHE_SIZE", "256"))
+AI_CACHE_TTL = float(os.getenv("AI_CACHE_TTL", "3600"))
+
+PROMPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+@functools.lru_cache(maxsize=8)
+def get_client(api_key):
+    """Mistral client for an API key, built once and reused (keeps its HTTP connection pool)."""
+    # Imported on first use: the SDK alone takes about half a second to load
+    from mistralai import Mistral
+    return Mistral(api_key=api_key, server_url=MISTRAL_SERVER_URL)
+
+@functools.lru_cache(maxsize=None)
+def load_prompt(filename):
+    """
+    Reads a prompt markdown file of this package once per process.
+
+    Raises:
+        FileNotFoundError: If the prompt file does not exist.
+    """
+    with open(os.path.join(PROMPT_DIR, filename), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+class ResponseCache:
+    """
+    Content-addressed cache of AI responses with TTL and LRU eviction.
+
+    Identical concurrent requests are coalesced: the first caller performs the call and
+    the others wait for its result (single-flight). Failures are shared with the waiting
+    callers but never cached.
+    """
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(api_key, model, messages, language=None, **options):
+        """Key of a request; the API key and server are part of it, hashed, so accounts never share answers."""
+        client = hashlib.sha256(f"{MISTRAL_SERVER_URL or ''}:{api_key}".encode("utf-8")).hexdigest()
+        payload = json.dumps(
+            {"client": client, "model": model, "language": language, "messages": messages, "options": options},
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get_or_call(self, key, call):
+        """Returns the cached value for key, or the result of call() shared by concurrent callers."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                self.misses += 1
+                future = self._inflight[key] = Future()
+                leader = True
+
+        if not leader:
+            return future.result()
+
+        try:
+            value = call()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._inflight[key]
+            if self.max_entries > 0 and self.ttl > 0:
+                self._entries[key] = (time.monotonic() + self.ttl, value)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        future.set_result(value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced
+            }
+
+
+response_cache = ResponseCache(AI_CACHE_SIZE, AI_CACHE_TTL)
+
+def chat_complete(api_key, messages, model="mistral-large-latest", language=None, cache=True, **options):
+    """
+    Runs a chat completion through the response cache.
+
+    Args:
+        api_key (str): Mistral API Key.
+        messages (list): Chat messages [{"role": ..., "content": ...}, ...].
+        model (str): Model name.
+        language (str): Response language, part of the cache key.
+        cache (bool): False for answers that depend on state outside the messages
+            (budget chat): the call is always made, never cached nor coalesced.
+        **options: Extra chat.complete arguments (response_format, ...).
+
+    Returns:
+        str: Content of the first choice.
+
+    Raises:
+        Exception: Whatever the Mistral client raised; errors are not cached.
+    """
+    def call():
+        # Only real calls are timed: cache hits and coalesced callers never reach Mistral
+        with span("mistral"):
+            chat_response = get_client(api_key).chat.complete(model=model, messages=messages, **options)
+        return chat_response.choices[0].message.content
+
+    if not cache:
+        return call()
+    return response_cache.get_or_call(ResponseCache.make_key(api_key, model, messages, language, **options), call)
@@ -1,8 +1,9 @@
-import os
 import json
-import pandas as pd
 import io
-from mistralai import Mistral
+from app.core.data_loader import load_csv
+from app.core.telemetry import PROMPT_CHANNELS
+from app.core.telemetry_compressor import summarize_session
+from app.core.ai_client import chat_complete, load_prompt, PROMPT_DIR
 
 def analyze_comparison(features1, features2, label1, label2, api_key, language="en"):
     """
@@ -22,8 +23,6 @@ def analyze_comparison(features1, features2, label1, label2, api_key, language="
     if not api_key:
         return {"error": "API Key is missing."}
 
-    client = Mistral(api_key=api_key)
-
     # Prepare data for prompt
     data = {
         label1: features1,
@@ -31,14 +30,10 @@ def analyze_comparison(features1, features2, label1, label2, api_key, language="
     }
     
     # Load System Prompt
-    # Updated to look in the same directory as this script
     try:
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        prompt_path = os.path.join(current_dir, "system_prompt.md")
-        with open(prompt_path, "r", encoding="utf-8") as f:
-            system_prompt = f.read()
+        system_prompt = load_prompt("system_prompt.md")
     except FileNotFoundError:
-        return {"error": f"system_prompt.md not found at {prompt_path}."}
+        return {"error": f"system_prompt.md not found at {PROMPT_DIR}."}
 
     # Add language instruction
     lang_instruction = ""
@@ -50,9 +45,9 @@ def analyze_comparison(features1, features2, label1, label2, api_key, language="
     user_message = f"Here is the data:\n{json.dumps(data, indent=2)}{lang_instruction}"
 
     try:
-        chat_response = client.chat.complete(
-            model="mistral-large-latest",
-            messages=[
+        content = chat_complete(
+            api_key,
+            [
                 {
                     "role": "system",
                     "content": system_prompt,
@@ -62,11 +57,10 @@ def analyze_comparison(features1, features2, label1, label2, api_key, language="
                     "content": user_message,
                 },
             ],
+            language=language,
             response_format={"type": "json_object"} # Force JSON mode if available/supported, otherwise rely on prompt
         )
         
-        content = chat_response.choices[0].message.content
-        
         # Try to parse JSON
         try:
             return json.loads(content)
@@ -90,16 +84,11 @@ def analyze_binding_ai(target_data, reference_data, api_key):
     if not api_key:
         return {"error": "API Key is missing."}
 
-    client = Mistral(api_key=api_key)
-
     # Load System Prompt
     try:
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        prompt_path = os.path.join(current_dir, "binding_prompt.md")
-        with open(prompt_path, "r", encoding="utf-8") as f:
-            system_prompt = f.read()
+        system_prompt = load_prompt("binding_prompt.md")
     except FileNotFoundError:
-        return {"error": f"binding_prompt.md not found at {prompt_path}."}
+        return {"error": f"binding_prompt.md not found at {PROMPT_DIR}."}
 
     # Prepare Data Payload
     payload = {
@@ -110,9 +99,9 @@ def analyze_binding_ai(target_data, reference_data, api_key):
     user_message = f"Analyze the following data for binding detection:\n\n{json.dumps(payload, indent=2)}"
 
     try:
-        chat_response = client.chat.complete(
-            model="mistral-large-latest",
-            messages=[
+        content = chat_complete(
+            api_key,
+            [
                 {
                     "role": "system",
                     "content": system_prompt,
@@ -125,8 +114,6 @@ def analyze_binding_ai(target_data, reference_data, api_key):
             response_format={"type": "json_object"}
         )
         
-        content = chat_response.choices[0].message.content
-        
         try:
             return json.loads(content)
         except json.JSONDecodeError:
@@ -155,16 +142,11 @@ def analyze_voice_command(text, api_key):
     if not api_key:
         return {"error": "API Key is missing."}
 
-    client = Mistral(api_key=api_key)
-
     # Load System Prompt
     try:
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        prompt_path = os.path.join(current_dir, "voice_prompt.md")
-        with open(prompt_path, "r", encoding="utf-8") as f:
-            system_prompt = f.read()
+        system_prompt = load_prompt("voice_prompt.md")
     except FileNotFoundError:
-        return {"error": f"voice_prompt.md not found at {prompt_path}."}
+        return {"error": f"voice_prompt.md not found at {PROMPT_DIR}."}
 
     # Add current date context
     from datetime import datetime
@@ -172,9 +154,9 @@ def analyze_voice_command(text, api_key):
     user_message = f"Today's date is {today_str}.\n\nUser Input: \"{text}\""
 
     try:
-        chat_response = client.chat.complete(
-            model="mistral-large-latest",
-            messages=[
+        content = chat_complete(
+            api_key,
+            [
                 {
                     "role": "system",
                     "content": system_prompt,
@@ -187,8 +169,6 @@ def analyze_voice_command(text, api_key):
             response_format={"type": "json_object"}
         )
         
-        content = chat_response.choices[0].message.content
-        
         # Try to parse JSON
         try:
             return json.loads(content)
@@ -204,117 +184,74 @@ def analyze_voice_command(text, api_key):
     except Exception as e:
         return {"error": f"Error communicating with Mistral AI: {e}"}
 
+def process_csv_smart(content, filename):
+    """
+    Reduces a session CSV to a token-budgeted text for the lap comparison prompt.
+
+    The session is parsed like any upload, the lap times are summarized and the fastest
+    lap is compressed (distance resampling + LTTB, key events kept) by summarize_session.
+
+    Args:
+        content (bytes | str): Raw CSV content.
+        filename (str): Session label.
+
+    Returns:
+        str: Text for the prompt, or an error note with a raw sample.
+    """
+    raw = content.encode("utf-8") if isinstance(content, str) else content
+    try:
+        df, metadata = load_csv(io.BytesIO(raw), PROMPT_CHANNELS)
+        return summarize_session(df, metadata)
+    except Exception as e:
+        sample = raw[:1000].decode("utf-8", errors="replace")
+        return f"Error processing CSV: {e}\nRaw Data Sample:\n{sample}..."
+
 def analyze_lap_comparison(csv_content_1, csv_content_2, filename1, filename2, api_key):
     """
     Analyzes and compares two karting sessions using the specific lap comparison prompt.
     """
+    return analyze_lap_comparison_sessions(
+        [process_csv_smart(csv_content_1, filename1), process_csv_smart(csv_content_2, filename2)],
+        [filename1, filename2],
+        api_key
+    )
+
+def analyze_lap_comparison_sessions(processed_sessions, filenames, api_key):
+    """
+    Compares N karting sessions using the specific lap comparison prompt.
+
+    Args:
+        processed_sessions (list): Session texts already reduced by process_csv_smart.
+        filenames (list): Label of each session, in the same order.
+        api_key (str): Mistral API Key.
+
+    Returns:
+        dict: {"analysis": text}, or a dict with an error key.
+    """
     if not api_key:
         return {"error": "API Key is missing."}
 
-    client = Mistral(api_key=api_key)
-
     # Load System Prompt
     try:
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        prompt_path = os.path.join(current_dir, "lap_compare_propt.md")
-        with open(prompt_path, "r", encoding="utf-8") as f:
-            system_prompt = f.read()
+        system_prompt = load_prompt("lap_compare_propt.md")
     except FileNotFoundError:
-        return {"error": f"lap_compare_propt.md not found at {prompt_path}."}
+        return {"error": f"lap_compare_propt.md not found at {PROMPT_DIR}."}
 
     # Prepare user message
-    
-    def process_csv_smart(content, filename):
-        """
-        Smart processing of CSV data to fit context window while preserving 'all lines' of the most critical data.
-        Strategy:
-        1. Parse CSV with Pandas.
-        2. Identify Laps.
-        3. Generate a 'Session Summary' (Lap times, consistency).
-        4. Extract the BEST LAP (Fastest) in full resolution (all lines).
-        5. If no laps found, use smart downsampling.
-        """
-        try:
-            # Read CSV
-            df = pd.read_csv(io.StringIO(content))
-            
-            # Clean columns
-            df.columns = [c.strip() for c in df.columns]
-            
-            # Check for 'Lap' column (case insensitive)
-            lap_col = next((c for c in df.columns if c.lower() == 'lap'), None)
-            time_col = next((c for c in df.columns if 'time' in c.lower()), None)
-            
-            if lap_col and time_col:
-                # Group by Lap
-                laps = df.groupby(lap_col)
-                lap_summaries = []
-                best_lap_idx = -1
-                min_time = float('inf')
-                
-                # Analyze Laps
-                for lap_idx, lap_data in laps:
-                    if len(lap_data) < 10: continue # Skip noise
-                    
-                    # Calculate duration
-                    start_time = lap_data[time_col].min()
-                    end_time = lap_data[time_col].max()
-                    duration = end_time - start_time
-                    
-                    if duration < 10: continue # Skip incomplete/out laps
-                    
-                    lap_summaries.append(f"Lap {lap_idx}: {duration:.3f}s")
-                    
-                    if duration < min_time:
-                        min_time = duration
-                        best_lap_idx = lap_idx
-                
-                # Extract Best Lap Data (Full Resolution)
-                if best_lap_idx != -1:
-                    best_lap_df = df[df[lap_col] == best_lap_idx]
-                    best_lap_csv = best_lap_df.to_csv(index=False)
-                    
-                    summary_text = ", ".join(lap_summaries)
-                    
-                    return (
-                        f"### DATA STRUCTURE: BEST LAP + SESSION SUMMARY\n"
-                        f"NOTE: To respect context limits while analyzing 'all lines', we have extracted the FASTEST LAP (Lap {best_lap_idx}) in full 50Hz/10Hz resolution.\n"
-                        f"This allows you to see every braking point and apex detail for the optimal performance.\n\n"
-                        f"--- SESSION SUMMARY (Consistency) ---\n"
-                        f"{summary_text}\n\n"
-                        f"--- BEST LAP TELEMETRY (Full Resolution) ---\n"
-                        f"{best_lap_csv}"
-                    )
-            
-            # Fallback: Smart Downsampling if no laps detected or extraction failed
-            # Target ~500 lines max for non-lap data
-            if len(df) > 500:
-                step = len(df) // 500
-                df_sampled = df.iloc[::step]
-                return f"### DATA STRUCTURE: DOWNSAMPLED WHOLE SESSION\n{df_sampled.to_csv(index=False)}"
-            
-            return content
-
-        except Exception as e:
-            return f"Error processing CSV: {e}\nRaw Data Sample:\n{content[:1000]}..."
-
-    csv1_processed = process_csv_smart(csv_content_1, filename1)
-    csv2_processed = process_csv_smart(csv_content_2, filename2)
-
+    count = "two" if len(processed_sessions) == 2 else str(len(processed_sessions))
     user_message = f"""
-Please analyze the following two karting sessions.
-
---- SESSION 1: {filename1} ---
-{csv1_processed}
-
---- SESSION 2: {filename2} ---
-{csv2_processed}
+Please analyze the following {count} karting sessions.
+"""
+    for idx, (filename, processed) in enumerate(zip(filenames, processed_sessions)):
+        user_message += f"""
+--- SESSION {idx + 1}: {filename} ---
+{processed}
 """
 
     try:
-        chat_response = client.chat.complete(
-            model="mistral-large-latest",
-            messages=[
+        content = chat_complete(
+            api_key,
+            [
                 {
                     "role": "system",
                     "content": system_prompt,
@@ -325,8 +262,6 @@ Please analyze the following two karting sessions.
                 },
             ]
         )
-        
-        content = chat_response.choices[0].message.content
         return {"analysis": content}
 
     except Exception as e:
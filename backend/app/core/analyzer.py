@@ -1,25 +1,32 @@
 import numpy as np
+from app.core.lap_index import LapIndex, parse_beacons
+from app.core.binding_analyzer import build_track_geometry
+from app.core.sectors import sector_table
+from app.core.track_path import build_path_pyramid, TRACK_PATH_POINTS
 
-def compute_circuit_characteristics(df):
+def compute_circuit_characteristics(df, pyramid=None):
     """
     Computes circuit characteristics based on telemetry data.
     
     Args:
         df (pd.DataFrame): Dataframe containing 'Time', 'GPS Speed', 'GPS LonAcc', 'GPS LatAcc'.
+        pyramid (PathPyramid): Optional precomputed path of the session (see track_path),
+            otherwise built on the fastest GPS lap.
         
     Returns:
         dict: Dictionary containing computed features.
     """
     # Extract arrays
     try:
-        # Flexible column checking
-        if 'Time' not in df.columns:
-             # Try to find a column that looks like Time
-             time_col = [c for c in df.columns if 'Time' in c]
-             if time_col:
-                 df['Time'] = df[time_col[0]]
+        # Flexible column checking: without 'Time', a column that looks like it (read
+        # locally, df may be a shared cached session and is never written to)
+        time_col = 'Time'
+        if time_col not in df.columns:
+             candidates = [c for c in df.columns if 'Time' in c]
+             if candidates:
+                 time_col = candidates[0]
         
-        time = df['Time'].values
+        time = df[time_col].values
         speed_kmh = df['GPS Speed'].values
         lon_acc_g = df['GPS LonAcc'].values
         lat_acc_g = df['GPS LatAcc'].values
@@ -70,24 +77,13 @@ def compute_circuit_characteristics(df):
     # 5. Engine Importance
     engine_importance = np.sum(is_accel * dt) / lap_time if lap_time > 0 else 0
 
-    # 6. Track Path (Downsampled)
+    # 6. Track Path (Douglas-Peucker, TRACK_PATH_POINTS points for UI performance)
     track_path = []
-    if 'GPS Latitude' in df.columns and 'GPS Longitude' in df.columns:
-        lat = df['GPS Latitude'].values
-        lon = df['GPS Longitude'].values
-        
-        if len(lat) > 0:
-            lat0 = lat[0]
-            lon0 = lon[0]
-            
-            y_m = (lat - lat0) * 111132.92
-            x_m = (lon - lon0) * 111412.84 * np.cos(np.deg2rad(lat0))
-            
-            # Downsample (take 200 points max for UI performance)
-            step = max(1, len(x_m) // 200)
-            
-            for i in range(0, len(x_m), step):
-                track_path.append({"x": float(x_m[i]), "y": float(y_m[i])})
+    if pyramid is None:
+        pyramid = build_path_pyramid(df, fastest_gps_lap_rows(df))
+    if pyramid is not None:
+        for i in pyramid.simplify(TRACK_PATH_POINTS):
+            track_path.append({"x": round(float(pyramid.x[i]), 2), "y": round(float(pyramid.y[i]), 2)})
 
     features = {
         'Downforce': float(downforce),
@@ -110,13 +106,146 @@ def parse_lap_time(t_str):
     except:
         return 0.0
 
-def compute_lap_metrics(df, metadata=None):
+# Laps (and GPS line crossings) shorter than this are fragments, in seconds
+MIN_LAP_TIME = 20.0
+# Half length of the GPS start/finish line, in meters either side of the track
+START_LINE_HALF_WIDTH = 20.0
+# Travel used to estimate the driving direction at the start/finish line, in meters
+START_LINE_HEADING_DISTANCE = 5.0
+
+def start_finish_line(x, y, heading_distance=START_LINE_HEADING_DISTANCE):
+    """
+    Start/finish line through the first GPS fix, perpendicular to the initial driving direction.
+
+    Args:
+        x, y (np.ndarray): Positions in meters (local frame).
+        heading_distance (float): Distance travelled to measure the driving direction.
+
+    Returns:
+        tuple: (center, direction) as 2-element arrays, direction being the unit driving
+        direction, or None when the car never moves heading_distance from the first fix.
+    """
+    moved = np.flatnonzero(np.hypot(x - x[0], y - y[0]) >= heading_distance)
+    if len(moved) == 0:
+        return None
+    center = np.array([x[0], y[0]])
+    direction = np.array([x[moved[0]], y[moved[0]]]) - center
+    return center, direction / np.linalg.norm(direction)
+
+def detect_line_crossings(x, y, time, center, direction, half_width=START_LINE_HALF_WIDTH):
+    """
+    Times at which the trajectory crosses a line segment in the driving direction.
+
+    The side of each sample is the sign of the cross product between the line and the
+    vector from the line center to the sample; a crossing is a change from behind to in
+    front of the line between two consecutive samples, within half_width of the center.
+    The crossing time is interpolated linearly between the two samples.
+
+    Args:
+        x, y, time (np.ndarray): Positions in meters (local frame) and times in seconds.
+        center (np.ndarray): Middle of the line.
+        direction (np.ndarray): Unit driving direction, normal to the line.
+        half_width (float): Half length of the line, in meters.
+
+    Returns:
+        np.ndarray: Crossing times in seconds, ascending.
+    """
+    dx = x - center[0]
+    dy = y - center[1]
+    # Cross product of the line vector (-dir_y, dir_x) with the offset: signed distance past the line
+    side = dx * direction[0] + dy * direction[1]
+    along = dx * -direction[1] + dy * direction[0]
+
+    idx = np.flatnonzero((side[:-1] < 0) & (side[1:] >= 0))
+    frac = -side[idx] / (side[idx + 1] - side[idx])
+    offset = along[idx] + frac * (along[idx + 1] - along[idx])
+    keep = np.abs(offset) <= half_width
+    idx, frac = idx[keep], frac[keep]
+    return time[idx] + frac * (time[idx + 1] - time[idx])
+
+def gps_lap_boundaries(df):
+    """
+    Lap boundaries of a session without beacons, from GPS start/finish line crossings.
+
+    Returns:
+        list: Session start time then every crossing at least MIN_LAP_TIME after the
+        previous boundary, or None when no start/finish line can be laid.
+    """
+    lat = df['GPS Latitude'].values
+    lon = df['GPS Longitude'].values
+    time = df['Time'].values
+
+    # Local metric frame centred on the first fix
+    x = (lon - lon[0]) * 111412.84 * np.cos(np.deg2rad(lat[0]))
+    y = (lat - lat[0]) * 111132.92
+
+    line = start_finish_line(x, y)
+    if line is None:
+        return None
+
+    boundaries = [float(time[0])]
+    for t in detect_line_crossings(x, y, time, *line):
+        if t - boundaries[-1] > MIN_LAP_TIME:
+            boundaries.append(float(t))
+    return boundaries
+
+def fastest_gps_lap_rows(df):
+    """
+    Rows of the fastest GPS lap (see gps_lap_boundaries) of at least MIN_LAP_TIME.
+
+    Returns:
+        slice | np.ndarray: Row selector of the lap, or None without GPS laps.
+    """
+    if not {'Time', 'GPS Latitude', 'GPS Longitude'} <= set(df.columns) or len(df) == 0:
+        return None
+    boundaries = gps_lap_boundaries(df)
+    if not boundaries or len(boundaries) < 2:
+        return None
+    lap_index = LapIndex(df, boundaries)
+    laps = [i + 1 for i, d in enumerate(lap_index.durations) if d >= MIN_LAP_TIME and lap_index.lap_length(i + 1)]
+    if not laps:
+        return None
+    return lap_index.rows(min(laps, key=lambda n: lap_index.durations[n - 1]))
+
+def theoretical_best_lap(df, boundaries, fallback, lap_index=None, geometry=None):
+    """
+    Sum of the best mini-sector times over the laps between boundaries.
+
+    Args:
+        df (pd.DataFrame): Session telemetry with GPS position.
+        boundaries (list): Lap boundary times (seconds).
+        fallback (float): Returned when the laps cannot be sector-timed.
+        lap_index (LapIndex): Optional, reused when built on the same boundaries.
+        geometry (TrackGeometry): Optional, built on lap_index.
+
+    Returns:
+        float: Theoretical best lap, never slower than fallback (the best lap).
+    """
+    if 'GPS Latitude' not in df.columns or 'GPS Longitude' not in df.columns or len(boundaries) < 2:
+        return fallback
+    try:
+        if lap_index is None or not lap_index.matches(boundaries):
+            lap_index = LapIndex(df, boundaries)
+            geometry = None
+        if geometry is None:
+            geometry = build_track_geometry(lap_index)
+        table = sector_table(lap_index, geometry, min_lap_time=MIN_LAP_TIME)
+    except Exception as e:
+        print(f"Sector timing failed: {e}")
+        return fallback
+    if table is None:
+        return fallback
+    return min(table["theoretical_lap"], fallback)
+
+def compute_lap_metrics(df, metadata=None, lap_index=None, geometry=None):
     """
     Computes lap metrics from telemetry data.
     
     Args:
         df (pd.DataFrame): Dataframe containing 'Time', 'GPS Latitude', 'GPS Longitude'.
         metadata (dict): Optional metadata extracted from CSV header.
+        lap_index (LapIndex): Optional lap index of the session, reused for sector timing.
+        geometry (TrackGeometry): Optional geometry built on lap_index.
         
     Returns:
         dict: Dictionary containing lap metrics.
@@ -141,7 +270,7 @@ def compute_lap_metrics(df, metadata=None):
                 "best_lap": best_lap,
                 "average_lap": avg_lap,
                 "regularity": std_dev,
-                "theoretical_lap": best_lap # Fallback as we don't have sectors
+                "theoretical_lap": theoretical_best_lap(df, parse_beacons(metadata), best_lap, lap_index, geometry)
             }
 
     # 2. Fallback to GPS Analysis
@@ -154,11 +283,9 @@ def compute_lap_metrics(df, metadata=None):
             "theoretical_lap": 0
         }
     
-    lat = df['GPS Latitude'].values
-    lon = df['GPS Longitude'].values
     time = df['Time'].values
     
-    if len(lat) == 0:
+    if len(time) == 0:
         return {
             "laps": [],
             "best_lap": 0,
@@ -167,61 +294,18 @@ def compute_lap_metrics(df, metadata=None):
             "theoretical_lap": 0
         }
 
-    start_lat = lat[0]
-    start_lon = lon[0]
-    
-    # Calculate distance to start for all points (approximate)
-    d_lat = (lat - start_lat) * 111132.92
-    d_lon = (lon - start_lon) * 111412.84 * np.cos(np.deg2rad(start_lat))
-    dist_sq = d_lat**2 + d_lon**2
-    
-    # Thresholds
-    CROSSING_THRESHOLD_SQ = 20**2 # 20 meters squared
-    
-    # Find indices where car is close to start
-    close_indices = np.where(dist_sq < CROSSING_THRESHOLD_SQ)[0]
-    
-    if len(close_indices) == 0:
-         total_time = time[-1] - time[0]
-         return {
+    boundaries = gps_lap_boundaries(df)
+    if boundaries is None:
+        total_time = float(time[-1] - time[0])
+        return {
             "laps": [total_time],
             "best_lap": total_time,
             "average_lap": total_time,
             "regularity": 0,
             "theoretical_lap": total_time
         }
+    lap_times = [float(l) for l in np.diff(boundaries)]
 
-    # Filter close indices to find distinct crossings
-    crossings = []
-    crossings.append(0)
-    
-    last_idx = close_indices[0]
-    current_cluster = [last_idx]
-    
-    for idx in close_indices[1:]:
-        if idx - last_idx > 200: # Gap > 200 samples
-            best_in_cluster = current_cluster[np.argmin(dist_sq[current_cluster])]
-            if best_in_cluster != 0:
-                crossings.append(best_in_cluster)
-            current_cluster = []
-        
-        current_cluster.append(idx)
-        last_idx = idx
-        
-    if current_cluster:
-        best_in_cluster = current_cluster[np.argmin(dist_sq[current_cluster])]
-        if best_in_cluster != 0:
-            crossings.append(best_in_cluster)
-
-    # Calculate lap times
-    lap_times = []
-    for i in range(len(crossings) - 1):
-        t_start = time[crossings[i]]
-        t_end = time[crossings[i+1]]
-        l_time = t_end - t_start
-        if l_time > 20: 
-            lap_times.append(float(l_time))
-            
     if not lap_times:
          total_time = float(time[-1] - time[0])
          return {
@@ -235,7 +319,7 @@ def compute_lap_metrics(df, metadata=None):
     best_lap = min(lap_times)
     avg_lap = float(np.mean(lap_times))
     std_dev = float(np.std(lap_times))
-    theoretical_lap = avg_lap - 2 * std_dev
+    theoretical_lap = theoretical_best_lap(df, boundaries, best_lap, lap_index, geometry)
     
     return {
         "laps": lap_times,
@@ -0,0 +1,100 @@
+import os
+import zlib
+import base64
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Baselines kept server-side for /analyze/binding/corner requests by baseline_id
+BASELINE_REGISTRY_SIZE = int(os.getenv("BASELINE_REGISTRY_SIZE", "64"))
+
+# Accept value selecting the compact baseline encoding of /analyze/binding/init
+COMPACT_BASELINE_MEDIA_TYPE = "application/x-baseline-compact+json"
+# Baseline arrays in meters, sent as centimetre deltas
+COMPACT_COORDINATES = ("x", "y", "x_left", "y_left", "x_right", "y_right")
+
+def baseline_id_for(session):
+    """
+    Stable id of a stored session's baseline, the same in every worker process.
+
+    Returns:
+        str: Id derived from (storage_path, generation), or None for a session not
+        stored in GCS.
+    """
+    if not session.key:
+        return None
+    storage_path, generation = session.key
+    return hashlib.sha256(f"{storage_path}:{generation}".encode("utf-8")).hexdigest()[:24]
+
+
+class BaselineRegistry:
+    """
+    Process-wide LRU of the sessions whose baseline was sent to a client.
+
+    A binding corner request then names the baseline by id instead of posting its
+    arrays back; the session's geometry and KDTree are the baseline. Only the session
+    cache keys (storage_path, generation) are kept: the sessions themselves stay owned
+    by session_cache and its memory budget, and are reloaded once evicted.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def register(self, session):
+        """
+        Stores a session's cache key.
+
+        Returns:
+            str: Its baseline id, or None for a session not stored in GCS (the client
+            then posts the baseline arrays back).
+        """
+        baseline_id = baseline_id_for(session)
+        if baseline_id is None:
+            return None
+        with self._lock:
+            self._entries[baseline_id] = session.key
+            self._entries.move_to_end(baseline_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return baseline_id
+
+    def get(self, baseline_id):
+        """Returns the registered (storage_path, generation) key, or None if unknown or evicted."""
+        with self._lock:
+            key = self._entries.get(baseline_id)
+            if key is not None:
+                self._entries.move_to_end(baseline_id)
+            return key
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _pack(data):
+    return base64.b64encode(zlib.compress(data, 1)).decode("ascii")
+
+def encode_baseline(baseline):
+    """
+    Compact form of an analyze_binding baseline, about 10x smaller than plain JSON.
+
+    Coordinates are rounded to the centimetre and sent as deltas from the previous
+    point ("cm-delta-deflate": little-endian int32, zlib, base64); is_corner is bit
+    packed ("bits-deflate": np.packbits order, zlib, base64). Other keys are unchanged.
+    """
+    import numpy as np
+
+    encoded = dict(baseline)
+    for name in COMPACT_COORDINATES:
+        centimetres = np.round(np.asarray(baseline[name], dtype=float) * 100.0).astype(np.int64)
+        deltas = np.diff(centimetres, prepend=0).astype("<i4")
+        encoded[name] = {"encoding": "cm-delta-deflate", "length": len(deltas), "data": _pack(deltas.tobytes())}
+    is_corner = np.asarray(baseline["is_corner"], dtype=bool)
+    encoded["is_corner"] = {"encoding": "bits-deflate", "length": len(is_corner), "data": _pack(np.packbits(is_corner).tobytes())}
+    return encoded
+
+
+# Shared by all endpoints of the process
+baseline_registry = BaselineRegistry(BASELINE_REGISTRY_SIZE)
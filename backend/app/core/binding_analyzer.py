@@ -2,8 +2,9 @@ import pandas as pd
 import numpy as np
 from scipy.signal import savgol_filter
 from scipy.spatial import KDTree
-from scipy.stats import linregress
 import math
+from app.core.lap_index import LapIndex
+from app.core.track_geometry import TrackGeometry
 
 def lat_lon_to_xy(lat, lon, origin=None):
     R = 6378137.0 # Earth radius in meters
@@ -25,6 +26,14 @@ def lat_lon_to_xy(lat, lon, origin=None):
     
     return x, y, origin
 
+def xy_to_lat_lon(x, y, origin):
+    """Inverse of lat_lon_to_xy for points in the frame of origin."""
+    R = 6378137.0 # Earth radius in meters
+    lat0, lon0 = origin
+    lat = lat0 + np.degrees(np.asarray(y) / R)
+    lon = lon0 + np.degrees(np.asarray(x) / (R * np.cos(np.radians(lat0))))
+    return lat, lon
+
 def calculate_boundaries(x, y, width=8.0):
     dx = np.gradient(x)
     dy = np.gradient(y)
@@ -74,47 +83,96 @@ def _filter_segments(boolean_array, lengths, target_val, min_len, invert_action=
                 arr[start:end] = not target_val
     return arr
 
-def analyze_binding(df, metadata):
+def window_index(starts, ends):
     """
-    Analyzes the full session to build a baseline track map and identify corners.
+    Builds the gather index for inclusive [start, end] windows, packed back to back.
+
+    Returns:
+        tuple: (np.ndarray, np.ndarray) -> (indices, lengths)
     """
-    # Parse Beacon Markers
-    beacons = []
-    if "Beacon Markers" in metadata:
-        raw_markers = metadata["Beacon Markers"]
-        for m in raw_markers:
-            try:
-                val = float(str(m).strip().strip('"').strip("'"))
-                beacons.append(val)
-            except ValueError:
-                continue
-    
-    if len(beacons) < 2:
-        # Fallback if no beacons: use start and end of file
-        beacons = [df['Time'].min(), df['Time'].max()]
+    starts = np.asarray(starts, dtype=np.intp)
+    ends = np.asarray(ends, dtype=np.intp)
+    lengths = ends - starts + 1
+    offsets = np.cumsum(lengths) - lengths
+    indices = np.repeat(starts - offsets, lengths) + np.arange(lengths.sum())
+    return indices, lengths
 
-    # Find fastest lap for baseline
-    durations = np.diff(beacons)
-    valid_indices = [i for i, d in enumerate(durations) if d > 30.0]
-    
-    if valid_indices:
-        lap_idx = valid_indices[np.argmin(durations[valid_indices])]
-        lap_number = lap_idx + 1
-    else:
-        lap_number = np.argmin(durations) + 1 if len(durations) > 0 else 1
+def window_features(time, speed, rpm, lat_g, lengths, min_corr_len=2):
+    """
+    Computes the apex->exit corner features for many windows in one vectorized pass.
 
-    start_time = beacons[lap_number-1]
-    end_time = beacons[lap_number] if lap_number < len(beacons) else df['Time'].max()
-    
-    lap_data = df[(df['Time'] >= start_time) & (df['Time'] < end_time)].copy()
-    
-    if lap_data.empty:
-        # Fallback to entire dataframe if lap extraction fails
-        lap_data = df.copy()
+    The channel arrays hold the windows packed back to back (see window_index), each
+    window having lengths[k] >= 2 samples. Regressions are solved in closed form from
+    per-window segment sums of the centered samples, which matches linregress/corrcoef
+    without their per-call overhead.
 
-    lat = lap_data['GPS Latitude'].values
-    lon = lap_data['GPS Longitude'].values
-    
+    Returns:
+        dict: Feature name -> np.ndarray with one value per window.
+    """
+    lengths = np.asarray(lengths, dtype=np.intp)
+    offsets = np.cumsum(lengths) - lengths
+    n = lengths.astype(float)
+    abs_lat_g = np.abs(lat_g)
+
+    def seg_sum(values):
+        return np.add.reduceat(values, offsets)
+
+    def centered(values):
+        return values - np.repeat(seg_sum(values) / n, lengths)
+
+    t_c = centered(time)
+    rpm_c = centered(rpm)
+    speed_c = centered(speed)
+    lat_g_c = centered(abs_lat_g)
+
+    s_tt = seg_sum(t_c * t_c)
+    s_rr = seg_sum(rpm_c * rpm_c)
+    s_vv = seg_sum(speed_c * speed_c)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Least-squares slopes (NaN where the fit is undefined or the window holds NaN)
+        raw_rpm_slope = np.where(s_tt > 0, seg_sum(t_c * rpm_c) / s_tt, np.nan)
+        raw_lat_g_slope = np.where(s_tt > 0, seg_sum(t_c * lat_g_c) / s_tt, np.nan)
+
+        # RPM-Speed Correlation, only for windows with variance on both channels
+        has_var = (s_rr > 0) & (s_vv > 0) & (lengths >= min_corr_len)
+        corr = np.where(has_var, seg_sum(rpm_c * speed_c) / np.sqrt(s_rr * s_vv), 0.0)
+
+    # Window endpoints
+    last = offsets + lengths - 1
+    delta_v = speed[last] - speed[offsets]
+    time_to_deltav = time[last] - time[offsets]
+    delta_rpm = rpm[last] - rpm[offsets]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        long_efficiency = np.where(np.abs(delta_rpm) > 10, delta_v / delta_rpm, 0.0)
+
+    # RPM Anomaly: any residual of the RPM fit beyond 3 sigma
+    residuals = rpm_c - np.repeat(np.nan_to_num(raw_rpm_slope), lengths) * t_c
+    residuals = residuals - np.repeat(seg_sum(residuals) / n, lengths)
+    std = np.sqrt(seg_sum(residuals * residuals) / n)
+    max_dev = np.maximum.reduceat(np.abs(residuals), offsets)
+    with np.errstate(invalid='ignore'):
+        rpm_anomaly = (lengths > 2) & (std > 1e-6) & (max_dev > 3.0 * std)
+
+    return {
+        "rpm_slope": np.nan_to_num(raw_rpm_slope, nan=0.0),
+        "speed_gain": delta_v,
+        "time_to_deltav": time_to_deltav,
+        "rpm_speed_corr": np.nan_to_num(corr, nan=0.0),
+        "lat_g_decay": np.nan_to_num(raw_lat_g_slope, nan=0.0),
+        "long_efficiency": long_efficiency,
+        "rpm_anomaly": rpm_anomaly
+    }
+
+def _fastest_lap(durations):
+    """1-based number of the fastest lap longer than 30s, or None if there is none."""
+    valid_indices = [i for i, d in enumerate(durations) if d > 30.0]
+    if not valid_indices:
+        return None
+    return valid_indices[np.argmin(durations[valid_indices])] + 1
+
+def _smoothed_path(lat, lon):
+    """Projects a lap to XY (origin at its first sample) and smooths it for curvature analysis."""
     x_raw, y_raw, origin = lat_lon_to_xy(lat, lon)
     
     window_len = 11
@@ -124,11 +182,13 @@ def analyze_binding(df, metadata):
         y = savgol_filter(y_raw, window_len, poly_order)
     else:
         x, y = x_raw, y_raw
-        
+    return x, y, origin
+
+def _detect_corners(x, y, corner_threshold=0.03):
+    """Smoothed-path curvature and the filtered corner mask."""
     curvature = calculate_curvature(x, y)
     
     # Corner detection logic
-    corner_threshold = 0.03
     seg_curvature = (curvature[:-1] + curvature[1:]) / 2
     # Pad to match length
     seg_curvature = np.append(seg_curvature, seg_curvature[-1]) 
@@ -139,269 +199,322 @@ def analyze_binding(df, metadata):
     
     is_corner = _filter_segments(is_corner, seg_lengths, target_val=True, min_len=10.0)
     is_corner = _filter_segments(is_corner, seg_lengths, target_val=False, min_len=20.0, invert_action=True)
+    return curvature, is_corner, seg_lengths
+
+def build_track_geometry(lap_index, width=8.0):
+    """
+    Computes the session geometry once: baseline path on the fastest lap (smoothed XY,
+    curvature, arc length, corners, boundaries) and the XY projection and cumulative
+    distance of every sample.
+    
+    Returns:
+        TrackGeometry
+    """
+    # Find fastest lap for baseline
+    durations = lap_index.durations
+    lap_number = _fastest_lap(durations)
+    if lap_number is None:
+        lap_number = np.argmin(durations) + 1 if len(durations) > 0 else 1
+
+    rows = lap_index.rows(lap_number)
+    
+    if lap_index.lap_length(lap_number) == 0:
+        # Fallback to entire session if lap extraction fails
+        rows = slice(None)
+
+    lat = lap_index.channel('GPS Latitude')[rows]
+    lon = lap_index.channel('GPS Longitude')[rows]
+    
+    x, y, origin = _smoothed_path(lat, lon)
+    curvature, is_corner, seg_lengths = _detect_corners(x, y)
     
-    width = 8.0
     x_left, y_left, x_right, y_right = calculate_boundaries(x, y, width)
     
+    # Every sample in the baseline frame, with the distance travelled since the start
+    session_x, session_y, _ = lat_lon_to_xy(
+        lap_index.channel('GPS Latitude'), lap_index.channel('GPS Longitude'), origin=origin
+    )
+    steps = np.sqrt(np.diff(session_x, prepend=session_x[:1])**2 + np.diff(session_y, prepend=session_y[:1])**2)
+    session_distance = np.cumsum(np.nan_to_num(steps))
+    
+    return TrackGeometry(origin, lap_number, width, {
+        "x": x,
+        "y": y,
+        "curvature": curvature,
+        "arc_length": np.cumsum(seg_lengths),
+        "is_corner": is_corner,
+        "x_left": x_left,
+        "y_left": y_left,
+        "x_right": x_right,
+        "y_right": y_right,
+        "session_x": session_x,
+        "session_y": session_y,
+        "session_distance": session_distance
+    })
+
+def build_session_tree(geometry):
+    """KDTree over every session sample in the baseline frame, for analyze_binding_selection."""
+    points = np.column_stack((geometry.session_x, geometry.session_y))
+    # Samples without a GPS fix (e.g. the units line of the export) are moved out of reach
+    points[~np.isfinite(points).all(axis=1)] = 1e9
+    return KDTree(points)
+
+def analyze_binding(df, metadata, lap_index=None, geometry=None):
+    """
+    Analyzes the full session to build a baseline track map and identify corners.
+    """
+    # Lap boundaries from the Beacon Markers (start and end of file without them)
+    if lap_index is None:
+        lap_index = LapIndex.from_metadata(df, metadata)
+    if geometry is None:
+        geometry = build_track_geometry(lap_index)
+    
     baseline = {
-        'origin': origin,
-        'x': x.tolist(),
-        'y': y.tolist(),
-        'x_left': x_left.tolist(),
-        'y_left': y_left.tolist(),
-        'x_right': x_right.tolist(),
-        'y_right': y_right.tolist(),
-        'is_corner': is_corner.tolist(),
-        'width': width,
-        'lap_number': int(lap_number),
-        'beacons': beacons # Needed for selection analysis
+        'origin': geometry.origin,
+        'x': geometry.x.tolist(),
+        'y': geometry.y.tolist(),
+        'x_left': geometry.x_left.tolist(),
+        'y_left': geometry.y_left.tolist(),
+        'x_right': geometry.x_right.tolist(),
+        'y_right': geometry.y_right.tolist(),
+        'is_corner': geometry.is_corner.tolist(),
+        'width': geometry.width,
+        'lap_number': geometry.lap_number,
+        'beacons': lap_index.beacons # Needed for selection analysis
     }
     
     return baseline
 
-def analyze_binding_selection(df, baseline, click_x, click_y, search_radius=30.0):
+def _corner_window(x, y, cum_dists, speed, nearest_idx, search_radius):
     """
-    Analyzes a specific track location across all laps.
+    Apex and exit rows of a corner on one lap.
+
+    The apex is the slowest sample within search_radius meters (along the lap) of
+    nearest_idx, the lap sample closest to the corner; the exit is 20 m past the apex.
+
+    Returns:
+        tuple: (apex_idx, exit_idx), or None if the lap does not cover the corner.
     """
-    if not baseline:
-        raise ValueError("Baseline data required")
+    # Search for Apex around this point on THIS lap
+    l_center_dist = cum_dists[nearest_idx]
+    l_min_dist = l_center_dist - search_radius
+    l_max_dist = l_center_dist + search_radius
+    
+    mask = (cum_dists >= l_min_dist) & (cum_dists <= l_max_dist)
+    indices = np.where(mask)[0]
+    
+    if len(indices) < 5:
+        return None
+        
+    # Ensure indices are within bounds
+    indices = indices[indices < len(speed)]
+    if len(indices) == 0:
+        return None
         
-    bx = np.array(baseline['x'])
-    by = np.array(baseline['y'])
-    origin = tuple(baseline['origin'])
-    beacons = baseline['beacons']
+    # Find Min Speed (Apex) in this window
+    segment_speeds = speed[indices]
+    min_speed_idx_local = np.argmin(segment_speeds)
+    apex_idx = indices[min_speed_idx_local]
     
-    # 1. Find nearest point on baseline
-    tree = KDTree(np.column_stack((bx, by)))
-    dist, nearest_idx = tree.query([click_x, click_y])
+    # Calculate features starting from Apex -> Exit (+20m)
+    # Look ahead limit
+    lookahead_limit = min(len(x), apex_idx + 400)
+    sub_x = x[apex_idx:lookahead_limit]
+    sub_y = y[apex_idx:lookahead_limit]
     
-    # 2. Determine baseline window (not strictly used for logic, but good for visualization if needed)
-    # The logic in track_analyzer.py focuses on finding the corresponding location on EACH lap.
+    if len(sub_x) < 2:
+        return None
+        
+    sub_dists = np.sqrt(np.diff(sub_x)**2 + np.diff(sub_y)**2)
+    sub_cum = np.cumsum(sub_dists)
     
-    results = []
+    # Find index where distance >= 20m
+    exit_indices_local = np.where(sub_cum >= 20.0)[0]
+    
+    if len(exit_indices_local) == 0:
+        # Ran out of track before 20m: take the end
+        exit_idx = len(x) - 1
+    else:
+        exit_idx = apex_idx + 1 + exit_indices_local[0]
+        
+    if exit_idx >= len(x):
+        exit_idx = len(x) - 1
+        
+    if exit_idx - apex_idx < 1:
+        return None
+    return apex_idx, exit_idx
+
+def analyze_binding_selection(df, baseline, click_x, click_y, search_radius=30.0, lap_index=None, geometry=None, session_tree=None):
+    """
+    Analyzes a specific track location across all laps.
+    A precomputed TrackGeometry with the baseline's origin saves re-projecting every lap;
+    baseline may then be None (server-side baseline), the geometry and lap index being
+    the baseline. session_tree is an optional KDTree over the geometry's session XY,
+    reused across clicks.
+    """
+    if baseline is None:
+        if geometry is None or lap_index is None:
+            raise ValueError("Baseline data required")
+        origin = geometry.origin
+        beacons = lap_index.beacons
+    elif not baseline:
+        raise ValueError("Baseline data required")
+    else:
+        origin = tuple(baseline['origin'])
+        beacons = baseline['beacons']
+    
+    # Reuse the session's lap index when it was built for the same beacons
+    if lap_index is None or not lap_index.matches(beacons):
+        lap_index = LapIndex(df, beacons)
+    time_all = lap_index.channel('Time')
+    lat_all = lap_index.channel('GPS Latitude')
+    lon_all = lap_index.channel('GPS Longitude')
+    speed_all = lap_index.channel('GPS Speed', fill_missing=True)
+    rpm_all = lap_index.channel('RPM', fill_missing=True)
+    lat_g_all = lap_index.channel('GPS LatAcc', fill_missing=True)
+    if geometry is not None and not geometry.matches_origin(origin):
+        geometry = None
+    
+    # Every session sample within 20 m of the click, in one query of the session tree;
+    # each lap then takes its nearest one (laps without any are off track or in the pits)
+    near_rows = near_dists = None
+    if geometry is not None:
+        if session_tree is None:
+            session_tree = build_session_tree(geometry)
+        near_rows = np.sort(np.asarray(session_tree.query_ball_point([click_x, click_y], r=20.0), dtype=int))
+        near_dists = np.hypot(geometry.session_x[near_rows] - click_x, geometry.session_y[near_rows] - click_y)
+    
+    apexes = []
+    win_time, win_speed, win_rpm, win_lat_g = [], [], [], []
     
     # Iterate through all laps
-    for i in range(len(beacons) - 1):
+    for i in range(len(lap_index)):
         lap_num = i + 1
-        start_t = beacons[i]
-        end_t = beacons[i+1]
         
         # Filter reasonable lap times (>30s)
-        if (end_t - start_t) < 30.0:
+        if lap_index.durations[i] < 30.0:
             continue
 
-        lap_data = df[(df['Time'] >= start_t) & (df['Time'] < end_t)].copy()
-        if len(lap_data) < 10:
-            continue
-            
-        lat = lap_data['GPS Latitude'].values
-        lon = lap_data['GPS Longitude'].values
-        
-        # Convert to XY using baseline origin
-        x, y, _ = lat_lon_to_xy(lat, lon, origin=origin)
-        
-        # Map lap points to baseline click location
-        lap_tree = KDTree(np.column_stack((x, y)))
-        l_dist, l_nearest_idx = lap_tree.query([click_x, click_y])
-        
-        # Skip if this lap is too far from the click point (e.g., pit lane or off track)
-        if l_dist > 20.0: 
-            continue
-
-        # Search for Apex around this point on THIS lap
-        # Calculate cumulative distance along this lap
-        l_dists = np.sqrt(np.diff(x, prepend=x[0])**2 + np.diff(y, prepend=y[0])**2)
-        l_cum_dists = np.cumsum(l_dists)
-        
-        l_center_dist = l_cum_dists[l_nearest_idx]
-        l_min_dist = l_center_dist - search_radius
-        l_max_dist = l_center_dist + search_radius
-        
-        mask = (l_cum_dists >= l_min_dist) & (l_cum_dists <= l_max_dist)
-        indices = np.where(mask)[0]
-        
-        if len(indices) < 5:
-            continue
-            
-        # Find Min Speed (Apex) in this window
-        speed = lap_data['GPS Speed'].values if 'GPS Speed' in lap_data.columns else np.zeros_like(x)
-        
-        # Ensure indices are within bounds
-        indices = indices[indices < len(speed)]
-        if len(indices) == 0:
-            continue
-            
-        segment_speeds = speed[indices]
-        min_speed_idx_local = np.argmin(segment_speeds)
-        apex_idx = indices[min_speed_idx_local]
-        
-        # Calculate features starting from Apex -> Exit (+20m)
-        # Look ahead limit
-        lookahead_limit = min(len(x), apex_idx + 400)
-        sub_x = x[apex_idx:lookahead_limit]
-        sub_y = y[apex_idx:lookahead_limit]
-        
-        if len(sub_x) < 2:
+        if lap_index.lap_length(lap_num) < 10:
             continue
             
-        sub_dists = np.sqrt(np.diff(sub_x)**2 + np.diff(sub_y)**2)
-        sub_cum = np.cumsum(sub_dists)
+        rows = lap_index.rows(lap_num)
         
-        # Find index where distance >= 20m
-        exit_indices_local = np.where(sub_cum >= 20.0)[0]
-        
-        if len(exit_indices_local) == 0:
-            # Check if we ran out of track but almost reached it? 
-            # Or just take the end
-            exit_idx = len(x) - 1
+        if geometry is not None and isinstance(rows, slice):
+            # Precomputed XY (baseline origin) and distance along this lap
+            x = geometry.session_x[rows]
+            y = geometry.session_y[rows]
+            l_cum_dists = geometry.session_distance[rows] - geometry.session_distance[rows.start]
         else:
-            exit_idx = apex_idx + 1 + exit_indices_local[0]
+            # Convert to XY using baseline origin
+            x, y, _ = lat_lon_to_xy(lat_all[rows], lon_all[rows], origin=origin)
             
-        if exit_idx >= len(x):
-            exit_idx = len(x) - 1
+            # Calculate cumulative distance along this lap
+            l_dists = np.sqrt(np.diff(x, prepend=x[0])**2 + np.diff(y, prepend=y[0])**2)
+            l_cum_dists = np.cumsum(l_dists)
+        
+        if near_rows is not None and isinstance(rows, slice):
+            lo, hi = np.searchsorted(near_rows, [rows.start, rows.stop])
+            # No sample of this lap near the click point (e.g., pit lane or off track)
+            if lo == hi:
+                continue
+            l_nearest_idx = near_rows[lo + int(np.argmin(near_dists[lo:hi]))] - rows.start
+        else:
+            # Map lap points to baseline click location
+            lap_tree = KDTree(np.column_stack((x, y)))
+            l_dist, l_nearest_idx = lap_tree.query([click_x, click_y])
             
-        # Extract Data Windows
-        win_speed = speed[apex_idx:exit_idx+1]
-        rpm = lap_data['RPM'].values if 'RPM' in lap_data.columns else np.zeros_like(x)
-        win_rpm = rpm[apex_idx:exit_idx+1]
-        time_arr = lap_data['Time'].values
-        win_time = time_arr[apex_idx:exit_idx+1]
-        lat_g = lap_data['GPS LatAcc'].values if 'GPS LatAcc' in lap_data.columns else np.zeros_like(x)
-        win_lat_g = lat_g[apex_idx:exit_idx+1]
-        
-        if len(win_time) < 2:
+            # Skip if this lap is too far from the click point (e.g., pit lane or off track)
+            if l_dist > 20.0: 
+                continue
+
+        speed = speed_all[rows]
+        corner = _corner_window(x, y, l_cum_dists, speed, l_nearest_idx, search_radius)
+        if corner is None:
             continue
-        
-        # Calculate Features
-        # RPM Slope
-        res_rpm = linregress(win_time, win_rpm)
-        rpm_slope = res_rpm.slope if not np.isnan(res_rpm.slope) else 0.0
-        
-        # Speed Gain
-        delta_v = win_speed[-1] - win_speed[0]
-        time_to_deltav = win_time[-1] - win_time[0]
-        
-        # RPM-Speed Correlation
-        rpm_speed_corr = 0.0
-        if len(win_speed) > 2:
-            # Check variance to avoid div by zero
-            if np.std(win_rpm) > 0 and np.std(win_speed) > 0:
-                c = np.corrcoef(win_rpm, win_speed)
-                rpm_speed_corr = c[0,1] if not np.isnan(c[0,1]) else 0.0
+        apex_idx, exit_idx = corner
             
-        # Lat G Decay (on absolute values?) - track_analyzer uses abs(win_lat_g)
-        res_latg = linregress(win_time, np.abs(win_lat_g))
-        lat_g_decay = res_latg.slope if not np.isnan(res_latg.slope) else 0.0
-        
-        # Long Efficiency
-        delta_rpm = win_rpm[-1] - win_rpm[0]
-        long_efficiency = delta_v / delta_rpm if abs(delta_rpm) > 10 else 0.0
-        
-        # RPM Anomaly
-        predicted_rpm = res_rpm.slope * win_time + res_rpm.intercept
-        residuals = win_rpm - predicted_rpm
-        is_rpm_anomaly = False
-        if len(residuals) > 2:
-            std = np.std(residuals)
-            if std > 1e-6:
-                z = (residuals - np.mean(residuals)) / std
-                if np.any(np.abs(z) > 3.0):
-                    is_rpm_anomaly = True
-                    
+        # Extract Data Windows (features are computed for all laps at once below)
+        window = slice(apex_idx, exit_idx + 1)
+        win_time.append(time_all[rows][window])
+        win_speed.append(speed[window])
+        win_rpm.append(rpm_all[rows][window])
+        win_lat_g.append(lat_g_all[rows][window])
+        apexes.append((lap_num, speed[apex_idx], x[apex_idx], y[apex_idx]))
+        
+    if not apexes:
+        return []
+        
+    # Calculate Features
+    features = window_features(
+        np.concatenate(win_time),
+        np.concatenate(win_speed),
+        np.concatenate(win_rpm),
+        np.concatenate(win_lat_g),
+        [len(w) for w in win_time],
+        min_corr_len=3
+    )
+    
+    results = []
+    for k, (lap_num, apex_speed, apex_x, apex_y) in enumerate(apexes):
         results.append({
             "lap": int(lap_num),
-            "apex_speed": float(speed[apex_idx]),
-            "rpm_slope": float(rpm_slope),
-            "speed_gain": float(delta_v),
-            "time_to_deltav": float(time_to_deltav),
-            "rpm_speed_corr": float(rpm_speed_corr),
-            "lat_g_decay": float(lat_g_decay),
-            "long_efficiency": float(long_efficiency),
-            "rpm_anomaly": bool(is_rpm_anomaly),
-            "apex_x": float(x[apex_idx]),
-            "apex_y": float(y[apex_idx])
+            "apex_speed": float(apex_speed),
+            "rpm_slope": float(features["rpm_slope"][k]),
+            "speed_gain": float(features["speed_gain"][k]),
+            "time_to_deltav": float(features["time_to_deltav"][k]),
+            "rpm_speed_corr": float(features["rpm_speed_corr"][k]),
+            "lat_g_decay": float(features["lat_g_decay"][k]),
+            "long_efficiency": float(features["long_efficiency"][k]),
+            "rpm_anomaly": bool(features["rpm_anomaly"][k]),
+            "apex_x": float(apex_x),
+            "apex_y": float(apex_y)
         })
         
     return results
 
-def analyze_reference_fastest_lap(df, metadata):
+def analyze_reference_fastest_lap(df, metadata, lap_index=None, geometry=None):
     """
     Analyzes the fastest lap of a reference session and extracts features for detected corners.
     """
-    # 1. Parse Beacons & Find Fastest Lap
-    beacons = []
-    if "Beacon Markers" in metadata:
-        raw_markers = metadata["Beacon Markers"]
-        for m in raw_markers:
-            try:
-                val = float(str(m).strip().strip('"').strip("'"))
-                beacons.append(val)
-            except ValueError:
-                continue
-    
-    if len(beacons) < 2:
-        beacons = [df['Time'].min(), df['Time'].max()]
+    # 1. Lap Boundaries & Fastest Lap
+    if lap_index is None:
+        lap_index = LapIndex.from_metadata(df, metadata)
 
-    durations = np.diff(beacons)
-    valid_indices = [i for i, d in enumerate(durations) if d > 30.0]
+    durations = lap_index.durations
+    lap_number = _fastest_lap(durations)
     
-    if not valid_indices:
+    if lap_number is None:
         return {"error": "No valid laps found (>30s)"}
         
-    fastest_lap_idx = valid_indices[np.argmin(durations[valid_indices])]
-    lap_number = fastest_lap_idx + 1
-    lap_time = durations[fastest_lap_idx]
+    lap_time = durations[lap_number - 1]
 
-    start_time = beacons[fastest_lap_idx]
-    end_time = beacons[fastest_lap_idx+1]
-    
-    lap_data = df[(df['Time'] >= start_time) & (df['Time'] < end_time)].copy()
-    
-    if lap_data.empty:
+    if lap_index.lap_length(lap_number) == 0:
         return {"error": "Fastest lap data is empty"}
 
-    # 2. Geometry & Corner Detection
-    lat = lap_data['GPS Latitude'].values
-    lon = lap_data['GPS Longitude'].values
-    
-    x_raw, y_raw, origin = lat_lon_to_xy(lat, lon)
-    
-    window_len = 11
-    poly_order = 3
-    if len(x_raw) > window_len:
-        x = savgol_filter(x_raw, window_len, poly_order)
-        y = savgol_filter(y_raw, window_len, poly_order)
+    # 2. Geometry & Corner Detection (precomputed when the session geometry uses this lap)
+    if geometry is not None and geometry.lap_number == lap_number:
+        x, y, is_corner = geometry.x, geometry.y, geometry.is_corner
     else:
-        x, y = x_raw, y_raw
-        
-    curvature = calculate_curvature(x, y)
-    
-    corner_threshold = 0.03
-    seg_curvature = (curvature[:-1] + curvature[1:]) / 2
-    seg_curvature = np.append(seg_curvature, seg_curvature[-1]) 
-    
-    is_corner = seg_curvature >= corner_threshold
-    
-    seg_lengths = np.sqrt(np.diff(x, prepend=x[0])**2 + np.diff(y, prepend=y[0])**2)
-    
-    is_corner = _filter_segments(is_corner, seg_lengths, target_val=True, min_len=10.0)
-    is_corner = _filter_segments(is_corner, seg_lengths, target_val=False, min_len=20.0, invert_action=True)
+        lat = lap_index.lap(lap_number, 'GPS Latitude')
+        lon = lap_index.lap(lap_number, 'GPS Longitude')
+        x, y, _ = _smoothed_path(lat, lon)
+        _, is_corner, _ = _detect_corners(x, y)
     
     # 3. Extract Features per Corner
-    corners_data = []
-    
     padded = np.concatenate(([False], is_corner, [False]))
     diff = np.diff(padded.astype(int))
     starts = np.where(diff == 1)[0]
     ends = np.where(diff == -1)[0]
     
-    speed_arr = lap_data['GPS Speed'].values if 'GPS Speed' in lap_data.columns else np.zeros_like(x)
-    rpm_arr = lap_data['RPM'].values if 'RPM' in lap_data.columns else np.zeros_like(x)
-    time_arr = lap_data['Time'].values
-    lat_g_arr = lap_data['GPS LatAcc'].values if 'GPS LatAcc' in lap_data.columns else np.zeros_like(x)
+    speed_arr = lap_index.lap(lap_number, 'GPS Speed', fill_missing=True)
+    rpm_arr = lap_index.lap(lap_number, 'RPM', fill_missing=True)
+    time_arr = lap_index.lap(lap_number, 'Time')
+    lat_g_arr = lap_index.lap(lap_number, 'GPS LatAcc', fill_missing=True)
+    corner_ids, apex_indices, exit_indices = [], [], []
 
     for i, (start, end) in enumerate(zip(starts, ends)):
-        # Corner indices in lap_data
+        # Corner indices in the lap
         indices = np.arange(start, end)
         
         if len(indices) < 3:
@@ -431,65 +544,146 @@ def analyze_reference_fastest_lap(df, metadata):
         if exit_idx >= len(x):
             exit_idx = len(x) - 1
             
-        # Extract Windows
-        win_speed = speed_arr[apex_idx:exit_idx+1]
-        win_rpm = rpm_arr[apex_idx:exit_idx+1]
-        win_time = time_arr[apex_idx:exit_idx+1]
-        win_lat_g = lat_g_arr[apex_idx:exit_idx+1]
-        
-        if len(win_time) < 2:
+        if exit_idx - apex_idx < 1:
             continue
             
-        # Calculate Metrics
-        # RPM Slope
-        res_rpm = linregress(win_time, win_rpm)
-        rpm_slope = res_rpm.slope if not np.isnan(res_rpm.slope) else 0.0
-        
-        # Speed Gain
-        delta_v = win_speed[-1] - win_speed[0]
-        time_to_deltav = win_time[-1] - win_time[0]
-        
-        # RPM-Speed Corr
-        rpm_speed_corr = 0.0
-        if np.std(win_rpm) > 0 and np.std(win_speed) > 0:
-            c = np.corrcoef(win_rpm, win_speed)
-            rpm_speed_corr = c[0,1] if not np.isnan(c[0,1]) else 0.0
-            
-        # Lat G Decay
-        res_latg = linregress(win_time, np.abs(win_lat_g))
-        lat_g_decay = res_latg.slope if not np.isnan(res_latg.slope) else 0.0
-        
-        # Long Efficiency
-        delta_rpm = win_rpm[-1] - win_rpm[0]
-        long_efficiency = delta_v / delta_rpm if abs(delta_rpm) > 10 else 0.0
+        corner_ids.append(i + 1)
+        apex_indices.append(apex_idx)
+        exit_indices.append(exit_idx)
         
-        # RPM Anomaly
-        predicted_rpm = res_rpm.slope * win_time + res_rpm.intercept
-        residuals = win_rpm - predicted_rpm
-        is_rpm_anomaly = False
-        if len(residuals) > 2:
-            std = np.std(residuals)
-            if std > 1e-6:
-                z = (residuals - np.mean(residuals)) / std
-                if np.any(np.abs(z) > 3.0):
-                    is_rpm_anomaly = True
-                    
-        corners_data.append({
-            "corner_index": i + 1,
-            "apex_speed": float(speed_arr[apex_idx]),
-            "rpm_slope": float(rpm_slope),
-            "speed_gain": float(delta_v),
-            "time_to_deltav": float(time_to_deltav),
-            "rpm_speed_corr": float(rpm_speed_corr),
-            "lat_g_decay": float(lat_g_decay),
-            "long_efficiency": float(long_efficiency),
-            "rpm_anomaly": bool(is_rpm_anomaly),
-            "apex_x": float(x[apex_idx]),
-            "apex_y": float(y[apex_idx])
-        })
+    # Calculate Metrics for every corner at once
+    corners_data = []
+    if corner_ids:
+        indices, lengths = window_index(apex_indices, exit_indices)
+        features = window_features(
+            time_arr[indices],
+            speed_arr[indices],
+            rpm_arr[indices],
+            lat_g_arr[indices],
+            lengths
+        )
+        
+        for k, (corner_id, apex_idx) in enumerate(zip(corner_ids, apex_indices)):
+            corners_data.append({
+                "corner_index": corner_id,
+                "apex_speed": float(speed_arr[apex_idx]),
+                "rpm_slope": float(features["rpm_slope"][k]),
+                "speed_gain": float(features["speed_gain"][k]),
+                "time_to_deltav": float(features["time_to_deltav"][k]),
+                "rpm_speed_corr": float(features["rpm_speed_corr"][k]),
+                "lat_g_decay": float(features["lat_g_decay"][k]),
+                "long_efficiency": float(features["long_efficiency"][k]),
+                "rpm_anomaly": bool(features["rpm_anomaly"][k]),
+                "apex_x": float(x[apex_idx]),
+                "apex_y": float(y[apex_idx])
+            })
         
     return {
         "lap_number": int(lap_number),
         "lap_time": float(lap_time),
         "corners": corners_data
     }
+
+def corner_feature_table(df, metadata, lap_index=None, geometry=None, search_radius=30.0):
+    """
+    Features of every corner on every lap of a session, for cross-session history.
+
+    Corners are detected on the fastest lap (see build_track_geometry); each one is
+    located on every lap like a click on its reference apex in analyze_binding_selection.
+    Apexes carry their GPS position so rows of different sessions can be matched.
+
+    Returns:
+        list: One dict per (corner, lap): corner_index, lap, apex_lat, apex_lon and the
+        analyze_binding_selection features.
+    """
+    if lap_index is None:
+        lap_index = LapIndex.from_metadata(df, metadata)
+    if _fastest_lap(lap_index.durations) is None:
+        return []
+    if geometry is None:
+        geometry = build_track_geometry(lap_index)
+
+    time_all = lap_index.channel('Time')
+    lat_all = lap_index.channel('GPS Latitude')
+    lon_all = lap_index.channel('GPS Longitude')
+    speed_all = lap_index.channel('GPS Speed', fill_missing=True)
+    rpm_all = lap_index.channel('RPM', fill_missing=True)
+    lat_g_all = lap_index.channel('GPS LatAcc', fill_missing=True)
+
+    # Reference apex of each corner: slowest point of the corner on the fastest lap
+    baseline_speed = lap_index.lap(geometry.lap_number, 'GPS Speed', fill_missing=True)
+    padded = np.concatenate(([False], geometry.is_corner, [False]))
+    diff = np.diff(padded.astype(int))
+    corner_points = []
+    for start, end in zip(np.where(diff == 1)[0], np.where(diff == -1)[0]):
+        end = min(end, len(baseline_speed))
+        if end - start < 3:
+            continue
+        apex = start + int(np.argmin(baseline_speed[start:end]))
+        corner_points.append((geometry.x[apex], geometry.y[apex]))
+    if not corner_points:
+        return []
+    corner_points = np.array(corner_points)
+
+    keys, win_time, win_speed, win_rpm, win_lat_g = [], [], [], [], []
+    for i in range(len(lap_index)):
+        lap_num = i + 1
+        if lap_index.durations[i] < 30.0 or lap_index.lap_length(lap_num) < 10:
+            continue
+
+        rows = lap_index.rows(lap_num)
+        if isinstance(rows, slice):
+            x = geometry.session_x[rows]
+            y = geometry.session_y[rows]
+            l_cum_dists = geometry.session_distance[rows] - geometry.session_distance[rows.start]
+        else:
+            x, y, _ = lat_lon_to_xy(lat_all[rows], lon_all[rows], origin=geometry.origin)
+            l_dists = np.sqrt(np.diff(x, prepend=x[0])**2 + np.diff(y, prepend=y[0])**2)
+            l_cum_dists = np.cumsum(l_dists)
+
+        # One tree per lap, queried with every corner at once
+        l_dist, l_nearest = KDTree(np.column_stack((x, y))).query(corner_points)
+        speed = speed_all[rows]
+        for corner_index, (dist, nearest_idx) in enumerate(zip(l_dist, l_nearest), 1):
+            if dist > 20.0:
+                continue
+            corner = _corner_window(x, y, l_cum_dists, speed, nearest_idx, search_radius)
+            if corner is None:
+                continue
+            apex_idx, exit_idx = corner
+            window = slice(apex_idx, exit_idx + 1)
+            win_time.append(time_all[rows][window])
+            win_speed.append(speed[window])
+            win_rpm.append(rpm_all[rows][window])
+            win_lat_g.append(lat_g_all[rows][window])
+            keys.append((corner_index, lap_num, lat_all[rows][apex_idx], lon_all[rows][apex_idx], speed[apex_idx]))
+
+    if not keys:
+        return []
+
+    features = window_features(
+        np.concatenate(win_time),
+        np.concatenate(win_speed),
+        np.concatenate(win_rpm),
+        np.concatenate(win_lat_g),
+        [len(w) for w in win_time],
+        min_corr_len=3
+    )
+
+    table = []
+    for k, (corner_index, lap_num, apex_lat, apex_lon, apex_speed) in enumerate(keys):
+        table.append({
+            "corner_index": corner_index,
+            "lap": int(lap_num),
+            "apex_lat": float(apex_lat),
+            "apex_lon": float(apex_lon),
+            "apex_speed": float(apex_speed),
+            "rpm_slope": float(features["rpm_slope"][k]),
+            "speed_gain": float(features["speed_gain"][k]),
+            "time_to_deltav": float(features["time_to_deltav"][k]),
+            "rpm_speed_corr": float(features["rpm_speed_corr"][k]),
+            "lat_g_decay": float(features["lat_g_decay"][k]),
+            "long_efficiency": float(features["long_efficiency"][k]),
+            "rpm_anomaly": bool(features["rpm_anomaly"][k])
+        })
+    return table
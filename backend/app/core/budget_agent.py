@@ -1,6 +1,5 @@
-import os
 import json
-from mistralai import Mistral
+from app.core.ai_client import chat_complete, load_prompt
 
 def process_budget_chat(messages, api_key):
     """
@@ -19,14 +18,9 @@ def process_budget_chat(messages, api_key):
     if not api_key:
         return {"type": "error", "content": "API Key is missing."}
 
-    client = Mistral(api_key=api_key)
-
     # Load System Prompt
     try:
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        prompt_path = os.path.join(current_dir, "budget_prompt.md")
-        with open(prompt_path, "r", encoding="utf-8") as f:
-            system_prompt = f.read()
+        system_prompt = load_prompt("budget_prompt.md")
     except FileNotFoundError:
         return {"type": "error", "content": "System prompt not found."}
 
@@ -49,12 +43,8 @@ def process_budget_chat(messages, api_key):
             })
 
     try:
-        chat_response = client.chat.complete(
-            model="mistral-large-latest",
-            messages=final_messages
-        )
-        
-        content = chat_response.choices[0].message.content.strip()
+        # Actions depend on the budget state, not only on the conversation: never cached
+        content = chat_complete(api_key, final_messages, cache=False).strip()
         
         # Check if it's the JSON action
         # The prompt says "Output structured JSON ONLY... No additional text"
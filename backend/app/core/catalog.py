@@ -0,0 +1,365 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import math
+from datetime import datetime
+
+# SQLite file indexing every uploaded/ingested session
+CATALOG_DB = os.getenv("CATALOG_DB", "catalog.db")
+
+# compute_circuit_characteristics keys stored as columns
+FEATURE_COLUMNS = {
+    "Downforce": "downforce",
+    "Braking": "braking",
+    "Tyre Wear": "tyre_wear",
+    "Mechanical Grip": "mechanical_grip",
+    "Engine": "engine",
+}
+
+SESSION_COLUMNS = (
+    "storage_path", "user_id", "track_id", "filename", "venue", "vehicle", "driver",
+    "session_date", "uploaded_at", "sample_rate", "duration", "lap_count",
+    "best_lap", "average_lap", "regularity", "theoretical_lap",
+) + tuple(FEATURE_COLUMNS.values()) + ("metadata",)
+
+# corner_feature_table columns
+CORNER_FEATURES = (
+    "apex_speed", "rpm_slope", "speed_gain", "time_to_deltav", "rpm_speed_corr",
+    "lat_g_decay", "long_efficiency", "rpm_anomaly",
+)
+CORNER_COLUMNS = ("storage_path", "corner_index", "lap", "apex_lat", "apex_lon") + CORNER_FEATURES
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS sessions ("
+    "storage_path TEXT PRIMARY KEY, user_id TEXT, track_id TEXT, filename TEXT, "
+    "venue TEXT COLLATE NOCASE, vehicle TEXT COLLATE NOCASE, driver TEXT COLLATE NOCASE, "
+    "session_date TEXT, uploaded_at REAL, sample_rate REAL, duration REAL, lap_count INTEGER, "
+    "best_lap REAL, average_lap REAL, regularity REAL, theoretical_lap REAL, "
+    "downforce REAL, braking REAL, tyre_wear REAL, mechanical_grip REAL, engine REAL, "
+    "metadata TEXT)",
+    "CREATE TABLE IF NOT EXISTS laps ("
+    "storage_path TEXT, lap_number INTEGER, lap_time REAL, "
+    "PRIMARY KEY (storage_path, lap_number))",
+    "CREATE TABLE IF NOT EXISTS corner_features ("
+    "storage_path TEXT, corner_index INTEGER, lap INTEGER, apex_lat REAL, apex_lon REAL, "
+    "apex_speed REAL, rpm_slope REAL, speed_gain REAL, time_to_deltav REAL, rpm_speed_corr REAL, "
+    "lat_g_decay REAL, long_efficiency REAL, rpm_anomaly INTEGER, "
+    "PRIMARY KEY (storage_path, corner_index, lap))",
+    "CREATE INDEX IF NOT EXISTS corner_features_apex ON corner_features (apex_lat, apex_lon)",
+    "CREATE INDEX IF NOT EXISTS sessions_venue ON sessions (venue, session_date)",
+    "CREATE INDEX IF NOT EXISTS sessions_driver ON sessions (driver, session_date)",
+    "CREATE INDEX IF NOT EXISTS sessions_user ON sessions (user_id, track_id, session_date)",
+    "CREATE INDEX IF NOT EXISTS sessions_date ON sessions (session_date)",
+]
+
+# AiM header formats: "Saturday, May 4, 2024" + "10:30 AM"
+DATE_FORMATS = ("%A, %B %d, %Y", "%d/%m/%Y", "%m/%d/%Y", "%Y-%m-%d")
+TIME_FORMATS = ("%I:%M %p", "%H:%M:%S", "%H:%M")
+
+def _first(metadata, key):
+    value = (metadata or {}).get(key)
+    if isinstance(value, list):
+        value = value[0] if value else None
+    return value or None
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def _finite(value):
+    """Float value, None (stored as NULL) for NaN, infinity and non-numbers."""
+    value = _float(value)
+    return value if value is not None and math.isfinite(value) else None
+
+def parse_session_date(metadata):
+    """ISO timestamp of the session from the AiM 'Date'/'Time' header fields, or None."""
+    date_str = _first(metadata, "Date")
+    if not date_str:
+        return None
+    for date_format in DATE_FORMATS:
+        try:
+            day = datetime.strptime(date_str.strip(), date_format)
+            break
+        except ValueError:
+            continue
+    else:
+        return None
+
+    time_str = _first(metadata, "Time")
+    for time_format in TIME_FORMATS:
+        try:
+            clock = datetime.strptime((time_str or "").strip(), time_format)
+            day = day.replace(hour=clock.hour, minute=clock.minute, second=clock.second)
+            break
+        except ValueError:
+            continue
+    return day.isoformat()
+
+def parse_storage_path(storage_path):
+    """(user_id, track_id, filename) from sessions/{user_id}/{track_id}/{timestamp}_{filename}."""
+    parts = storage_path.split("/")
+    if len(parts) == 4 and parts[0] == "sessions":
+        return parts[1], parts[2], parts[3].split("_", 1)[-1]
+    return None, None, parts[-1]
+
+
+class Catalog:
+    """
+    Indexed SQLite catalog of sessions: AiM header fields, lap times and circuit features.
+
+    Answers track/driver/date queries from indexes instead of listing the bucket.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        # Opened on first use so importing the module never touches the disk
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            for statement in SCHEMA:
+                conn.execute(statement)
+            self._conn = conn
+        return self._conn
+
+    def upsert_session(self, storage_path, metadata, lap_metrics=None, characteristics=None,
+                       user_id=None, track_id=None, uploaded_at=None, corners=None):
+        """
+        Inserts or replaces a session and its laps.
+
+        Args:
+            storage_path (str): GCS blob name (or archive path for ingested sessions).
+            metadata (dict): AiM header metadata.
+            lap_metrics (dict): compute_lap_metrics output.
+            characteristics (dict): compute_circuit_characteristics output.
+            user_id (str): Owner; parsed from storage_path when omitted.
+            track_id (str): Track id; parsed from storage_path when omitted.
+            uploaded_at (float): Unix time; now when omitted.
+            corners (list): corner_feature_table rows; existing ones are kept when None.
+        """
+        lap_metrics = lap_metrics or {}
+        characteristics = characteristics or {}
+        path_user, path_track, filename = parse_storage_path(storage_path)
+        laps = [float(l) for l in lap_metrics.get("laps", [])]
+
+        row = {
+            "storage_path": storage_path,
+            "user_id": user_id or path_user,
+            "track_id": track_id or path_track,
+            "filename": filename,
+            "venue": _first(metadata, "Venue"),
+            "vehicle": _first(metadata, "Vehicle"),
+            "driver": _first(metadata, "User") or _first(metadata, "Racer"),
+            "session_date": parse_session_date(metadata),
+            "uploaded_at": uploaded_at if uploaded_at is not None else time.time(),
+            "sample_rate": _float(_first(metadata, "Sample Rate")),
+            "duration": _float(_first(metadata, "Duration")),
+            "lap_count": len(laps),
+            "best_lap": _float(lap_metrics.get("best_lap")) or None,
+            "average_lap": _float(lap_metrics.get("average_lap")) or None,
+            "regularity": _float(lap_metrics.get("regularity")),
+            "theoretical_lap": _float(lap_metrics.get("theoretical_lap")) or None,
+            "metadata": json.dumps(metadata or {}),
+        }
+        for key, column in FEATURE_COLUMNS.items():
+            row[column] = _float(characteristics.get(key))
+
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN")
+            try:
+                conn.execute(
+                    f"INSERT OR REPLACE INTO sessions ({', '.join(SESSION_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(SESSION_COLUMNS))})",
+                    [row[c] for c in SESSION_COLUMNS]
+                )
+                conn.execute("DELETE FROM laps WHERE storage_path = ?", (storage_path,))
+                conn.executemany(
+                    "INSERT INTO laps (storage_path, lap_number, lap_time) VALUES (?, ?, ?)",
+                    [(storage_path, i + 1, lap_time) for i, lap_time in enumerate(laps)]
+                )
+                if corners is not None:
+                    conn.execute("DELETE FROM corner_features WHERE storage_path = ?", (storage_path,))
+                    conn.executemany(
+                        f"INSERT INTO corner_features ({', '.join(CORNER_COLUMNS)}) "
+                        f"VALUES ({', '.join('?' * len(CORNER_COLUMNS))})",
+                        [
+                            [storage_path, corner["corner_index"], corner["lap"]]
+                            + [_finite(corner[c]) for c in CORNER_COLUMNS[3:]]
+                            for corner in corners
+                        ]
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def query(self, venue=None, driver=None, user_id=None, track_id=None,
+              date_from=None, date_to=None, limit=100, include_laps=False):
+        """
+        Sessions matching every given filter, most recent first.
+
+        venue and driver match case-insensitively; date_from/date_to are ISO dates (inclusive).
+
+        Returns:
+            list: Session dicts (metadata decoded), with a 'laps' list if include_laps.
+        """
+        filters = []
+        params = []
+        for column, value in (("venue", venue), ("driver", driver), ("user_id", user_id), ("track_id", track_id)):
+            if value is not None:
+                filters.append(f"{column} = ?")
+                params.append(value)
+        if date_from:
+            filters.append("session_date >= ?")
+            params.append(date_from)
+        if date_to:
+            filters.append("session_date < ?")
+            # Inclusive end date: anything before the next day
+            params.append(date_to + "\uffff")
+
+        sql = f"SELECT {', '.join(SESSION_COLUMNS)} FROM sessions"
+        if filters:
+            sql += " WHERE " + " AND ".join(filters)
+        sql += " ORDER BY session_date DESC, uploaded_at DESC LIMIT ?"
+        params.append(int(limit))
+
+        with self._lock:
+            conn = self._connection()
+            sessions = [dict(r) for r in conn.execute(sql, params).fetchall()]
+            if include_laps and sessions:
+                paths = [s["storage_path"] for s in sessions]
+                laps = {}
+                rows = conn.execute(
+                    f"SELECT storage_path, lap_time FROM laps WHERE storage_path IN ({', '.join('?' * len(paths))}) "
+                    "ORDER BY storage_path, lap_number",
+                    paths
+                ).fetchall()
+                for r in rows:
+                    laps.setdefault(r["storage_path"], []).append(r["lap_time"])
+
+        for session in sessions:
+            session["metadata"] = json.loads(session["metadata"]) if session["metadata"] else {}
+            if include_laps:
+                session["laps"] = laps.get(session["storage_path"], [])
+        return sessions
+
+    def corner_history(self, lat, lon, radius=25.0, venue=None, driver=None, user_id=None,
+                       track_id=None, date_from=None, date_to=None, limit=500):
+        """
+        Per-session features of the corner whose apex lies near (lat, lon), oldest session first.
+
+        Reads the precomputed corner_features rows only (no telemetry is loaded). In each
+        session the corner with the apexes closest to the point is kept and its features
+        are averaged over the laps.
+
+        Returns:
+            list: Dicts with the session fields (storage_path, session_date, venue, driver,
+            best_lap), corner_index, laps, distance (m), per-feature means, best_apex_speed
+            and rpm_anomaly_rate; a feature no lap has a value for (NULL) is None.
+        """
+        # Bounding box on the apex index, exact distance below
+        dlat = math.degrees(radius / 6378137.0)
+        dlon = dlat / max(math.cos(math.radians(lat)), 1e-6)
+        filters = ["c.apex_lat BETWEEN ? AND ?", "c.apex_lon BETWEEN ? AND ?"]
+        params = [lat - dlat, lat + dlat, lon - dlon, lon + dlon]
+        for column, value in (("venue", venue), ("driver", driver), ("user_id", user_id), ("track_id", track_id)):
+            if value is not None:
+                filters.append(f"s.{column} = ?")
+                params.append(value)
+        if date_from:
+            filters.append("s.session_date >= ?")
+            params.append(date_from)
+        if date_to:
+            filters.append("s.session_date < ?")
+            params.append(date_to + "\uffff")
+
+        sql = (
+            f"SELECT s.session_date, s.uploaded_at, s.venue, s.driver, s.best_lap, "
+            f"{', '.join('c.' + c for c in CORNER_COLUMNS)} "
+            f"FROM corner_features c JOIN sessions s ON s.storage_path = c.storage_path "
+            f"WHERE {' AND '.join(filters)}"
+        )
+        with self._lock:
+            rows = [dict(r) for r in self._connection().execute(sql, params).fetchall()]
+
+        # Group by (session, corner) and keep the closest corner of each session
+        groups = {}
+        for row in rows:
+            d_north = (row["apex_lat"] - lat) * 111132.92
+            d_east = (row["apex_lon"] - lon) * 111412.84 * math.cos(math.radians(lat))
+            row["distance"] = math.hypot(d_north, d_east)
+            if row["distance"] <= radius:
+                groups.setdefault((row["storage_path"], row["corner_index"]), []).append(row)
+
+        best = {}
+        for (storage_path, corner_index), laps in groups.items():
+            distance = sorted(r["distance"] for r in laps)[len(laps) // 2]
+            if storage_path not in best or distance < best[storage_path][0]:
+                best[storage_path] = (distance, corner_index, laps)
+
+        history = []
+        for storage_path, (distance, corner_index, laps) in best.items():
+            first = laps[0]
+            entry = {
+                "storage_path": storage_path,
+                "session_date": first["session_date"],
+                "uploaded_at": first["uploaded_at"],
+                "venue": first["venue"],
+                "driver": first["driver"],
+                "best_lap": first["best_lap"],
+                "corner_index": corner_index,
+                "laps": len(laps),
+                "distance": distance,
+                "best_apex_speed": max((r["apex_speed"] for r in laps if r["apex_speed"] is not None), default=None),
+                "rpm_anomaly_rate": _mean(r["rpm_anomaly"] for r in laps),
+            }
+            for feature in CORNER_FEATURES:
+                if feature != "rpm_anomaly":
+                    entry[feature] = _mean(r[feature] for r in laps)
+            history.append(entry)
+
+        history.sort(key=lambda e: (e["session_date"] or "", e["uploaded_at"] or 0))
+        return history[-int(limit):]
+
+
+def _mean(values):
+    """Mean of the values that are not None (NaN features are stored as NULL), None if none is left."""
+    values = [v for v in values if v is not None]
+    return sum(values) / len(values) if values else None
+
+def feature_trends(history):
+    """
+    Least-squares slope of every corner feature across the sessions of a history.
+
+    Sessions without a value for a feature (None) are left out of its fit, keeping
+    their position in the history.
+
+    Returns:
+        dict: Feature -> change per session (0.0 with fewer than two sessions with a value).
+    """
+    trends = {}
+    features = [f for f in CORNER_FEATURES if f != "rpm_anomaly"] + ["rpm_anomaly_rate"]
+    for feature in features:
+        points = [(i, e[feature]) for i, e in enumerate(history) if e[feature] is not None]
+        if len(points) < 2:
+            trends[feature] = 0.0
+            continue
+        mean_x = sum(i for i, _ in points) / len(points)
+        mean_y = sum(y for _, y in points) / len(points)
+        s_xy = sum((i - mean_x) * (y - mean_y) for i, y in points)
+        s_xx = sum((i - mean_x) ** 2 for i, _ in points)
+        trends[feature] = s_xy / s_xx
+    return trends
+
+
+# Shared by all endpoints of the process
+catalog = Catalog(CATALOG_DB)
@@ -1,54 +1,65 @@
 import pandas as pd
-import io
 import csv
+from app.core.session_store import is_parquet, read_session_parquet
+from app.core.telemetry import compact_frame, select_channels, channel_dtype
 
-def load_csv(file):
+# AiM data header (quoted or not), e.g. "Time","GPS Speed",...
+HEADER_PREFIXES = (b'"Time","GPS Speed"', b'Time,GPS Speed')
+
+def load_csv(file, channels=None):
     """
     Loads an AiM CSV file and extracts metadata.
-    
+    Parquet session sidecars (see session_store) are detected and loaded directly.
+
     Args:
         file: File path or file-like object (uploaded file).
-        
+        channels (iterable): Channels to load (see telemetry.ANALYSIS_CHANNELS), None for
+            all. The others are skipped by the parser.
+
     Returns:
-        tuple: (pd.DataFrame, dict) -> (df, metadata)
+        tuple: (pd.DataFrame, dict) -> (df, metadata), df being a compact frame
+        (telemetry.compact_frame): float32 channels, float64 Time and GPS position.
     """
-    metadata = {}
-    
     # Ensure we have a file-like object
     if not hasattr(file, 'read'):
         with open(file, 'rb') as f:
-            content_bytes = f.read()
-    else:
-        # It's a file-like object
-        # Save current position if needed, but we usually start from 0
-        file.seek(0)
-        content_bytes = file.read()
-        
-    # Decode content
-    try:
-        content_str = content_bytes.decode('utf-8')
-    except UnicodeDecodeError:
-        content_str = content_bytes.decode('latin-1', errors='ignore')
-        
-    all_lines = content_str.splitlines()
-    data_start_line = 0
-    
+            return _load_stream(f, channels)
+
+    # It's a file-like object, we usually start from 0
+    file.seek(0)
+    return _load_stream(file, channels)
+
+def _load_stream(stream, channels=None):
+    """
+    Single pass over a binary stream: the metadata block is read line by line until the
+    data header, then pandas parses the rest of the same stream with float dtypes.
+    Nothing but the header lines is ever held as text.
+    """
+    # Typed columnar sidecar, no text parsing needed
+    head = stream.read(4)
+    stream.seek(0)
+    if is_parquet(head):
+        return read_session_parquet(stream, channels)
+
+    metadata = {}
+    header_line = None
+
     # Parse Metadata & Find Header
-    for idx, line in enumerate(all_lines):
-        line_stripped = line.strip()
-        
+    for raw_line in iter(stream.readline, b''):
+        line_stripped = raw_line.strip()
+
         # Check for Data Header (AiM usually starts with Time or "Time")
         # The user example has "Time","GPS Speed"...
-        if line_stripped.startswith('"Time","GPS Speed"') or line_stripped.startswith('Time,GPS Speed'):
-            data_start_line = idx
+        if line_stripped.startswith(HEADER_PREFIXES):
+            header_line = _decode_line(line_stripped)
             break
-            
+
         # Parse Metadata
         try:
             # Use csv reader to handle quoted values correctly
-            reader = csv.reader([line_stripped])
+            reader = csv.reader([_decode_line(line_stripped)])
             parts = next(reader)
-            
+
             if len(parts) >= 2:
                 key = parts[0]
                 # Store list for these specific keys
@@ -58,22 +69,78 @@ def load_csv(file):
                     metadata[key] = parts[1]
         except:
             continue
-            
+
     # Load DataFrame
-    # Create a new stream for pandas
-    data_stream = io.StringIO(content_str)
-    
-    # Skip rows until data_start_line
     try:
-        df = pd.read_csv(data_stream, skiprows=range(0, data_start_line))
+        if header_line is None:
+            # No AiM header found, let pandas take the first line as header
+            stream.seek(0)
+            df = pd.read_csv(stream, encoding='latin-1')
+        else:
+            names = _column_names(header_line)
+            _skip_units_lines(stream)
+            df = _read_channels(stream, names, select_channels(names, channels))
     except Exception as e:
         print(f"Error loading CSV data: {e}")
         df = pd.DataFrame() # Return empty on failure
-        
+
     # Clean columns
     df.columns = df.columns.str.strip().str.replace('"', '')
-    
-    # Numeric conversion
-    df = df.apply(pd.to_numeric, errors='coerce')
-    
-    return df, metadata
+
+    # Channel selection, numeric conversion and storage dtypes (no copy of unread channels)
+    return compact_frame(df, channels), metadata
+
+def _skip_units_lines(stream):
+    """
+    Moves the stream past the lines between the data header and the first sample: the
+    units line Race Studio writes under the channel names, and blank lines.
+    """
+    while True:
+        position = stream.tell()
+        line = stream.readline()
+        if not line:
+            return
+        first = line.strip().split(b',', 1)[0].strip().strip(b'"').strip()
+        if not first:
+            continue
+        try:
+            float(first)
+        except ValueError:
+            continue
+        stream.seek(position)
+        return
+
+def _read_channels(stream, names, usecols):
+    """Parses the usecols channels of the data block that follows the header line, at the current stream position."""
+    data_start = stream.tell()
+    try:
+        # Fast path: every cell is a number, parsed straight to the storage dtype
+        return pd.read_csv(
+            stream, header=None, names=names, usecols=usecols,
+            dtype={name: channel_dtype(name) for name in usecols}, encoding='latin-1'
+        )
+    except ValueError:
+        # Non-numeric cells in the data, parse as text and coerce in compact_frame
+        stream.seek(data_start)
+        return pd.read_csv(stream, header=None, names=names, usecols=usecols, encoding='latin-1')
+
+def _column_names(header_line):
+    """Splits the data header into cleaned, de-duplicated column names."""
+    names = []
+    seen = {}
+    for name in next(csv.reader([header_line])):
+        name = name.strip().replace('"', '')
+        if name in seen:
+            # Same suffixing pandas applies to duplicate headers
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+def _decode_line(line):
+    try:
+        return line.decode('utf-8')
+    except UnicodeDecodeError:
+        return line.decode('latin-1', errors='ignore')
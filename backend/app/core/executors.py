@@ -0,0 +1,77 @@
+import os
+import asyncio
+import functools
+import threading
+import contextvars
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from app.core.metrics import span, stage_name, traced
+
+# Blocking I/O (GCS, HTTP, Mistral) and analyses on shared in-memory sessions
+IO_WORKERS = int(os.getenv("IO_WORKERS", "16"))
+# Self-contained CPU work (CSV parsing); 0 runs it on the I/O pool instead
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", "2"))
+
+_io_pool = None
+_cpu_pool = None
+_lock = threading.Lock()
+
+def _get_io_pool():
+    global _io_pool
+    with _lock:
+        if _io_pool is None:
+            _io_pool = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="io")
+        return _io_pool
+
+def _get_cpu_pool():
+    global _cpu_pool
+    with _lock:
+        if _cpu_pool is None:
+            # spawn: forking a process that already runs threads is unsafe
+            _cpu_pool = ProcessPoolExecutor(max_workers=CPU_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _cpu_pool
+
+async def run_io(func, *args, **kwargs):
+    """
+    Runs a blocking call on the bounded I/O thread pool without blocking the event loop.
+
+    The call runs in a copy of the caller's context and is timed as a stage of the
+    current request (see metrics.traced), named after the function.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_get_io_pool(), functools.partial(context.run, traced(func), *args, **kwargs))
+
+async def run_cpu(func, *args, **kwargs):
+    """
+    Runs CPU-bound work in the process pool.
+
+    func must be a module-level function and its arguments and result picklable. The
+    stage is timed from the event loop (pickling included) and never profiled.
+    """
+    global _cpu_pool
+    if CPU_WORKERS <= 0:
+        return await run_io(func, *args, **kwargs)
+    loop = asyncio.get_running_loop()
+    pool = _get_cpu_pool()
+    with span(stage_name(func)):
+        try:
+            return await loop.run_in_executor(pool, functools.partial(func, *args, **kwargs))
+        except BrokenProcessPool:
+            # A worker died (OOM kill, ...): replace the pool for later calls and finish this one in a thread
+            print("CPU process pool broken, recreating it")
+            with _lock:
+                if _cpu_pool is pool:
+                    _cpu_pool = None
+            return await loop.run_in_executor(_get_io_pool(), functools.partial(func, *args, **kwargs))
+
+def shutdown_executors():
+    global _io_pool, _cpu_pool
+    with _lock:
+        if _cpu_pool is not None:
+            _cpu_pool.shutdown(cancel_futures=True)
+            _cpu_pool = None
+        if _io_pool is not None:
+            _io_pool.shutdown(wait=False, cancel_futures=True)
+            _io_pool = None
@@ -0,0 +1,107 @@
+import os
+import json
+import threading
+
+# GCS bucket configuration
+GCS_BUCKET_NAME = os.getenv("GCS_BUCKET_NAME", "karting-sessions-483220")
+# HTTP connections kept alive to storage.googleapis.com, sized for the I/O thread pool
+GCS_POOL_SIZE = int(os.getenv("GCS_POOL_SIZE", os.getenv("IO_WORKERS", "16")))
+# Size of the pieces uploads and downloads are streamed in; GCS needs a multiple of 256 KB
+TRANSFER_CHUNK_SIZE = max(1, int(os.getenv("TRANSFER_CHUNK_KB", "1024")) // 256) * 256 * 1024
+
+_client = None
+_bucket = None
+_lock = threading.Lock()
+
+def _create_client():
+    # The storage library is imported with the first client, not with the app
+    from google.cloud import storage
+
+    # Local fake GCS server (fake-gcs-server, ...): no credentials, the library reads the host itself
+    if os.getenv("STORAGE_EMULATOR_HOST"):
+        from google.auth.credentials import AnonymousCredentials
+        return storage.Client(project=os.getenv("GCS_PROJECT", "test"), credentials=AnonymousCredentials())
+
+    # Try to load from environment variable (JSON string) first - useful for Render
+    creds_json = os.getenv("GOOGLE_CREDENTIALS_JSON")
+    if creds_json:
+        try:
+            from google.oauth2 import service_account
+            creds_dict = json.loads(creds_json)
+            credentials = service_account.Credentials.from_service_account_info(creds_dict)
+            return storage.Client(credentials=credentials)
+        except Exception as e:
+            print(f"Error loading credentials from env: {e}")
+            # Fallback to file if env loading fails
+
+    # Fallback to local file
+    try:
+        return storage.Client.from_service_account_json("service-account-key.json")
+    except Exception as e:
+        print(f"Error loading credentials from file: {e}")
+        # Last resort: default credentials (if running on GCP)
+        return storage.Client()
+
+def _mount_pool(client):
+    """Enlarges the keep-alive connection pool of the client's authorized session."""
+    import requests
+    adapter = requests.adapters.HTTPAdapter(pool_connections=GCS_POOL_SIZE, pool_maxsize=GCS_POOL_SIZE, max_retries=3)
+    client._http.mount("https://", adapter)
+    client._http.mount("http://", adapter)
+
+def get_gcs_client():
+    """
+    Process-wide storage client.
+
+    Built once, so credentials are parsed and the TLS/auth handshakes happen on the first
+    call only; the authorized session refreshes its token by itself when it expires.
+    """
+    global _client
+    with _lock:
+        if _client is None:
+            client = _create_client()
+            try:
+                _mount_pool(client)
+            except Exception as e:
+                print(f"Could not resize the GCS connection pool: {e}")
+            _client = client
+        return _client
+
+def get_bucket():
+    """
+    Shared handle on GCS_BUCKET_NAME.
+
+    The bucket is checked (and created if missing) once per process instead of on every upload.
+    """
+    global _bucket
+    if _bucket is not None:
+        return _bucket
+
+    from google.cloud.storage.retry import DEFAULT_RETRY
+
+    client = get_gcs_client()
+    with _lock:
+        if _bucket is None:
+            bucket = client.bucket(GCS_BUCKET_NAME)
+            try:
+                # Runs at startup: bounded retries so an unreachable GCS does not hold the app for minutes
+                if not bucket.exists(timeout=10, retry=DEFAULT_RETRY.with_timeout(30)):
+                    bucket = client.create_bucket(GCS_BUCKET_NAME)
+                    print(f"Created bucket {GCS_BUCKET_NAME}")
+            except Exception as e:
+                # Object-level roles may not allow bucket lookups, the handle still works for blobs
+                print(f"Error checking bucket {GCS_BUCKET_NAME}: {e}")
+            _bucket = bucket
+        return _bucket
+
+def close_gcs_client():
+    """Closes the shared client's connections (app shutdown)."""
+    global _client, _bucket
+    with _lock:
+        if _client is not None:
+            try:
+                _client.close()
+            except Exception as e:
+                print(f"Error closing GCS client: {e}")
+        _client = None
+        _bucket = None
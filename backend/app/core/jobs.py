@@ -0,0 +1,321 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import traceback
+
+# Analyses running at the same time; the others wait in the queue
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "4"))
+# Seconds a finished job (and its result) is kept for polling and deduplication
+JOB_TTL = float(os.getenv("JOB_TTL", "3600"))
+# SQLite file backing the queue; unset keeps jobs in process memory
+JOBS_DB = os.getenv("JOBS_DB")
+# Seconds between store reads when following a job run by another worker
+REMOTE_POLL_INTERVAL = 1.0
+# Seconds between the refreshes of updated_at on the queued and running jobs of a worker
+JOB_HEARTBEAT = float(os.getenv("JOB_HEARTBEAT", "30"))
+# A queued or running job not refreshed for this long lost its worker (crash, restart)
+JOB_STALE_AFTER = 4 * JOB_HEARTBEAT
+STALE_ERROR = "Interrupted: the worker running this job stopped"
+
+QUEUED, RUNNING, DONE, ERROR = "queued", "running", "done", "error"
+FINISHED = (DONE, ERROR)
+
+
+def job_view(job):
+    """Public fields of a job record."""
+    return {
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "result": job["result"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"]
+    }
+
+
+class MemoryJobStore:
+    """Job records kept in process memory."""
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def create(self, job):
+        with self._lock:
+            self._jobs[job["id"]] = dict(job)
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def touch(self, job_ids, now):
+        """Refreshes updated_at of the unfinished jobs among job_ids (worker heartbeat)."""
+        with self._lock:
+            for job_id in job_ids:
+                job = self._jobs.get(job_id)
+                if job is not None and job["status"] not in FINISHED:
+                    job["updated_at"] = now
+
+    def find_reusable(self, fingerprint, alive_after):
+        """Successfully finished job with the same fingerprint, or one queued/running refreshed after alive_after."""
+        with self._lock:
+            for job in self._jobs.values():
+                if job["fingerprint"] != fingerprint or job["status"] == ERROR:
+                    continue
+                if job["status"] == DONE or job["updated_at"] >= alive_after:
+                    return dict(job)
+        return None
+
+    def purge(self, before, stale_before):
+        """Deletes jobs finished before `before`, fails unfinished ones not refreshed since stale_before."""
+        now = time.time()
+        with self._lock:
+            for job_id in [i for i, j in self._jobs.items() if j["status"] in FINISHED and j["updated_at"] < before]:
+                del self._jobs[job_id]
+            for job in self._jobs.values():
+                if job["status"] not in FINISHED and job["updated_at"] < stale_before:
+                    job.update(status=ERROR, error=STALE_ERROR, updated_at=now)
+
+
+class SQLiteJobStore:
+    """
+    Job records in a SQLite file.
+
+    Results survive restarts and are visible to every worker process sharing the file,
+    so a job submitted to one worker can be polled through another.
+    """
+
+    COLUMNS = ("id", "kind", "fingerprint", "status", "result", "error", "created_at", "updated_at")
+
+    def __init__(self, path):
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT, fingerprint TEXT, status TEXT, "
+                "result TEXT, error TEXT, created_at REAL, updated_at REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_fingerprint ON jobs (fingerprint)")
+
+    def _row(self, row):
+        if row is None:
+            return None
+        job = dict(zip(self.COLUMNS, row))
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def create(self, job):
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO jobs ({', '.join(self.COLUMNS)}) VALUES ({', '.join('?' * len(self.COLUMNS))})",
+                [json.dumps(job[c]) if c == "result" and job[c] is not None else job[c] for c in self.COLUMNS]
+            )
+
+    def update(self, job_id, **fields):
+        if "result" in fields and fields["result"] is not None:
+            fields["result"] = json.dumps(fields["result"])
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET {', '.join(f'{k} = ?' for k in fields)} WHERE id = ?",
+                list(fields.values()) + [job_id]
+            )
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute(f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row(row)
+
+    def touch(self, job_ids, now):
+        job_ids = list(job_ids)
+        if not job_ids:
+            return
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET updated_at = ? WHERE status IN (?, ?) AND id IN ({', '.join('?' * len(job_ids))})",
+                [now, QUEUED, RUNNING] + job_ids
+            )
+
+    def find_reusable(self, fingerprint, alive_after):
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE fingerprint = ? "
+                "AND (status = ? OR (status IN (?, ?) AND updated_at >= ?)) "
+                "ORDER BY created_at DESC LIMIT 1",
+                (fingerprint, DONE, QUEUED, RUNNING, alive_after)
+            ).fetchone()
+        return self._row(row)
+
+    def purge(self, before, stale_before):
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?", (DONE, ERROR, before))
+            # No heartbeat for JOB_STALE_AFTER: the process running it is gone (restart, crash);
+            # failed now, deleted by a later purge
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE status IN (?, ?) AND updated_at < ?",
+                (ERROR, STALE_ERROR, time.time(), QUEUED, RUNNING, stale_before)
+            )
+
+
+class JobQueue:
+    """
+    In-process queue of long-running analyses.
+
+    submit() records a job and schedules it on the event loop; at most `concurrency`
+    jobs run at once. Identical submissions (same kind and parameters) are deduplicated
+    onto the queued, running or recently finished job.
+
+    While a worker holds unfinished jobs it refreshes their updated_at every
+    `heartbeat` seconds; a queued or running job not refreshed for `stale_after` lost
+    its worker, and is failed instead of being reused.
+    """
+
+    def __init__(self, store, concurrency=JOB_CONCURRENCY, ttl=JOB_TTL, heartbeat=JOB_HEARTBEAT, stale_after=JOB_STALE_AFTER):
+        self.store = store
+        self.ttl = ttl
+        self.heartbeat = heartbeat
+        self.stale_after = stale_after
+        self._semaphore = None
+        self._concurrency = concurrency
+        self._events = {}
+        self._tasks = set()
+        self._heartbeat_task = None
+
+    @staticmethod
+    def fingerprint(kind, params):
+        payload = json.dumps({"kind": kind, "params": params}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def submit(self, kind, params, func):
+        """
+        Queues func() (a coroutine function) as a job, unless an identical one exists.
+
+        Args:
+            kind (str): Job type, e.g. "lap-comparison".
+            params (dict): JSON-serializable parameters, used for deduplication.
+            func (callable): Async callable returning a JSON-serializable result.
+
+        Returns:
+            dict: The job record (new or reused).
+        """
+        now = time.time()
+        self.store.purge(now - self.ttl, now - self.stale_after)
+
+        fingerprint = self.fingerprint(kind, params)
+        existing = self.store.find_reusable(fingerprint, now - self.stale_after)
+        if existing is not None:
+            return existing
+
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "fingerprint": fingerprint,
+            "status": QUEUED,
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now
+        }
+        self.store.create(job)
+        self._events[job["id"]] = asyncio.Event()
+
+        loop = asyncio.get_running_loop()
+        task = loop.create_task(self._run(job["id"], func))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        if self._heartbeat_task is None or self._heartbeat_task.done():
+            self._heartbeat_task = loop.create_task(self._beat())
+        return job
+
+    async def _beat(self):
+        """Refreshes the local unfinished jobs until there are none left."""
+        while self._events:
+            await asyncio.sleep(self.heartbeat)
+            try:
+                self.store.touch(list(self._events), time.time())
+            except Exception as e:
+                print(f"Job heartbeat failed: {e}")
+
+    def _update(self, job_id, **fields):
+        """Writes a job change and wakes up the local waiters."""
+        self.store.update(job_id, updated_at=time.time(), **fields)
+        event = self._events.get(job_id)
+        if event is not None:
+            event.set()
+            self._events[job_id] = asyncio.Event()
+
+    async def _run(self, job_id, func):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._concurrency)
+        try:
+            async with self._semaphore:
+                self._update(job_id, status=RUNNING)
+                try:
+                    result = await func()
+                    if isinstance(result, dict) and result.get("error"):
+                        # Analyses report upstream failures in the payload: keep it, but do not reuse it
+                        self._update(job_id, status=ERROR, result=result, error=str(result["error"]))
+                    else:
+                        self._update(job_id, status=DONE, result=result)
+                except Exception as e:
+                    traceback.print_exc()
+                    # HTTPException carries its message in detail
+                    self._update(job_id, status=ERROR, error=str(getattr(e, "detail", e)))
+        finally:
+            event = self._events.pop(job_id, None)
+            if event is not None:
+                event.set()
+
+    def get(self, job_id):
+        job = self.store.get(job_id)
+        if job is not None and job["status"] not in FINISHED and job["updated_at"] < time.time() - self.stale_after:
+            # Not refreshed by any worker: report it failed rather than pending forever
+            self.store.update(job_id, status=ERROR, error=STALE_ERROR, updated_at=time.time())
+            job = self.store.get(job_id)
+        return job
+
+    async def wait(self, job_id, timeout):
+        """Waits up to timeout seconds for the job to change; returns its latest record."""
+        event = self._events.get(job_id)
+        if event is not None:
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            return self.store.get(job_id)
+
+        # Finished, or owned by another worker sharing the SQLite store: poll it
+        job = self.get(job_id)
+        deadline = time.monotonic() + timeout
+        while job is not None and job["status"] not in FINISHED and time.monotonic() < deadline:
+            await asyncio.sleep(REMOTE_POLL_INTERVAL)
+            latest = self.get(job_id)
+            if latest is None or latest["status"] != job["status"]:
+                return latest
+        return job
+
+    async def shutdown(self):
+        for task in list(self._tasks):
+            task.cancel()
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+
+
+def _create_store():
+    return SQLiteJobStore(JOBS_DB) if JOBS_DB else MemoryJobStore()
+
+# Shared by all endpoints of the process
+job_queue = JobQueue(_create_store())
@@ -0,0 +1,209 @@
+import numpy as np
+from scipy.spatial import KDTree
+
+# Distance between two points of the common lap grid, in meters
+ALIGN_STEP_M = 1.0
+# Share of the baseline a lap may miss at either end and still be aligned
+COVERAGE_TOLERANCE = 0.05
+# Channels aligned by default when present in the export (elapsed Time is always first)
+ALIGN_CHANNELS = (
+    "GPS Speed",
+    "RPM",
+    "GPS LatAcc",
+    "GPS LonAcc",
+    "Throttle",
+    "Brake",
+    "Steering",
+    "Water Temp",
+    "Exhaust Temp",
+)
+
+def baseline_progress(geometry, rows):
+    """
+    Distance along the baseline lap of the given session samples.
+
+    Every sample is projected on the nearest baseline segment (KDTree query, then the
+    orthogonal projection on that segment), so the progress is continuous rather than
+    snapped to baseline samples.
+
+    Args:
+        geometry (TrackGeometry): Session geometry (baseline path and session XY).
+        rows (np.ndarray): Session row indices.
+
+    Returns:
+        np.ndarray: Progress in meters, in [0, baseline length].
+    """
+    bx, by = geometry.x, geometry.y
+    arc = geometry.arc_length - geometry.arc_length[0]
+    px = geometry.session_x[rows]
+    py = geometry.session_y[rows]
+
+    _, nearest = KDTree(np.column_stack([bx, by])).query(np.column_stack([px, py]))
+    # Project on the segment leaving the nearest point (the one reaching it for the last point)
+    seg = np.minimum(nearest, len(bx) - 2)
+    tx = bx[seg + 1] - bx[seg]
+    ty = by[seg + 1] - by[seg]
+    seg_len = np.hypot(tx, ty)
+    seg_len[seg_len == 0] = 1.0
+    along = ((px - bx[seg]) * tx + (py - by[seg]) * ty) / seg_len
+    return np.clip(arc[seg] + along, 0.0, arc[-1])
+
+
+class StackedLaps:
+    """
+    Baseline progress of the samples of every lap, computed in one pass.
+
+    Laps are concatenated and stacked 2 * length apart (lap k spans [2k * length,
+    2k * length + length]), so `stacked` is non-decreasing over the whole selection and
+    a single np.interp maps any (lap, distance) pairs to sample values.
+
+    Attributes:
+        length (float): Baseline length in meters.
+        laps (np.ndarray): Lap numbers of the stacked laps.
+        rows (np.ndarray): Session rows of the stacked laps, in lap order.
+        position (np.ndarray): Index in laps of each row.
+        stacked (np.ndarray): Stacked, per-lap monotonic progress of each row.
+        covered (np.ndarray): Per lap, True if it covers the whole baseline.
+    """
+
+    def __init__(self, lap_index, geometry, min_lap_time=20.0):
+        self.length = float(geometry.arc_length[-1] - geometry.arc_length[0])
+        durations = lap_index.durations
+        self.laps = np.array(
+            [i + 1 for i, d in enumerate(durations) if d > min_lap_time and lap_index.lap_length(i + 1) > 1],
+            dtype=int
+        )
+        if self.length <= 0 or len(self.laps) == 0:
+            self.rows = np.empty(0, dtype=int)
+            self.position = np.empty(0, dtype=int)
+            self.stacked = np.empty(0)
+            self.covered = np.zeros(0, dtype=bool)
+            return
+
+        all_rows = np.arange(len(lap_index.time))
+        lap_rows = [all_rows[lap_index.rows(n)] for n in self.laps]
+        counts = np.array([len(r) for r in lap_rows])
+        self.rows = np.concatenate(lap_rows)
+        self.position = position = np.repeat(np.arange(len(self.laps)), counts)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+
+        length = self.length
+        progress = baseline_progress(geometry, self.rows)
+
+        # The baseline starts and ends on the start line: a sample at the start of a lap may
+        # project on the end of the baseline (and conversely). The share of the lap's own
+        # distance travelled tells which side it belongs to.
+        travelled = geometry.session_distance[self.rows]
+        travelled = travelled - travelled[starts][position]
+        lap_distance = np.maximum(travelled[np.cumsum(counts) - 1], 1e-9)
+        expected = travelled / lap_distance[position] * length
+        progress = np.where(progress - expected > length / 2, 0.0, progress)
+        progress = np.where(expected - progress > length / 2, length, progress)
+
+        # Monotonic per lap: one running maximum over the stacked laps
+        self.stacked = np.maximum.accumulate(position * 2.0 * length + progress)
+        local = self.stacked - position * 2.0 * length
+        self.covered = (
+            (local[starts] <= COVERAGE_TOLERANCE * length)
+            & (np.maximum.reduceat(local, starts) >= (1 - COVERAGE_TOLERANCE) * length)
+        )
+
+    def interp(self, distances, values):
+        """
+        Values of a session channel at the given baseline distances of every stacked lap.
+
+        Args:
+            distances (np.ndarray): Distances along the baseline, in meters.
+            values (np.ndarray): Channel values of self.rows.
+
+        Returns:
+            np.ndarray: (laps, len(distances)) array.
+        """
+        offsets = np.arange(len(self.laps))[:, None] * 2.0 * self.length
+        targets = (offsets + np.asarray(distances, dtype=float)[None, :]).ravel()
+        return np.interp(targets, self.stacked, values).reshape(len(self.laps), -1)
+
+
+class LapMatrix:
+    """
+    Laps resampled on a common distance grid of the baseline.
+
+    values[i, j, k] is channel k of lap laps[i] at distance[j]; channel 0 is the time
+    elapsed since the start of the lap, so the delta-time of two laps at any point is a
+    single subtraction.
+    """
+
+    def __init__(self, distance, laps, channels, values):
+        self.distance = distance
+        self.laps = [int(n) for n in laps]
+        self.channels = list(channels)
+        self.values = values
+        self.step = float(distance[1] - distance[0]) if len(distance) > 1 else ALIGN_STEP_M
+        self._positions = {n: i for i, n in enumerate(self.laps)}
+        self._channel_positions = {name: k for k, name in enumerate(self.channels)}
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + self.distance.nbytes
+
+    def index(self, distance):
+        """Grid index of a distance along the baseline (nearest point)."""
+        return int(np.clip(round(distance / self.step), 0, len(self.distance) - 1))
+
+    def lap(self, lap_number):
+        """(distance, channels) array of one lap."""
+        return self.values[self._positions[lap_number]]
+
+    def channel(self, name):
+        """(laps, distance) array of one channel."""
+        return self.values[:, :, self._channel_positions[name]]
+
+    def value(self, lap_number, name, distance):
+        """Value of a channel of one lap at a distance along the baseline."""
+        return float(self.values[self._positions[lap_number], self.index(distance), self._channel_positions[name]])
+
+    def delta_time(self, lap_number, reference_lap):
+        """Time lost (positive) or gained by lap_number on reference_lap along the grid."""
+        return self.lap(lap_number)[:, 0] - self.lap(reference_lap)[:, 0]
+
+
+def align_laps(lap_index, geometry, channels=None, step=ALIGN_STEP_M, min_lap_time=20.0):
+    """
+    Resamples every complete lap on a common distance grid of the baseline lap.
+
+    All samples of all laps are projected on the baseline at once (see StackedLaps),
+    then each channel is interpolated for every lap with one np.interp call.
+
+    Args:
+        lap_index (LapIndex): Lap boundaries of the session.
+        geometry (TrackGeometry): Geometry built on the same lap index.
+        channels (list): Channels to align; the ALIGN_CHANNELS present by default.
+        step (float): Grid step in meters.
+        min_lap_time (float): Shorter laps (fragments) are skipped.
+
+    Returns:
+        LapMatrix: float32 (laps, distance, channels) matrix, or None when no lap covers
+        the baseline.
+    """
+    stacked = StackedLaps(lap_index, geometry, min_lap_time)
+    if not stacked.covered.any():
+        return None
+
+    if channels is None:
+        channels = [name for name in ALIGN_CHANNELS if name in lap_index.df.columns]
+    channels = [name for name in channels if name != "Time"]
+
+    distance = np.arange(0.0, stacked.length, step)
+    lap_numbers = stacked.laps[stacked.covered]
+    values = np.empty((len(lap_numbers), len(distance), len(channels) + 1), dtype=np.float32)
+
+    # Elapsed time since each lap's start beacon
+    lap_start = np.array([lap_index.beacons[n - 1] for n in stacked.laps])
+    elapsed = lap_index.time[stacked.rows] - lap_start[stacked.position]
+    values[:, :, 0] = stacked.interp(distance, elapsed)[stacked.covered]
+
+    for k, name in enumerate(channels, start=1):
+        channel = np.asarray(lap_index.channel(name, fill_missing=True), dtype=float)[stacked.rows]
+        values[:, :, k] = stacked.interp(distance, np.nan_to_num(channel))[stacked.covered]
+
+    return LapMatrix(distance, lap_numbers, ["Time"] + channels, values)
@@ -0,0 +1,88 @@
+import numpy as np
+
+def parse_beacons(metadata):
+    """Parses the 'Beacon Markers' metadata into a list of lap boundary times (seconds)."""
+    beacons = []
+    if metadata and "Beacon Markers" in metadata:
+        for m in metadata["Beacon Markers"]:
+            try:
+                beacons.append(float(str(m).strip().strip('"').strip("'")))
+            except ValueError:
+                continue
+    return beacons
+
+class LapIndex:
+    """
+    Row ranges of every lap of a session, built once per session.
+
+    Lap i (1-based) covers the rows with beacons[i-1] <= Time < beacons[i]. On a sorted
+    Time column these are contiguous, found with np.searchsorted, and every per-lap
+    channel access is a zero-copy view of the session arrays.
+    """
+
+    def __init__(self, df, beacons):
+        self.df = df
+        self.beacons = [float(b) for b in beacons]
+        self.time = df['Time'].to_numpy()
+        self._channels = {'Time': self.time}
+
+        starts = np.asarray(self.beacons[:-1], dtype=float)
+        ends = np.asarray(self.beacons[1:], dtype=float)
+        self.durations = ends - starts
+
+        if len(self.time) and not np.all(self.time[1:] >= self.time[:-1]):
+            # Unsorted or NaN timestamps: fall back to explicit row indices per lap
+            self._rows = [np.flatnonzero((self.time >= s) & (self.time < e)) for s, e in zip(starts, ends)]
+        else:
+            lo = np.searchsorted(self.time, starts, side='left')
+            hi = np.searchsorted(self.time, ends, side='left')
+            self._rows = [slice(int(a), int(max(a, b))) for a, b in zip(lo, hi)]
+
+    @classmethod
+    def from_metadata(cls, df, metadata):
+        """Builds the index from the Beacon Markers, or one lap spanning the file without them."""
+        beacons = parse_beacons(metadata)
+        if len(beacons) < 2:
+            beacons = [df['Time'].min(), df['Time'].max()]
+        return cls(df, beacons)
+
+    def matches(self, beacons):
+        """True if this index was built for the given beacon list."""
+        return len(beacons) == len(self.beacons) and np.allclose(beacons, self.beacons, rtol=0, atol=1e-9)
+
+    def __len__(self):
+        return len(self._rows)
+
+    @property
+    def nbytes(self):
+        """Memory owned by the index (row arrays of unsorted sessions); channels are views of df."""
+        rows = sum(r.nbytes for r in self._rows if isinstance(r, np.ndarray))
+        return self.durations.nbytes + rows + 8 * len(self.beacons)
+
+    def rows(self, lap_number):
+        """Row selector (slice, or index array on unsorted data) for a 1-based lap number."""
+        return self._rows[lap_number - 1]
+
+    def lap_length(self, lap_number):
+        rows = self.rows(lap_number)
+        return rows.stop - rows.start if isinstance(rows, slice) else len(rows)
+
+    def channel(self, name, fill_missing=False):
+        """
+        Full-session channel array.
+
+        Raises KeyError for a channel missing from the export, unless fill_missing is set,
+        in which case zeros are returned.
+        """
+        if name not in self._channels:
+            if name in self.df.columns:
+                self._channels[name] = self.df[name].to_numpy()
+            elif fill_missing:
+                return np.zeros(len(self.time))
+            else:
+                raise KeyError(name)
+        return self._channels[name]
+
+    def lap(self, lap_number, name, fill_missing=False):
+        """Channel data of a single lap (a view on sorted sessions)."""
+        return self.channel(name, fill_missing)[self.rows(lap_number)]
@@ -0,0 +1,232 @@
+import os
+import time
+import bisect
+import pstats
+import cProfile
+import tempfile
+import threading
+import functools
+import contextvars
+from contextlib import contextmanager
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Requests carrying this header with the PROFILE_TOKEN value are profiled (disabled when unset)
+PROFILE_HEADER = "X-Profile"
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "karting-profiles"))
+# Functions printed from a request profile
+PROFILE_TOP = 25
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in values)
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(names, escaped)) + "}"
+
+
+class Counter:
+    """Monotonic counter per label values, in Prometheus text format."""
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1.0, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, key)} {value!r}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label values, in Prometheus text format."""
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # [count per bucket (+Inf last), sum]
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][position] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labels + ('le',), key + (le,))} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {total:.6f}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Metrics of the process, exposed by /metrics (one series per worker process)."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, help_text, labels=()):
+        metric = Counter(name, help_text, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, help_text, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+REQUEST_LATENCY = registry.histogram(
+    "http_request_duration_seconds", "Latency of HTTP requests by route template.", ("method", "route", "status")
+)
+STAGE_LATENCY = registry.histogram(
+    "analysis_stage_duration_seconds", "Latency of request stages (downloads, parsing, analyses, Mistral calls).", ("stage",)
+)
+BYTES_PROCESSED = registry.counter(
+    "bytes_processed_total", "Bytes downloaded, parsed and uploaded by stage.", ("stage",)
+)
+
+
+class RequestTrace:
+    """
+    Stages of one request, collected across the event loop and the worker threads.
+
+    Attributes:
+        spans (list): (stage, seconds) in completion order.
+        profile (bool): Whether the worker-thread stages run under cProfile.
+        profiles (list): cProfile.Profile of each profiled stage.
+    """
+
+    def __init__(self, profile=False):
+        self.spans = []
+        self.profile = profile
+        self.profiles = []
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self.spans.append((stage, seconds))
+
+    def add_profile(self, profiler):
+        with self._lock:
+            self.profiles.append(profiler)
+
+    def server_timing(self):
+        """Server-Timing header value (durations in ms), stages of the same name summed."""
+        totals = {}
+        with self._lock:
+            for stage, seconds in self.spans:
+                totals[stage] = totals.get(stage, 0.0) + seconds
+        return ", ".join(f"{stage.replace(' ', '_')};dur={seconds * 1000:.1f}" for stage, seconds in totals.items())
+
+    def dump_profile(self, name):
+        """
+        Merges the stage profiles into PROFILE_DIR/<name>.prof and prints the top functions.
+
+        Returns:
+            str: Path of the dump, or None when nothing was profiled.
+        """
+        with self._lock:
+            profiles = list(self.profiles)
+        if not profiles:
+            return None
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f"{name}.prof")
+        stats = pstats.Stats(profiles[0])
+        for profiler in profiles[1:]:
+            stats.add(profiler)
+        stats.dump_stats(path)
+        print(f"Profile of {name} written to {path}")
+        stats.sort_stats("cumulative").print_stats(PROFILE_TOP)
+        return path
+
+
+_current_trace = contextvars.ContextVar("request_trace", default=None)
+
+def start_trace(profile=False):
+    """Starts the trace of the current request; returns (trace, token for end_trace)."""
+    trace = RequestTrace(profile)
+    return trace, _current_trace.set(trace)
+
+def end_trace(token):
+    _current_trace.reset(token)
+
+def profile_requested(header_value):
+    """True if a request's PROFILE_HEADER value enables profiling."""
+    return bool(PROFILE_TOKEN) and header_value == PROFILE_TOKEN
+
+@contextmanager
+def span(stage):
+    """Times a block into the stage histogram and the current request's trace."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_LATENCY.observe(elapsed, stage=stage)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(stage, elapsed)
+
+def record_bytes(stage, size):
+    BYTES_PROCESSED.inc(size, stage=stage)
+
+def stage_name(func):
+    """Stage name of a callable: its function name, bound methods and partials unwrapped."""
+    while isinstance(func, functools.partial):
+        func = func.func
+    return getattr(func, "__name__", None) or type(func).__name__
+
+def traced(func, stage=None):
+    """
+    Wraps func so that each call is a span, profiled when its request asked for it.
+
+    The wrapper is meant to run in a worker thread with the request's context copied
+    (see executors.run_io): cProfile only sees the thread it is enabled in.
+    """
+    stage = stage or stage_name(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        trace = _current_trace.get()
+        with span(stage):
+            if trace is None or not trace.profile:
+                return func(*args, **kwargs)
+            profiler = cProfile.Profile()
+            try:
+                return profiler.runcall(func, *args, **kwargs)
+            finally:
+                trace.add_profile(profiler)
+    return wrapper
@@ -0,0 +1,61 @@
+import numpy as np
+from app.core.lap_alignment import StackedLaps
+
+# Default number of mini-sectors a lap is split into
+SECTOR_COUNT = 25
+
+def sector_table(lap_index, geometry, n_sectors=SECTOR_COUNT, min_lap_time=20.0):
+    """
+    Mini-sector times of every lap and the theoretical best lap.
+
+    The baseline lap of the geometry is split into n_sectors sectors of equal length.
+    Each sample of every timed lap gets its progress along the baseline (made monotonic
+    within the lap), and the times at which all laps reach all sector boundaries are
+    interpolated in a single np.interp call over the concatenated laps. The first and
+    last boundaries are the lap's own start and end times, so the sectors of a lap add
+    up to its lap time.
+
+    Args:
+        lap_index (LapIndex): Lap boundaries of the session.
+        geometry (TrackGeometry): Geometry built on the same lap index.
+        n_sectors (int): Number of mini-sectors.
+        min_lap_time (float): Shorter laps (fragments) are not timed.
+
+    Returns:
+        dict: Sector boundaries, per-lap sector times and deltas, best sectors, best and
+        theoretical lap; None when no lap covers the baseline.
+    """
+    stacked = StackedLaps(lap_index, geometry, min_lap_time)
+    if n_sectors < 1 or not stacked.covered.any():
+        return None
+    length = stacked.length
+
+    boundaries = np.linspace(0.0, length, n_sectors + 1)
+    crossing = np.empty((len(stacked.laps), n_sectors + 1))
+    crossing[:, 1:-1] = stacked.interp(boundaries[1:-1], lap_index.time[stacked.rows])
+    crossing[:, 0] = [lap_index.beacons[n - 1] for n in stacked.laps]
+    crossing[:, -1] = [lap_index.beacons[n] for n in stacked.laps]
+
+    covered = stacked.covered
+    laps = stacked.laps[covered]
+    sectors = np.diff(crossing[covered], axis=1)
+    lap_times = sectors.sum(axis=1)
+    best_sectors = sectors.min(axis=0)
+    best = int(np.argmin(lap_times))
+    deltas = sectors - best_sectors
+
+    return {
+        "sector_count": int(n_sectors),
+        "track_length": length,
+        "sector_starts": boundaries[:-1].tolist(),
+        "laps": laps.tolist(),
+        "lap_times": lap_times.tolist(),
+        "sector_times": sectors.tolist(),
+        "sector_deltas": deltas.tolist(),
+        "best_sectors": best_sectors.tolist(),
+        "best_sector_laps": laps[np.argmin(sectors, axis=0)].tolist(),
+        "best_lap": float(lap_times[best]),
+        "best_lap_number": int(laps[best]),
+        "best_lap_deltas": deltas[best].tolist(),
+        "theoretical_lap": float(best_sectors.sum())
+    }
@@ -0,0 +1,148 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+
+def artifact_nbytes(artifact):
+    """
+    Approximate in-memory size of a derived artifact, charged to the session cache.
+
+    Uses the artifact's nbytes (numpy arrays, TrackGeometry, LapMatrix, PathPyramid,
+    LapIndex), the data and index arrays of a KDTree, and sums containers item by item.
+    """
+    if artifact is None:
+        return 0
+    nbytes = getattr(artifact, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    if hasattr(artifact, "data") and hasattr(artifact, "indices"):
+        # scipy KDTree: points copy and permutation (the node arrays are small next to them)
+        return int(artifact.data.nbytes + artifact.indices.nbytes)
+    if isinstance(artifact, dict):
+        return sys.getsizeof(artifact) + sum(artifact_nbytes(v) for v in artifact.values())
+    if isinstance(artifact, (list, tuple)):
+        return sys.getsizeof(artifact) + sum(artifact_nbytes(v) for v in artifact)
+    return sys.getsizeof(artifact)
+
+
+class CachedSession:
+    """
+    A parsed session held in the cache.
+
+    The DataFrame and metadata are shared between requests and must be treated as read-only.
+    Artifacts derived from them (lap index, ...) are memoized alongside via get_derived,
+    their size added to nbytes and charged to the owning cache.
+    """
+
+    def __init__(self, df, metadata, nbytes, key=None, cache=None):
+        self.df = df
+        self.metadata = metadata
+        self.nbytes = nbytes
+        self.key = key
+        self._cache = cache
+        self._derived = {}
+        # Re-entrant: a factory may itself need another derived artifact
+        self._lock = threading.RLock()
+
+    def get_derived(self, name, factory):
+        """Returns the artifact stored under name, building it with factory() on first use."""
+        with self._lock:
+            if name not in self._derived:
+                artifact = factory()
+                self._derived[name] = artifact
+                size = artifact_nbytes(artifact)
+                if self._cache is not None:
+                    self._cache.charge(self, size)
+                else:
+                    self.nbytes += size
+            return self._derived[name]
+
+
+class SessionCache:
+    """
+    Process-wide LRU cache of parsed (DataFrame, metadata) pairs.
+
+    Keys are (storage_path, generation) tuples so a re-uploaded blob never serves stale data.
+    Eviction is bounded by the in-memory size of the cached DataFrames plus the derived
+    artifacts memoized on them.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns the CachedSession for key, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, df, metadata):
+        """Stores a parsed session and evicts least recently used entries until under budget."""
+        nbytes = int(df.memory_usage(index=True).sum())
+        if nbytes > self.max_bytes:
+            # Too large to ever fit, hand it back without caching
+            return CachedSession(df, metadata, nbytes, key)
+        entry = CachedSession(df, metadata, nbytes, key, cache=self)
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous.nbytes
+
+            self._entries[key] = entry
+            self.current_bytes += nbytes
+            self._evict()
+
+        return entry
+
+    def charge(self, entry, nbytes):
+        """Adds the size of an artifact derived on a cached entry, evicting to stay under budget."""
+        with self._lock:
+            # Updated under the cache lock so that an eviction never subtracts an uncharged size
+            entry.nbytes += nbytes
+            if self._entries.get(entry.key) is not entry:
+                # Evicted or replaced meanwhile, no longer counted
+                return
+            self.current_bytes += nbytes
+            self._evict()
+
+    def _evict(self):
+        # Least recently used first; called with the lock held
+        while self.current_bytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self.current_bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+# Shared by all endpoints of the process
+session_cache = SessionCache(int(os.getenv("SESSION_CACHE_MB", "512")) * 1024 * 1024)
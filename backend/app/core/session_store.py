@@ -0,0 +1,83 @@
+import io
+import json
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from app.core.telemetry import FLOAT64_CHANNELS, compact_frame, select_channels
+
+# Typed columnar copy of a session, stored next to the raw CSV blob
+SIDECAR_SUFFIX = ".parquet"
+SIDECAR_CONTENT_TYPE = "application/vnd.apache.parquet"
+PARQUET_MAGIC = b"PAR1"
+METADATA_KEY = b"aim_metadata"
+
+def sidecar_path(storage_path):
+    return f"{storage_path}{SIDECAR_SUFFIX}"
+
+def is_parquet(head):
+    """Checks the leading bytes of a file for the Parquet magic number."""
+    return head[:4] == PARQUET_MAGIC
+
+def write_session_parquet(df, metadata):
+    """
+    Serializes a parsed session to Parquet bytes.
+
+    Channels are stored as float32 (except FLOAT64_CHANNELS) and the AiM header
+    metadata is kept as JSON in the schema metadata.
+
+    Args:
+        df (pd.DataFrame): Parsed telemetry from load_csv.
+        metadata (dict): Metadata extracted from the CSV header.
+
+    Returns:
+        bytes: Parquet file content.
+    """
+    arrays = []
+    names = []
+    for col in df.columns:
+        dtype = np.float64 if col in FLOAT64_CHANNELS else np.float32
+        arrays.append(pa.array(df[col].to_numpy(dtype=dtype, na_value=np.nan)))
+        names.append(str(col))
+
+    table = pa.Table.from_arrays(arrays, names=names)
+    table = table.replace_schema_metadata({METADATA_KEY: json.dumps(metadata).encode("utf-8")})
+
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer, compression="zstd")
+    return buffer.getvalue()
+
+def build_sidecar(path, channels=None):
+    """
+    Parses a session file and serializes it as a sidecar, in one call for the process pool.
+
+    Args:
+        path (str): Path of the CSV (only the path crosses the process boundary).
+        channels (iterable): Channels to keep (see telemetry.SESSION_CHANNELS), None for all.
+
+    Returns:
+        tuple: (df, metadata, sidecar bytes), df being the compact frame a later
+        read_session_parquet of the sidecar returns.
+    """
+    # data_loader imports this module
+    from app.core.data_loader import load_csv
+
+    df, metadata = load_csv(path, channels)
+    return df, metadata, write_session_parquet(df, metadata)
+
+def read_session_parquet(file, channels=None):
+    """
+    Loads a session written by write_session_parquet.
+
+    Args:
+        file: File path or file-like object.
+        channels (iterable): Channels to read (columns projection), None for all.
+
+    Returns:
+        tuple: (pd.DataFrame, dict) -> (df, metadata), df as telemetry.compact_frame
+    """
+    parquet = pq.ParquetFile(file)
+    schema = parquet.schema_arrow
+    metadata = json.loads((schema.metadata or {}).get(METADATA_KEY, b"{}").decode("utf-8"))
+    table = parquet.read(columns=select_channels(schema.names, channels))
+    # Sidecars written before the units line was skipped start with an empty row
+    return compact_frame(table.to_pandas()), metadata
@@ -0,0 +1,86 @@
+# Channel sets only at import time: numpy and pandas load with the first frame compacted,
+# so the routers can import the constants without slowing down the app import
+
+# Timestamps and GPS coordinates need more than the ~7 significant digits of float32
+FLOAT64_CHANNELS = ("Time", "GPS Latitude", "GPS Longitude")
+
+# Channels each analysis reads, when present in the export. Uncached one-shot loads keep
+# only the set of their endpoint (see api.sessions.load_session)
+CIRCUIT_CHANNELS = ("Time", "GPS Speed", "GPS LatAcc", "GPS LonAcc", "GPS Latitude", "GPS Longitude")
+LAP_METRICS_CHANNELS = ("Time", "GPS Speed", "GPS Latitude", "GPS Longitude")
+BINDING_CHANNELS = ("Time", "GPS Speed", "RPM", "GPS LatAcc", "GPS Latitude", "GPS Longitude")
+# lap_alignment.ALIGN_CHANNELS, aligned by /analyze/overlay
+OVERLAY_CHANNELS = (
+    "Time", "GPS Speed", "RPM", "GPS LatAcc", "GPS LonAcc", "Throttle", "Brake", "Steering",
+    "Water Temp", "Exhaust Temp", "GPS Latitude", "GPS Longitude"
+)
+# telemetry_compressor.PROMPT_CHANNELS, plus the lap column of plain exports
+PROMPT_CHANNELS = (
+    "Time", "Lap", "GPS Speed", "RPM", "GPS LatAcc", "GPS LonAcc", "Throttle", "Brake", "Steering",
+    "Water Temp", "Exhaust Temp"
+)
+
+ANALYSIS_CHANNELS = {
+    "circuit": CIRCUIT_CHANNELS,
+    "lap_metrics": LAP_METRICS_CHANNELS,
+    "binding": BINDING_CHANNELS,
+    "overlay": OVERLAY_CHANNELS,
+    "prompt": PROMPT_CHANNELS,
+}
+# Kept by the session cache, shared by every analysis endpoint
+SESSION_CHANNELS = tuple(dict.fromkeys(c for channels in ANALYSIS_CHANNELS.values() for c in channels))
+
+def channel_dtype(name):
+    """Storage dtype of a channel: float64 for FLOAT64_CHANNELS, float32 otherwise."""
+    import numpy as np
+    return np.float64 if name in FLOAT64_CHANNELS else np.float32
+
+def select_channels(names, channels):
+    """
+    Channels of an export to load, in export order.
+
+    Args:
+        names (list): Column names of the export.
+        channels (iterable): Wanted channels, None for all.
+
+    Returns:
+        list: The wanted channels present, or every column when channels is None or the
+        export has no 'Time' channel (unknown layout, left to the analyzers to resolve).
+    """
+    if channels is None or "Time" not in names:
+        return list(names)
+    wanted = set(channels)
+    return [name for name in names if name in wanted]
+
+def compact_frame(df, channels=None):
+    """
+    Compact telemetry frame shared by the analyzers.
+
+    Keeps the selected channels (see select_channels) as float32, FLOAT64_CHANNELS as
+    float64, and drops the rows with no value at all (the units line of Race Studio
+    exports, blank lines). Channels that are not numeric are coerced, unparsable
+    cells becoming NaN.
+
+    Args:
+        df (pd.DataFrame): Parsed telemetry.
+        channels (iterable): Channels to keep, None for all.
+
+    Returns:
+        pd.DataFrame: New frame with a fresh RangeIndex.
+    """
+    import numpy as np
+    import pandas as pd
+
+    names = select_channels(list(df.columns), channels)
+    columns = {}
+    for name in names:
+        values = df[name]
+        if not pd.api.types.is_float_dtype(values.dtype):
+            values = pd.to_numeric(values, errors="coerce")
+        columns[name] = values.to_numpy(dtype=channel_dtype(name), na_value=np.nan)
+    compact = pd.DataFrame(columns)
+
+    empty = compact.isna().all(axis=1).to_numpy() if len(names) else np.zeros(len(compact), dtype=bool)
+    if empty.any():
+        compact = compact[~empty].reset_index(drop=True)
+    return compact
@@ -0,0 +1,175 @@
+import os
+import numpy as np
+import pandas as pd
+from scipy.signal import find_peaks
+from app.core.lap_index import LapIndex, parse_beacons
+
+# Approximate prompt size allowed per session, in tokens
+TELEMETRY_TOKEN_BUDGET = int(os.getenv("TELEMETRY_TOKEN_BUDGET", "6000"))
+# Numeric CSV tokenizes poorly, ~3 characters per token
+CHARS_PER_TOKEN = 3
+
+# Distance grid the lap is resampled on before downsampling (meters)
+RESAMPLE_STEP_M = 1.0
+# Speed swing (km/h) that makes a local maximum/minimum a braking point/apex
+EVENT_PROMINENCE_KMH = 3.0
+# Longitudinal acceleration (g) marking throttle pickup after an apex
+THROTTLE_PICKUP_G = 0.05
+MIN_ROWS = 20
+
+# (channel, decimals) sent to the model when present in the export
+PROMPT_CHANNELS = [
+    ("GPS Speed", 1),
+    ("RPM", 0),
+    ("GPS LatAcc", 2),
+    ("GPS LonAcc", 2),
+    ("Throttle", 0),
+    ("Brake", 0),
+    ("Steering", 0),
+    ("Water Temp", 0),
+    ("Exhaust Temp", 0),
+]
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Returns:
+        np.ndarray: Sorted indices of the n_out points that best preserve the shape of y(x).
+    """
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1])
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point) is the third triangle vertex
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean() if next_end > end else x[-1]
+        avg_y = y[end:next_end].mean() if next_end > end else y[-1]
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+def lap_distance(time, speed_kmh):
+    """Cumulative distance (m) from the speed trace, trapezoidal integration."""
+    steps = np.diff(time) * (speed_kmh[1:] + speed_kmh[:-1]) / 2.0 / 3.6
+    return np.concatenate([[0.0], np.cumsum(np.nan_to_num(np.clip(steps, 0, None)))])
+
+def key_events(speed, lon_acc=None, min_spacing=20):
+    """
+    Braking points, apexes and throttle pickups on a distance-resampled lap.
+
+    Returns:
+        dict: Row index -> "BRAKE" | "APEX" | "THROTTLE".
+    """
+    events = {}
+    peaks, _ = find_peaks(speed, prominence=EVENT_PROMINENCE_KMH, distance=min_spacing)
+    apexes, _ = find_peaks(-speed, prominence=EVENT_PROMINENCE_KMH, distance=min_spacing)
+    for i in peaks:
+        events[int(i)] = "BRAKE"
+    for i in apexes:
+        events[int(i)] = "APEX"
+        if lon_acc is not None:
+            after = np.flatnonzero(lon_acc[i + 1:i + 1 + 10 * min_spacing] > THROTTLE_PICKUP_G)
+            if len(after):
+                events.setdefault(int(i + 1 + after[0]), "THROTTLE")
+    return events
+
+def compress_lap(lap_df, token_budget):
+    """
+    Compresses one lap to a CSV that fits in token_budget.
+
+    The lap is resampled on a RESAMPLE_STEP_M distance grid, braking points, apexes and
+    throttle pickups are always kept, and the remaining rows are chosen with LTTB on the
+    speed trace.
+
+    Returns:
+        str: CSV text with Distance, Time, the PROMPT_CHANNELS present and an Event column.
+    """
+    time = lap_df["Time"].to_numpy(dtype=float)
+    speed = lap_df["GPS Speed"].to_numpy(dtype=float)
+    distance = lap_distance(time, speed)
+
+    grid = np.arange(0.0, distance[-1], RESAMPLE_STEP_M) if distance[-1] > RESAMPLE_STEP_M else distance
+    columns = {"Distance": (grid, 0), "Time": (np.interp(grid, distance, time - time[0]), 2)}
+    for name, decimals in PROMPT_CHANNELS:
+        if name in lap_df.columns:
+            values = pd.to_numeric(lap_df[name], errors="coerce").to_numpy(dtype=float)
+            columns[name] = (np.interp(grid, distance, np.nan_to_num(values)), decimals)
+
+    resampled_speed = columns["GPS Speed"][0]
+    lon_acc = columns["GPS LonAcc"][0] if "GPS LonAcc" in columns else None
+    events = key_events(resampled_speed, lon_acc, min_spacing=max(1, int(20 / RESAMPLE_STEP_M)))
+
+    table = pd.DataFrame({name: np.round(values, decimals) for name, (values, decimals) in columns.items()})
+    for name, (_, decimals) in columns.items():
+        if decimals == 0:
+            table[name] = table[name].astype(np.int64)
+    table["Event"] = ""
+
+    # Row budget from the size of a typical formatted row
+    sample = table.iloc[::max(1, len(table) // 50)].to_csv(index=False, header=False)
+    row_chars = max(1.0, len(sample) / max(1, sample.count("\n")))
+    n_rows = int(token_budget * CHARS_PER_TOKEN / row_chars)
+    n_rows = max(MIN_ROWS, n_rows - len(events))
+
+    keep = np.union1d(lttb(table["Distance"].to_numpy(dtype=float), resampled_speed, n_rows), list(events))
+    for i, label in events.items():
+        table.iat[i, table.columns.get_loc("Event")] = label
+    return table.iloc[keep].to_csv(index=False)
+
+def summarize_session(df, metadata, token_budget=TELEMETRY_TOKEN_BUDGET):
+    """
+    Token-budgeted text of a session for the lap comparison prompt.
+
+    Args:
+        df (pd.DataFrame): Session telemetry ('Time' and 'GPS Speed' required).
+        metadata (dict): Header metadata (Beacon Markers).
+        token_budget (int): Approximate size of the returned text, in tokens.
+
+    Returns:
+        str: Lap time summary and the compressed fastest lap, or the whole session
+        compressed when no complete lap is found.
+    """
+    if len(parse_beacons(metadata)) < 2 and "Lap" in df.columns:
+        # Plain exports with a lap number column instead of beacons
+        starts = df.groupby("Lap")["Time"].min().sort_values().tolist()
+        lap_index = LapIndex(df, starts + [df["Time"].max()])
+    else:
+        lap_index = LapIndex.from_metadata(df, metadata)
+
+    durations = lap_index.durations
+    valid = [i for i, d in enumerate(durations) if d >= 10 and lap_index.lap_length(i + 1) >= 10]
+
+    if not valid:
+        body = compress_lap(df, token_budget)
+        return (
+            f"### DATA STRUCTURE: DOWNSAMPLED WHOLE SESSION\n"
+            f"NOTE: Resampled every {RESAMPLE_STEP_M:g} m of distance and downsampled on the speed trace; "
+            f"BRAKE/APEX/THROTTLE rows in the Event column are always kept.\n"
+            f"{body}"
+        )
+
+    best = valid[int(np.argmin(durations[valid]))] + 1
+    summary_text = ", ".join(f"Lap {i + 1}: {durations[i]:.3f}s" for i in valid)
+    header = (
+        f"### DATA STRUCTURE: BEST LAP + SESSION SUMMARY\n"
+        f"NOTE: The FASTEST LAP (Lap {best}) is resampled every {RESAMPLE_STEP_M:g} m of distance and downsampled "
+        f"to keep the shape of the speed trace. Every braking point, apex and throttle pickup is kept "
+        f"and tagged in the Event column (BRAKE/APEX/THROTTLE). Distance is in meters from the start line, "
+        f"Time in seconds from the start of the lap.\n\n"
+        f"--- SESSION SUMMARY (Consistency) ---\n"
+        f"{summary_text}\n\n"
+        f"--- BEST LAP TELEMETRY (Compressed) ---\n"
+    )
+    lap_df = df.iloc[lap_index.rows(best)]
+    return header + compress_lap(lap_df, token_budget - len(header) // CHARS_PER_TOKEN)
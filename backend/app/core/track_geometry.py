@@ -0,0 +1,64 @@
+import io
+import numpy as np
+
+# Geometry artifact stored next to the session blob
+GEOMETRY_SUFFIX = ".geometry.npz"
+# 2: sessions are loaded without the units line, session arrays have one row less
+GEOMETRY_VERSION = 2
+
+def geometry_path(storage_path):
+    return f"{storage_path}{GEOMETRY_SUFFIX}"
+
+class TrackGeometry:
+    """
+    Per-session geometry computed once and reused by every binding request.
+
+    Baseline (fastest lap) arrays: smoothed path x/y, curvature, arc_length, is_corner
+    and the left/right boundaries. Session arrays: every sample projected to XY with
+    the baseline origin (session_x/session_y) and the cumulative distance travelled
+    (session_distance), so any lap's distance is a difference of two values.
+    """
+
+    BASELINE_ARRAYS = ("x", "y", "curvature", "arc_length", "is_corner", "x_left", "y_left", "x_right", "y_right")
+    SESSION_ARRAYS = ("session_x", "session_y", "session_distance")
+
+    def __init__(self, origin, lap_number, width, arrays):
+        self.origin = (float(origin[0]), float(origin[1]))
+        self.lap_number = int(lap_number)
+        self.width = float(width)
+        for name in self.BASELINE_ARRAYS + self.SESSION_ARRAYS:
+            setattr(self, name, arrays[name])
+
+    def matches_origin(self, origin, tol=1e-9):
+        return origin is not None and np.allclose(origin, self.origin, rtol=0, atol=tol)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in self.BASELINE_ARRAYS + self.SESSION_ARRAYS)
+
+    def to_bytes(self):
+        """Serializes the geometry to a compressed .npz payload."""
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            version=GEOMETRY_VERSION,
+            origin=np.asarray(self.origin),
+            lap_number=self.lap_number,
+            width=self.width,
+            **{name: getattr(self, name) for name in self.BASELINE_ARRAYS + self.SESSION_ARRAYS}
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Loads a geometry written by to_bytes.
+
+        Raises:
+            ValueError: If the payload was written by another GEOMETRY_VERSION.
+        """
+        with np.load(io.BytesIO(data)) as npz:
+            if int(npz["version"]) != GEOMETRY_VERSION:
+                raise ValueError(f"Unsupported geometry version {int(npz['version'])}")
+            arrays = {name: npz[name] for name in cls.BASELINE_ARRAYS + cls.SESSION_ARRAYS}
+            return cls(npz["origin"], int(npz["lap_number"]), float(npz["width"]), arrays)
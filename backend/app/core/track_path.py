@@ -0,0 +1,137 @@
+import numpy as np
+
+# Douglas-Peucker tolerance of each level of detail, coarsest first (meters)
+TRACK_PATH_TOLERANCES = (8.0, 4.0, 2.0, 1.0, 0.5, 0.25)
+# Points of the track_path returned by compute_circuit_characteristics
+TRACK_PATH_POINTS = 200
+
+def douglas_peucker_importance(x, y):
+    """
+    Douglas-Peucker simplification of a polyline for every tolerance at once.
+
+    importance[i] is the largest tolerance at which point i survives the simplification
+    (endpoints: infinity), so the simplified path at tolerance t is the points with
+    importance >= t. The recursion is run breadth-first: every pending segment of a
+    depth is split in the same vectorized pass.
+
+    Args:
+        x, y (np.ndarray): Polyline coordinates in meters.
+
+    Returns:
+        np.ndarray: Importance of each point.
+    """
+    n = len(x)
+    importance = np.zeros(n)
+    if n == 0:
+        return importance
+    importance[[0, -1]] = np.inf
+
+    starts = np.array([0])
+    ends = np.array([n - 1])
+    parents = np.array([np.inf])
+    while len(starts):
+        inner = ends - starts - 1
+        keep = inner > 0
+        starts, ends, parents, inner = starts[keep], ends[keep], parents[keep], inner[keep]
+        if not len(starts):
+            break
+
+        # Inner points of every segment, concatenated
+        offsets = np.concatenate([[0], np.cumsum(inner)[:-1]])
+        segment = np.repeat(np.arange(len(starts)), inner)
+        idx = starts[segment] + 1 + np.arange(inner.sum()) - offsets[segment]
+
+        # Distance to the chord (to the start point when the chord is degenerate)
+        ax, ay = x[starts][segment], y[starts][segment]
+        dx, dy = x[ends][segment] - ax, y[ends][segment] - ay
+        chord = np.hypot(dx, dy)
+        px, py = x[idx] - ax, y[idx] - ay
+        dist = np.where(chord > 0, np.abs(px * dy - py * dx) / np.where(chord > 0, chord, 1.0), np.hypot(px, py))
+
+        # Farthest point of each segment (first one on ties)
+        dmax = np.maximum.reduceat(dist, offsets)
+        candidates = np.flatnonzero(dist == dmax[segment])
+        _, first = np.unique(segment[candidates], return_index=True)
+        split = idx[candidates[first]]
+
+        # A point never outlives the segment it splits
+        importance[split] = np.minimum(dmax, parents)
+        starts, ends, parents = (
+            np.concatenate([starts, split]),
+            np.concatenate([split, ends]),
+            np.concatenate([importance[split], importance[split]])
+        )
+    return importance
+
+
+class PathPyramid:
+    """
+    Multi-resolution session path, computed once per session.
+
+    Level 0 is the coarsest (TRACK_PATH_TOLERANCES[0]); every level keeps the points
+    of the coarser ones, so a client can refine the drawn path as it zooms in.
+    """
+
+    def __init__(self, x, y, origin, tolerances=TRACK_PATH_TOLERANCES):
+        self.x = np.asarray(x, dtype=np.float32)
+        self.y = np.asarray(y, dtype=np.float32)
+        self.origin = origin
+        self.tolerances = tuple(tolerances)
+        self.importance = douglas_peucker_importance(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+        self._levels = [np.flatnonzero(self.importance >= t) for t in self.tolerances]
+
+    def __len__(self):
+        return len(self.tolerances)
+
+    @property
+    def nbytes(self):
+        return self.x.nbytes + self.y.nbytes + self.importance.nbytes + sum(rows.nbytes for rows in self._levels)
+
+    def level(self, lod):
+        """Packed [x0, y0, x1, y1, ...] path of a level, in centimetre-rounded meters."""
+        rows = self._levels[lod]
+        return np.round(np.column_stack((self.x[rows], self.y[rows])).ravel().astype(float), 2).tolist()
+
+    def simplify(self, n_points):
+        """Rows of the n_points most important points (the Douglas-Peucker path of that size)."""
+        if n_points >= len(self.x):
+            return np.arange(len(self.x))
+        return np.sort(np.argsort(-self.importance, kind="stable")[:n_points])
+
+    def describe(self):
+        return [
+            {"level": i, "tolerance": t, "points": int(len(rows))}
+            for i, (t, rows) in enumerate(zip(self.tolerances, self._levels))
+        ]
+
+
+def build_path_pyramid(df, rows=None, tolerances=TRACK_PATH_TOLERANCES):
+    """
+    Path pyramid of a session's GPS trace, in meters from its first fix.
+
+    Args:
+        df (pd.DataFrame): Session telemetry.
+        rows (slice | np.ndarray): Rows of the lap to draw (see LapIndex.rows), None for
+            the whole trace. A single representative lap keeps the corner shape at low
+            point counts, where overlapping laps would share the budget.
+        tolerances (tuple): Douglas-Peucker tolerance of each level, coarsest first.
+
+    Returns:
+        PathPyramid, or None without GPS channels.
+    """
+    if 'GPS Latitude' not in df.columns or 'GPS Longitude' not in df.columns:
+        return None
+    lat = df['GPS Latitude'].to_numpy(dtype=float)
+    lon = df['GPS Longitude'].to_numpy(dtype=float)
+    if rows is not None:
+        lat, lon = lat[rows], lon[rows]
+    valid = np.isfinite(lat) & np.isfinite(lon)
+    lat, lon = lat[valid], lon[valid]
+    if len(lat) == 0:
+        return None
+
+    lat0 = lat[0]
+    lon0 = lon[0]
+    y_m = (lat - lat0) * 111132.92
+    x_m = (lon - lon0) * 111412.84 * np.cos(np.deg2rad(lat0))
+    return PathPyramid(x_m, y_m, (float(lat0), float(lon0)), tolerances)
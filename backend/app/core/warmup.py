@@ -0,0 +1,64 @@
+import time
+import asyncio
+import importlib
+from app.core.executors import run_io, run_cpu, CPU_WORKERS
+
+# Modules the endpoints import on first use, loaded in the background once the app serves
+WARM_UP_MODULES = (
+    "numpy",
+    "pandas",
+    "scipy.signal",
+    "scipy.spatial",
+    "pyarrow.parquet",
+    "requests",
+    "google.cloud.storage",
+    "mistralai",
+    "app.core.data_loader",
+    "app.core.session_store",
+    "app.core.analyzer",
+    "app.core.binding_analyzer",
+    "app.core.lap_alignment",
+    "app.core.ai_interpreter",
+    "app.core.budget_agent",
+)
+# Modules the parsing processes need (CSV loads and upload sidecars, see executors.run_cpu)
+CPU_WARM_UP_MODULES = ("numpy", "pandas", "app.core.data_loader", "app.core.session_store")
+
+def preload(modules):
+    """
+    Imports modules, logging the ones that fail (an optional dependency missing must
+    not stop the warm-up).
+
+    Returns:
+        int: Number of modules imported.
+    """
+    loaded = 0
+    for name in modules:
+        try:
+            importlib.import_module(name)
+            loaded += 1
+        except Exception as e:
+            print(f"Warm-up import of {name} failed: {e}")
+    return loaded
+
+async def warm_up():
+    """
+    Loads the heavy modules, the GCS bucket handle and the parsing processes in the
+    background, so the first analysis request does not pay for them.
+
+    Started by the app lifespan without being awaited: the port is bound and health
+    checks are answered while it runs. A request arriving earlier imports what it needs
+    itself (the import lock makes it wait for a module the warm-up is loading).
+    """
+    from app.core.gcs import get_bucket
+
+    start = time.perf_counter()
+    try:
+        loaded = await run_io(preload, WARM_UP_MODULES)
+        await run_io(get_bucket)
+        if CPU_WORKERS > 0:
+            # One call per worker, so that every parsing process is spawned and importing
+            await asyncio.gather(*(run_cpu(preload, CPU_WARM_UP_MODULES) for _ in range(CPU_WORKERS)))
+        print(f"Warm-up done in {time.perf_counter() - start:.1f} s ({loaded}/{len(WARM_UP_MODULES)} modules)")
+    except Exception as e:
+        print(f"Warm-up failed: {e}")
@@ -0,0 +1,501 @@
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from typing import List, Optional
+import os
+import asyncio
+import traceback
+from app.core.executors import run_io
+from app.core.jobs import job_queue, job_view
+from app.core.catalog import catalog, feature_trends
+from app.core.session_cache import session_cache
+from app.core.telemetry import CIRCUIT_CHANNELS, LAP_METRICS_CHANNELS, BINDING_CHANNELS, OVERLAY_CHANNELS
+from app.core.baselines import baseline_registry, baseline_id_for, encode_baseline, COMPACT_BASELINE_MEDIA_TYPE
+from app.api.sessions import (
+    download_file_content, load_session, get_lap_index, get_track_geometry, get_path_pyramid,
+    compute_session_sectors, get_lap_matrix, get_session_tree
+)
+
+# Analysis modules are imported in the endpoints, see app/api/sessions.py
+router = APIRouter()
+
+# API Key (In production, use env vars)
+# For this rebuild, we'll try to load from env, fallback to hardcoded (dev only)
+MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY", "9WzPqRnYfvFcH6Osj6KVQOIK1gPjNfrH")
+
+class AnalyzeMetricsRequest(BaseModel):
+    urls: List[str]
+    storage_paths: Optional[List[str]] = None
+    labels: List[str] = []
+
+class AnalyzeAIRequest(BaseModel):
+    features1: dict
+    features2: dict
+    label1: str
+    label2: str
+    language: str = "en"
+
+class LapComparisonSession(BaseModel):
+    url: str
+    label: str
+    storage_path: Optional[str] = None
+
+class LapComparisonRequest(BaseModel):
+    # N sessions, or the legacy url1/url2 pair
+    sessions: Optional[List[LapComparisonSession]] = None
+    url1: Optional[str] = None
+    url2: Optional[str] = None
+    label1: Optional[str] = None
+    label2: Optional[str] = None
+    storage_path1: Optional[str] = None
+    storage_path2: Optional[str] = None
+
+@router.post("/lap-comparison")
+async def analyze_lap_comparison_endpoint(request: LapComparisonRequest):
+    sessions = request.sessions
+    if sessions is None:
+        sessions = [
+            LapComparisonSession(url=url, label=label or f"Session {idx + 1}", storage_path=storage_path)
+            for idx, (url, label, storage_path) in enumerate([
+                (request.url1, request.label1, request.storage_path1),
+                (request.url2, request.label2, request.storage_path2)
+            ])
+            if url
+        ]
+    if len(sessions) < 2:
+        raise HTTPException(status_code=400, detail="At least two sessions are required.")
+
+    try:
+        async def prepare(session):
+            from app.core.ai_interpreter import process_csv_smart
+            file_obj = await download_file_content(session.url, session.storage_path)
+            return await run_io(process_csv_smart, file_obj.getvalue(), session.label)
+
+        # Download and reduce all sessions concurrently
+        processed = await asyncio.gather(*(prepare(session) for session in sessions))
+        
+        from app.core.ai_interpreter import analyze_lap_comparison_sessions
+        result = await run_io(
+            analyze_lap_comparison_sessions,
+            list(processed),
+            [session.label for session in sessions],
+            MISTRAL_API_KEY
+        )
+        
+        return result
+            
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Error analyzing lap comparison: {str(e)}")
+
+@router.post("/metrics")
+async def analyze_metrics(request: AnalyzeMetricsRequest):
+    if not request.urls:
+        raise HTTPException(status_code=400, detail="At least one file URL is required.")
+    
+    async def analyze(idx, url):
+        storage_path = request.storage_paths[idx] if request.storage_paths and idx < len(request.storage_paths) else None
+        
+        # Download and parse (cached per storage path + generation)
+        session = await load_session(url, storage_path, CIRCUIT_CHANNELS)
+
+        # Compute Metrics (now includes track_path)
+        from app.core.analyzer import compute_circuit_characteristics
+        pyramid = await run_io(get_path_pyramid, session)
+        feats = await run_io(compute_circuit_characteristics, session.df, pyramid)
+        
+        return {
+            "features": feats,
+            "label": request.labels[idx] if idx < len(request.labels) else f"Track {idx+1}"
+        }
+
+    try:
+        # Sessions are fetched and analyzed concurrently, results keep the request order
+        return list(await asyncio.gather(*(analyze(idx, url) for idx, url in enumerate(request.urls))))
+        
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Error analyzing metrics: {str(e)}")
+
+class VoiceCommandRequest(BaseModel):
+    text: str
+
+@router.post("/voice-command")
+async def process_voice_command(request: VoiceCommandRequest):
+    try:
+        from app.core.ai_interpreter import analyze_voice_command
+        result = await run_io(analyze_voice_command, request.text, MISTRAL_API_KEY)
+        return result
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Error processing voice command: {str(e)}")
+
+
+@router.post("/ai")
+async def analyze_ai(request: AnalyzeAIRequest):
+    try:
+        # Strip track_path if present to save tokens and avoid errors
+        f1 = request.features1.copy()
+        f2 = request.features2.copy()
+        f1.pop('track_path', None)
+        f2.pop('track_path', None)
+
+        from app.core.ai_interpreter import analyze_comparison
+
+        ai_analysis = await run_io(
+            analyze_comparison,
+            f1, 
+            f2, 
+            request.label1, 
+            request.label2, 
+            MISTRAL_API_KEY, 
+            request.language
+        )
+        return ai_analysis
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"AI Analysis Error: {str(e)}")
+
+# Background variants: return a job id at once, results via /api/v1/jobs/{job_id}[/events]
+@router.post("/lap-comparison/jobs", status_code=202)
+async def submit_lap_comparison_job(request: LapComparisonRequest):
+    job = job_queue.submit("lap-comparison", request.dict(), lambda: analyze_lap_comparison_endpoint(request))
+    return job_view(job)
+
+@router.post("/ai/jobs", status_code=202)
+async def submit_ai_job(request: AnalyzeAIRequest):
+    job = job_queue.submit("ai", request.dict(), lambda: analyze_ai(request))
+    return job_view(job)
+
+class BindingInitRequest(BaseModel):
+    file_url: str
+    storage_path: Optional[str] = None
+
+class BindingCornerRequest(BaseModel):
+    file_url: str
+    storage_path: Optional[str] = None
+    # Server-side baseline returned by /analyze/binding/init, or the legacy baseline arrays
+    baseline_id: Optional[str] = None
+    baseline: Optional[dict] = None
+    click_x: float
+    click_y: float
+    search_radius: float = 30.0
+
+class ReferenceAnalysisRequest(BaseModel):
+    file_url: str
+    storage_path: Optional[str] = None
+
+class BindingAIRequest(BaseModel):
+    target_corner_data: List[dict]
+    reference_corners: List[dict]
+    click_x: float
+    click_y: float
+
+@router.post("/binding/init")
+async def analyze_binding_init(request: BindingInitRequest, accept: Optional[str] = Header(None)):
+    try:
+        session = await load_session(request.file_url, request.storage_path, BINDING_CHANNELS)
+
+        # Analyze
+        from app.core.binding_analyzer import analyze_binding
+        geometry = await run_io(get_track_geometry, session)
+        baseline = await run_io(
+            analyze_binding,
+            session.df,
+            session.metadata,
+            lap_index=get_lap_index(session),
+            geometry=geometry
+        )
+        # Corner requests name the baseline instead of posting it back
+        baseline["baseline_id"] = baseline_registry.register(session)
+
+        if accept and COMPACT_BASELINE_MEDIA_TYPE in accept:
+            return JSONResponse(await run_io(encode_baseline, baseline), media_type=COMPACT_BASELINE_MEDIA_TYPE)
+        return baseline
+            
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Error initializing binding analysis: {str(e)}")
+
+async def load_baseline_session(request: BindingCornerRequest):
+    """
+    Session behind a baseline_id: the cached session of the registered key, reloaded
+    when the cache evicted it, or the requested file when its id matches (baseline
+    registered by another worker).
+    """
+    key = baseline_registry.get(request.baseline_id)
+    if key is not None:
+        session = session_cache.get(key)
+        if session is not None:
+            return session
+    storage_path = key[0] if key is not None else request.storage_path
+    if storage_path:
+        session = await load_session(request.file_url, storage_path, BINDING_CHANNELS)
+        if baseline_id_for(session) == request.baseline_id:
+            baseline_registry.register(session)
+            return session
+    raise HTTPException(status_code=404, detail="Unknown or expired baseline_id, run /api/v1/analyze/binding/init again.")
+
+@router.post("/binding/corner")
+async def analyze_binding_corner(request: BindingCornerRequest):
+    if not request.baseline_id and not request.baseline:
+        raise HTTPException(status_code=400, detail="baseline_id or baseline is required.")
+    try:
+        if request.baseline_id:
+            session = await load_baseline_session(request)
+        else:
+            session = await load_session(request.file_url, request.storage_path, BINDING_CHANNELS)
+
+        # Analyze Corner
+        from app.core.binding_analyzer import analyze_binding_selection
+        geometry = await run_io(get_track_geometry, session)
+        results = await run_io(
+            analyze_binding_selection,
+            session.df, 
+            None if request.baseline_id else request.baseline,
+            request.click_x, 
+            request.click_y, 
+            request.search_radius,
+            lap_index=get_lap_index(session),
+            geometry=geometry,
+            session_tree=await run_io(get_session_tree, session)
+        )
+        return results
+            
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Error analyzing corner: {str(e)}")
+
+@router.post("/reference")
+async def analyze_reference(request: ReferenceAnalysisRequest):
+    try:
+        session = await load_session(request.file_url, request.storage_path, BINDING_CHANNELS)
+
+        # Analyze Reference
+        from app.core.binding_analyzer import analyze_reference_fastest_lap
+        geometry = await run_io(get_track_geometry, session)
+        results = await run_io(
+            analyze_reference_fastest_lap,
+            session.df,
+            session.metadata,
+            lap_index=get_lap_index(session),
+            geometry=geometry
+        )
+        return results
+            
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Error analyzing reference: {str(e)}")
+
+class SectorAnalysisRequest(BaseModel):
+    file_url: str
+    storage_path: Optional[str] = None
+    # sectors.SECTOR_COUNT when omitted
+    sectors: Optional[int] = None
+
+@router.post("/sectors")
+async def analyze_sectors(request: SectorAnalysisRequest):
+    if request.sectors is not None and not 1 <= request.sectors <= 500:
+        raise HTTPException(status_code=400, detail="sectors must be between 1 and 500.")
+    try:
+        from app.core.sectors import SECTOR_COUNT
+        session = await load_session(request.file_url, request.storage_path, LAP_METRICS_CHANNELS)
+        table = await run_io(compute_session_sectors, session, request.sectors or SECTOR_COUNT)
+        if table is None:
+            raise HTTPException(status_code=422, detail="No complete lap with GPS data to split into sectors.")
+        return table
+
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Error analyzing sectors: {str(e)}")
+
+class LapOverlayRequest(BaseModel):
+    file_url: str
+    storage_path: Optional[str] = None
+    laps: Optional[List[int]] = None
+    channels: Optional[List[str]] = None
+    reference_lap: Optional[int] = None
+    # Grid step in meters, lap_alignment.ALIGN_STEP_M when omitted
+    step: Optional[float] = None
+
+@router.post("/overlay")
+async def analyze_overlay(request: LapOverlayRequest):
+    """Channels of the requested laps on a common distance grid, with their delta-time to a reference lap."""
+    if request.step is not None and not 0.25 <= request.step <= 50:
+        raise HTTPException(status_code=400, detail="step must be between 0.25 and 50 meters.")
+    try:
+        session = await load_session(request.file_url, request.storage_path, OVERLAY_CHANNELS)
+        # Sessions hold the telemetry.OVERLAY_CHANNELS of the export, other channels are skipped
+        channels = None if request.channels is None else [c for c in request.channels if c in session.df.columns]
+        matrix = await run_io(get_lap_matrix, session, channels, request.step)
+        if matrix is None:
+            raise HTTPException(status_code=422, detail="No complete lap with GPS data to align.")
+
+        import numpy as np
+        laps = [n for n in (request.laps or matrix.laps) if n in matrix.laps]
+        elapsed = matrix.channel("Time")
+        reference = request.reference_lap
+        if reference not in matrix.laps:
+            # Fastest aligned lap
+            reference = matrix.laps[int(np.argmin(elapsed[:, -1]))]
+
+        return {
+            "distance": matrix.distance.tolist(),
+            "reference_lap": reference,
+            "laps": [
+                {
+                    "lap": n,
+                    "channels": {name: matrix.lap(n)[:, k].tolist() for k, name in enumerate(matrix.channels)},
+                    "delta_time": matrix.delta_time(n, reference).tolist()
+                }
+                for n in laps
+            ]
+        }
+
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Error aligning laps: {str(e)}")
+
+class TrackPathRequest(BaseModel):
+    file_url: str
+    storage_path: Optional[str] = None
+    # Level of detail (0 = coarsest); all levels when omitted
+    level: Optional[int] = None
+
+@router.post("/track-path")
+async def analyze_track_path(request: TrackPathRequest):
+    """Session path at one or every level of detail, as packed [x0, y0, x1, y1, ...] arrays in meters."""
+    try:
+        session = await load_session(request.file_url, request.storage_path, LAP_METRICS_CHANNELS)
+        pyramid = await run_io(get_path_pyramid, session)
+        if pyramid is None:
+            raise HTTPException(status_code=422, detail="The session has no GPS data.")
+        if request.level is not None and not 0 <= request.level < len(pyramid):
+            raise HTTPException(status_code=400, detail=f"level must be between 0 and {len(pyramid) - 1}.")
+
+        levels = [request.level] if request.level is not None else range(len(pyramid))
+        return {
+            "origin": pyramid.origin,
+            "levels": pyramid.describe(),
+            "paths": {str(lod): pyramid.level(lod) for lod in levels}
+        }
+
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Error building track path: {str(e)}")
+
+class CornerHistoryRequest(BaseModel):
+    # Corner location: GPS position, or a click in the frame of a baseline origin
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+    click_x: Optional[float] = None
+    click_y: Optional[float] = None
+    origin: Optional[List[float]] = None
+    radius: float = 25.0
+    venue: Optional[str] = None
+    driver: Optional[str] = None
+    user_id: Optional[str] = None
+    track_id: Optional[str] = None
+    date_from: Optional[str] = None
+    date_to: Optional[str] = None
+
+@router.post("/binding/history")
+async def analyze_binding_history(request: CornerHistoryRequest):
+    """Features of one corner across every catalogued session matching the filters, with their trends."""
+    if request.lat is not None and request.lon is not None:
+        lat, lon = request.lat, request.lon
+    elif request.click_x is not None and request.click_y is not None and request.origin and len(request.origin) == 2:
+        from app.core.binding_analyzer import xy_to_lat_lon
+        lat, lon = xy_to_lat_lon(request.click_x, request.click_y, request.origin)
+        lat, lon = float(lat), float(lon)
+    else:
+        raise HTTPException(status_code=400, detail="Provide lat/lon, or click_x/click_y with the baseline origin.")
+
+    try:
+        history = await run_io(
+            catalog.corner_history,
+            lat,
+            lon,
+            radius=request.radius,
+            venue=request.venue,
+            driver=request.driver,
+            user_id=request.user_id,
+            track_id=request.track_id,
+            date_from=request.date_from,
+            date_to=request.date_to
+        )
+        return {
+            "corner": {"lat": lat, "lon": lon},
+            "sessions": history,
+            "trends": feature_trends(history)
+        }
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Corner history error: {str(e)}")
+
+@router.post("/binding/ai")
+async def analyze_binding_ai_endpoint(request: BindingAIRequest):
+    try:
+        import numpy as np
+        from app.core.ai_interpreter import analyze_binding_ai
+
+        # 1. Find Matching Reference Corner
+        click_point = np.array([request.click_x, request.click_y])
+        
+        min_dist = float('inf')
+        ref_corner = None
+        
+        for rc in request.reference_corners:
+            rc_point = np.array([rc['apex_x'], rc['apex_y']])
+            dist = np.linalg.norm(click_point - rc_point)
+            if dist < min_dist:
+                min_dist = dist
+                ref_corner = rc
+        
+        # Threshold for valid match (e.g. 50m)
+        if min_dist > 50.0 or ref_corner is None:
+            return {"error": "No matching reference corner found near selection."}
+            
+        # 2. Format Reference Data (Prompt Key Mapping)
+        reference_data = {
+            "Corner_ID": ref_corner['corner_index'],
+            "RPM_slope_ref": ref_corner['rpm_slope'],
+            "Speed_gain_ref": ref_corner['speed_gain'],
+            "Time_to_DeltaV_ref": ref_corner.get('time_to_deltav', 0.0), # Use .get for backward compatibility
+            "RPM_vs_Speed_corr_ref": ref_corner.get('rpm_speed_corr', 0.0),
+            "LatG_decay_ref": ref_corner['lat_g_decay'],
+            "Longitudinal_efficiency_ref": ref_corner['long_efficiency']
+        }
+        
+        # 3. Format Target Data (Prompt Key Mapping)
+        target_data = []
+        for lap in request.target_corner_data:
+            target_data.append({
+                "Lap": lap['lap'],
+                "RPM_slope": lap['rpm_slope'],
+                "Speed_gain": lap['speed_gain'],
+                "Time_to_DeltaV": lap.get('time_to_deltav', 0.0),
+                "RPM_vs_Speed_corr": lap.get('rpm_speed_corr', 0.0),
+                "LatG_decay": lap['lat_g_decay'],
+                "Longitudinal_efficiency": lap['long_efficiency']
+            })
+            
+        # 4. Call AI
+        result = await run_io(analyze_binding_ai, target_data, reference_data, MISTRAL_API_KEY)
+        return result
+        
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Error running AI analysis: {str(e)}")
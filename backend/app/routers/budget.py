@@ -3,6 +3,7 @@ from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 import os
 from app.core.budget_agent import process_budget_chat
+from app.core.executors import run_io
 
 router = APIRouter()
 
@@ -20,7 +21,8 @@ async def budget_chat(request: ChatRequest):
         # Use provided API key or fallback to env
         api_key = request.api_key or os.getenv("MISTRAL_API_KEY", "9WzPqRnYfvFcH6Osj6KVQOIK1gPjNfrH")
         
-        response = process_budget_chat(
+        response = await run_io(
+            process_budget_chat,
             [msg.dict() for msg in request.messages], 
             api_key
         )
@@ -0,0 +1,45 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+import json
+from app.core.jobs import job_queue, job_view, FINISHED
+
+router = APIRouter()
+
+# Seconds between SSE status checks (also the keep-alive interval)
+SSE_INTERVAL = 15.0
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_view(job)
+
+@router.get("/{job_id}/events")
+async def job_events(job_id: str):
+    """Server-Sent Events: a 'status' event on every change, the last one carries the result."""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def stream():
+        current = job
+        last_status = None
+        while True:
+            if current is None:
+                yield f"event: error\ndata: {json.dumps({'detail': 'Job not found'})}\n\n"
+                return
+            if current["status"] != last_status:
+                last_status = current["status"]
+                yield f"event: status\ndata: {json.dumps(job_view(current))}\n\n"
+            else:
+                yield ": keep-alive\n\n"
+            if current["status"] in FINISHED:
+                return
+            current = await job_queue.wait(job_id, SSE_INTERVAL)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
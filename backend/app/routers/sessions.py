@@ -0,0 +1,226 @@
+from fastapi import APIRouter, UploadFile, File, Form, Header, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from typing import Optional
+import os
+import time
+import shutil
+import tempfile
+import traceback
+import urllib.parse
+from app.core.executors import run_io, run_cpu
+from app.core.metrics import record_bytes
+from app.core.gcs import get_bucket, GCS_BUCKET_NAME, TRANSFER_CHUNK_SIZE
+from app.core.session_cache import session_cache
+from app.core.catalog import catalog
+from app.core.telemetry import LAP_METRICS_CHANNELS
+from app.api.sessions import load_session, get_lap_geometry, catalog_session
+
+router = APIRouter()
+
+@router.post("/upload-session-gcs")
+async def upload_session_gcs(
+    file: UploadFile = File(...),
+    track_id: str = Form(...),
+    user_id: str = Form(...)
+):
+    try:
+        # 1. Shared bucket handle (existence checked once per process)
+        bucket = await run_io(get_bucket)
+        
+        # 2. Define Path
+        blob_name = f"sessions/{user_id}/{track_id}/{int(time.time())}_{file.filename}"
+        blob = bucket.blob(blob_name)
+        
+        # 3. Upload content: resumable upload streamed from the spooled request body, chunk by chunk
+        blob.chunk_size = TRANSFER_CHUNK_SIZE
+        await run_io(
+            blob.upload_from_file,
+            file.file, 
+            content_type=file.content_type or "application/octet-stream",
+            rewind=True
+        )
+        record_bytes("upload", blob.size or 0)
+        
+        # 4. Write the typed columnar sidecar (best effort, analyses fall back to the CSV)
+        session = None
+        try:
+            from app.core.session_store import sidecar_path, build_sidecar, SIDECAR_CONTENT_TYPE
+            from app.core.telemetry import SESSION_CHANNELS
+
+            # The spooled file has no path another process can open: copy it chunk by chunk
+            # to a named temporary file, parsed in the process pool with the session channels
+            fd, path = tempfile.mkstemp(prefix="upload-")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    await run_io(file.file.seek, 0)
+                    await run_io(shutil.copyfileobj, file.file, f, TRANSFER_CHUNK_SIZE)
+                df, metadata, sidecar_bytes = await run_cpu(build_sidecar, path, SESSION_CHANNELS)
+            finally:
+                os.remove(path)
+            record_bytes("parse", blob.size or 0)
+            sidecar = bucket.blob(sidecar_path(blob_name))
+            sidecar.metadata = {"source_generation": str(blob.generation)}
+            await run_io(sidecar.upload_from_string, sidecar_bytes, content_type=SIDECAR_CONTENT_TYPE)
+            del sidecar_bytes
+
+            # Warm the session cache with the parsed frame, the one later loads read from the sidecar
+            session = session_cache.put((blob_name, blob.generation), df, metadata)
+        except Exception as e:
+            print(f"Sidecar generation failed for {blob_name}: {e}")
+        
+        # 5. Index the session in the catalog (best effort)
+        if session is not None:
+            try:
+                await run_io(catalog_session, blob_name, session, user_id=user_id, track_id=track_id)
+            except Exception as e:
+                print(f"Catalog indexing failed for {blob_name}: {e}")
+        
+        # 6. Generate Backend Download URL
+        backend_url = os.getenv("VITE_API_URL", "http://localhost:8000")
+        url = f"{backend_url}/api/v1/sessions/download?storage_path={urllib.parse.quote(blob_name)}"
+        
+        return {
+            "name": blob_name,
+            "bucket": GCS_BUCKET_NAME,
+            "url": url
+        }
+    except Exception as e:
+        print(f"DEBUG: GCS Upload failed. Bucket: {GCS_BUCKET_NAME}")
+        traceback.print_exc()
+        if "404" in str(e) and "bucket does not exist" in str(e):
+             raise HTTPException(
+                status_code=404, 
+                detail=f"Bucket '{GCS_BUCKET_NAME}' not found. Verify credentials."
+            )
+        raise HTTPException(status_code=500, detail=f"GCS Upload Error: {str(e)}")
+
+def parse_range(range_header, size):
+    """
+    Parses a single-range 'bytes=' Range header.
+
+    Returns:
+        tuple: Inclusive (start, end) byte offsets, or None to serve the whole file.
+
+    Raises:
+        HTTPException: 416 if the range lies outside the file.
+    """
+    if not range_header or not range_header.startswith("bytes=") or "," in range_header:
+        return None
+    first, _, last = range_header[len("bytes="):].strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        else:
+            # Suffix range: the last N bytes
+            start = max(size - int(last), 0)
+            end = size - 1
+    except ValueError:
+        return None
+    if start > end or start >= size:
+        raise HTTPException(status_code=416, detail="Requested range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+@router.get("/sessions/download")
+async def download_session(storage_path: str, range: Optional[str] = Header(None)):
+    try:
+        bucket = await run_io(get_bucket)
+        blob = await run_io(bucket.get_blob, storage_path)
+        
+        if blob is None:
+             raise HTTPException(status_code=404, detail="File not found in GCS")
+             
+        size = blob.size or 0
+        filename = storage_path.split("/")[-1]
+        headers = {"Content-Disposition": f"attachment; filename={filename}", "Accept-Ranges": "bytes"}
+        
+        byte_range = parse_range(range, size)
+        if byte_range is None:
+            start, end, status_code = 0, size - 1, 200
+        else:
+            start, end = byte_range
+            status_code = 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        headers["Content-Length"] = str(end - start + 1)
+        
+        async def stream():
+            # One ranged GCS read per chunk, pinned to the generation the headers describe
+            position = start
+            while position <= end:
+                chunk_end = min(end, position + TRANSFER_CHUNK_SIZE - 1)
+                yield await run_io(blob.download_as_bytes, start=position, end=chunk_end, if_generation_match=blob.generation)
+                position = chunk_end + 1
+        
+        return StreamingResponse(
+            stream(),
+            status_code=status_code,
+            media_type="application/octet-stream",
+            headers=headers
+        )
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        print(f"Download Error: {e}")
+        raise HTTPException(status_code=500, detail="Error downloading file")
+
+class ProcessSessionRequest(BaseModel):
+    file_url: str
+    storage_path: Optional[str] = None
+
+@router.post("/sessions/process-csv")
+async def process_session_csv(request: ProcessSessionRequest):
+    try:
+        # Download and parse (cached per storage path + generation)
+        session = await load_session(request.file_url, request.storage_path, LAP_METRICS_CHANNELS)
+
+        # Compute Metrics
+        from app.core.analyzer import compute_lap_metrics
+        lap_index, geometry = await run_io(get_lap_geometry, session)
+        metrics = await run_io(compute_lap_metrics, session.df, session.metadata, lap_index, geometry)
+        
+        # Merge metadata into response
+        response_data = {
+            "metrics": metrics,
+            "metadata": session.metadata
+        }
+        
+        return response_data
+            
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Error processing session file: {str(e)}")
+
+@router.get("/sessions/catalog")
+async def query_catalog(
+    venue: Optional[str] = None,
+    driver: Optional[str] = None,
+    user_id: Optional[str] = None,
+    track_id: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    limit: int = 100,
+    include_laps: bool = False
+):
+    """Sessions matching the filters (venue/driver case-insensitive, ISO dates inclusive), newest first."""
+    try:
+        sessions = await run_io(
+            catalog.query,
+            venue=venue,
+            driver=driver,
+            user_id=user_id,
+            track_id=track_id,
+            date_from=date_from,
+            date_to=date_to,
+            limit=min(max(limit, 1), 1000),
+            include_laps=include_laps
+        )
+        return {"count": len(sessions), "sessions": sessions}
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Catalog query error: {str(e)}")
+
+@router.get("/sessions/cache-stats")
+def session_cache_stats():
+    return session_cache.stats()
+
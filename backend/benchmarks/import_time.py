@@ -0,0 +1,94 @@
+"""
+Import-time budget of the backend app, measured with `python -X importtime`.
+
+Usage (from the backend directory):
+    python -m benchmarks.import_time [--module main] [--budget-ms 1000] [--top 15]
+
+Imports the module in a fresh interpreter and fails (exit status 1) when its
+cumulative import time exceeds the budget, or when a module that must stay lazy
+(pandas, numpy, scipy, GCS, Mistral, ...) is imported at startup. The lazy check does
+not depend on the machine; the budget does, keep some margin.
+"""
+import os
+import sys
+import argparse
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded on first use or by the background warm-up (app.core.warmup), never by the app import
+LAZY_MODULES = (
+    "numpy",
+    "pandas",
+    "scipy",
+    "pyarrow",
+    "requests",
+    "google.cloud.storage",
+    "mistralai",
+)
+DEFAULT_BUDGET_MS = 1000.0
+
+def import_times(module):
+    """
+    Runs `python -X importtime -c "import <module>"` in the backend directory.
+
+    Returns:
+        list: (name, self_us, cumulative_us, depth) of every imported module, in report order.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3:
+            continue
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(fields[0]), int(fields[1]), depth))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the import-time budget of the backend app.")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=15, help="Heaviest imports to print")
+    args = parser.parse_args()
+
+    rows = import_times(args.module)
+    total = next((cumulative for name, _, cumulative, _ in rows if name == args.module), None)
+    if total is None:
+        print(f"{args.module} not found in the importtime report")
+        sys.exit(1)
+
+    # Heaviest imports made directly by the app's own modules
+    print(f"{'module':<48} {'cumulative ms':>14}")
+    direct = sorted((r for r in rows if r[3] <= 1), key=lambda r: -r[2])
+    for name, _, cumulative, _ in direct[:args.top]:
+        print(f"{name:<48} {cumulative / 1000:>14.1f}")
+
+    failures = []
+    if total / 1000 > args.budget_ms:
+        failures.append(f"import {args.module} took {total / 1000:.0f} ms, budget {args.budget_ms:.0f} ms")
+    imported = {name for name, _, _, _ in rows}
+    eager = [name for name in LAZY_MODULES if name in imported]
+    if eager:
+        failures.append(f"modules that must load lazily were imported at startup: {', '.join(eager)}")
+
+    print(f"\nimport {args.module}: {total / 1000:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+    print("OK")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Benchmarks of the analysis hot paths on synthetic AiM sessions.
+
+Usage (from the backend directory):
+    python -m benchmarks.run [--sizes small,medium,large] [--repeat 9] [--tolerance 0.3]
+    python -m benchmarks.run --save          # record the current numbers as the baseline
+
+Every function is called once to warm up, timed `repeat` times per session size (median
+and min reported), and run once more under tracemalloc for its peak memory. Results are
+compared with benchmarks/baseline.json: a median time or peak memory more than
+`tolerance` above the baseline is reported as a regression and the command exits
+with status 1.
+Baselines depend on the machine: save them on the one the comparison runs on.
+"""
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import tracemalloc
+
+from app.core.data_loader import load_csv
+from app.core.telemetry import SESSION_CHANNELS
+from app.core.analyzer import compute_lap_metrics, compute_circuit_characteristics
+from app.core.lap_index import LapIndex
+from app.core.binding_analyzer import (
+    analyze_binding, analyze_binding_selection, analyze_reference_fastest_lap,
+    build_track_geometry, build_session_tree
+)
+from benchmarks.synthetic import synthetic_session
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# name -> (sample rate in Hz, duration in seconds)
+SIZES = {
+    "small": (10, 300.0),
+    "medium": (20, 900.0),
+    "large": (50, 1800.0),
+}
+# Differences below this are timer noise, never regressions (seconds / MB); millisecond
+# scale functions jitter by a few ms between runs on an unchanged tree
+MIN_TIME_DELTA = 0.005
+MIN_MEMORY_DELTA = 1.0
+
+def prepare(size):
+    """Synthetic CSV of a size and the artifacts the endpoints keep per cached session."""
+    hz, duration = SIZES[size]
+    content = synthetic_session(hz=hz, duration=duration)
+    df, metadata = load_csv(io.BytesIO(content), SESSION_CHANNELS)
+    lap_index = LapIndex.from_metadata(df, metadata)
+    geometry = build_track_geometry(lap_index)
+    baseline = analyze_binding(df, metadata, lap_index=lap_index, geometry=geometry)
+
+    # Click on the apex of the first corner of the baseline
+    corner = baseline["is_corner"].index(True) if True in baseline["is_corner"] else len(baseline["x"]) // 2
+    click = (baseline["x"][corner], baseline["y"][corner])
+    return {
+        "content": content,
+        "df": df,
+        "metadata": metadata,
+        "lap_index": lap_index,
+        "geometry": geometry,
+        "baseline": baseline,
+        "session_tree": build_session_tree(geometry),
+        "click": click,
+        "rows": len(df),
+    }
+
+def cases(ctx):
+    """(name, callable) of every benchmarked function, called as the endpoints call it."""
+    df, metadata = ctx["df"], ctx["metadata"]
+    return [
+        ("load_csv", lambda: load_csv(io.BytesIO(ctx["content"]), SESSION_CHANNELS)),
+        ("compute_lap_metrics", lambda: compute_lap_metrics(df, metadata)),
+        ("compute_circuit_characteristics", lambda: compute_circuit_characteristics(df)),
+        ("analyze_binding", lambda: analyze_binding(df, metadata)),
+        ("analyze_binding_selection", lambda: analyze_binding_selection(
+            df, ctx["baseline"], ctx["click"][0], ctx["click"][1],
+            lap_index=ctx["lap_index"], geometry=ctx["geometry"], session_tree=ctx["session_tree"]
+        )),
+        ("analyze_reference_fastest_lap", lambda: analyze_reference_fastest_lap(
+            df, metadata, lap_index=ctx["lap_index"], geometry=ctx["geometry"]
+        )),
+    ]
+
+def measure(func, repeat):
+    """Median and min wall time over repeat calls after a warm-up call, then the peak traced memory of one call."""
+    # Warm-up: first-call costs (imports, caches, page faults) are not what is measured
+    func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "median_s": statistics.median(timings),
+        "min_s": min(timings),
+        "peak_mb": peak / 1e6,
+    }
+
+def compare(results, baseline, tolerance):
+    """Regressions of results against baseline, as printable lines."""
+    regressions = []
+    for size, functions in results.items():
+        for name, current in functions.items():
+            previous = baseline.get(size, {}).get(name)
+            if previous is None:
+                continue
+            if (current["median_s"] > previous["median_s"] * (1 + tolerance)
+                    and current["median_s"] - previous["median_s"] > MIN_TIME_DELTA):
+                regressions.append(
+                    f"{size}/{name}: time {previous['median_s'] * 1000:.1f} -> {current['median_s'] * 1000:.1f} ms"
+                )
+            if (current["peak_mb"] > previous["peak_mb"] * (1 + tolerance)
+                    and current["peak_mb"] - previous["peak_mb"] > MIN_MEMORY_DELTA):
+                regressions.append(
+                    f"{size}/{name}: peak memory {previous['peak_mb']:.1f} -> {current['peak_mb']:.1f} MB"
+                )
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the analysis hot paths on synthetic sessions.")
+    parser.add_argument("--sizes", default=",".join(SIZES))
+    parser.add_argument("--repeat", type=int, default=9)
+    parser.add_argument("--tolerance", type=float, default=0.3, help="Allowed slowdown, 0.3 = +30%%")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save", action="store_true", help="Write the results as the new baseline")
+    args = parser.parse_args()
+
+    sizes = [s for s in args.sizes.split(",") if s]
+    unknown = [s for s in sizes if s not in SIZES]
+    if unknown:
+        parser.error(f"unknown sizes {unknown}, choose from {list(SIZES)}")
+
+    results = {}
+    for size in sizes:
+        ctx = prepare(size)
+        hz, duration = SIZES[size]
+        print(f"\n{size}: {hz} Hz, {duration:.0f} s, {ctx['rows']} rows, {len(ctx['content']) / 1e6:.1f} MB CSV")
+        print(f"  {'function':<32} {'median ms':>10} {'min ms':>10} {'peak MB':>10}")
+        results[size] = {}
+        for name, func in cases(ctx):
+            result = measure(func, args.repeat)
+            results[size][name] = result
+            print(f"  {name:<32} {result['median_s'] * 1000:>10.1f} {result['min_s'] * 1000:>10.1f} {result['peak_mb']:>10.1f}")
+
+    if args.save:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"machine": platform.platform(), "python": platform.python_version(), **results}, f, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}, run with --save to record one.")
+        return
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) against {args.baseline} (tolerance {args.tolerance:.0%}):")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print(f"\nNo regression against {args.baseline} (tolerance {args.tolerance:.0%}).")
+
+if __name__ == "__main__":
+    main()
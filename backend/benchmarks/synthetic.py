@@ -0,0 +1,166 @@
+"""
+Synthetic AiM CSV sessions for the benchmarks.
+
+Usage:
+    python -m benchmarks.synthetic <output.csv> [--hz 20] [--duration 600] [--seed 0]
+
+The kart drives a closed track with corners of different radii. Speed follows the
+curvature (grip-limited in corners, capped on the straights), laps vary by about 1%,
+and the file carries the AiM header block (Venue, Sample Rate, Beacon Markers,
+Segment Times, ...) followed by the GPS, acceleration, RPM and temperature channels.
+"""
+import io
+import argparse
+import numpy as np
+
+CHANNELS = (
+    "Time", "GPS Speed", "GPS Nsat", "GPS LatAcc", "GPS LonAcc", "GPS Slope", "GPS Heading",
+    "GPS Latitude", "GPS Longitude", "GPS Altitude", "RPM", "Water Temp", "Exhaust Temp"
+)
+UNITS = ("s", "km/h", "#", "g", "g", "%", "deg", "deg", "deg", "m", "rpm", "C", "C")
+# Other channels of a MyChron 5 export that no analysis reads, written as noise (name, unit, level)
+EXTRA_CHANNELS = (
+    ("GPS PosAccuracy", "mm", 800.0), ("GPS SpdAccuracy", "km/h", 0.5), ("GPS Radius", "m", 50.0),
+    ("GPS Gyro", "deg/s", 10.0), ("Distance on GPS Speed", "m", 1000.0), ("Luminosity", "#", 40.0),
+    ("Battery", "V", 4.0), ("Internal Battery", "V", 4.0), ("AccelerometerX", "g", 0.5),
+    ("AccelerometerY", "g", 0.5), ("AccelerometerZ", "g", 1.0), ("GyroX", "deg/s", 10.0),
+    ("GyroY", "deg/s", 10.0), ("GyroZ", "deg/s", 10.0), ("Master Clk", "s", 1000.0),
+    ("Lap Time", "s", 60.0), ("Best Run Diff", "s", 1.0), ("Best Today Diff", "s", 1.0),
+    ("Predictive Time", "s", 60.0), ("Ref Lap Diff", "s", 1.0), ("Roll Time", "s", 60.0),
+    ("Oil Temp", "C", 90.0), ("Lambda", "#", 1.0), ("Exhaust Temp 2", "C", 600.0),
+)
+
+# Track origin (Lonato-like latitude)
+ORIGIN = (45.4, 10.5)
+# Grip and speed limits of the speed profile
+MAX_LAT_G = 1.6
+MIN_SPEED = 11.0
+MAX_SPEED = 31.0
+RPM_PER_MS = 460.0
+
+def track_centerline(step=1.0):
+    """Closed centerline resampled every step meters, with its curvature."""
+    theta = np.linspace(0, 2 * np.pi, 4000, endpoint=False)
+    radius = 130 + 40 * np.sin(3 * theta) + 20 * np.cos(5 * theta) + 12 * np.sin(7 * theta)
+    x = np.append(radius * np.cos(theta), radius[0] * np.cos(theta[0]))
+    y = np.append(radius * np.sin(theta), radius[0] * np.sin(theta[0]))
+    arc = np.concatenate([[0.0], np.cumsum(np.hypot(np.diff(x), np.diff(y)))])
+
+    s = np.arange(0.0, arc[-1], step)
+    x, y = np.interp(s, arc, x), np.interp(s, arc, y)
+    dx, dy = np.gradient(x, step), np.gradient(y, step)
+    ddx, ddy = np.gradient(dx, step), np.gradient(dy, step)
+    curvature = (dx * ddy - dy * ddx) / np.power(dx ** 2 + dy ** 2, 1.5)
+    return s, x, y, curvature, float(arc[-1])
+
+def speed_profile(curvature, smoothing=40):
+    """Grip-limited speed (m/s) along the centerline, smoothed over `smoothing` meters."""
+    limit = np.sqrt(MAX_LAT_G * 9.81 / np.maximum(np.abs(curvature), 1e-6))
+    speed = np.clip(limit, MIN_SPEED, MAX_SPEED)
+    kernel = np.ones(smoothing) / smoothing
+    padded = np.concatenate([speed[-smoothing:], speed, speed[:smoothing]])
+    return np.convolve(padded, kernel, mode="same")[smoothing:-smoothing]
+
+def synthetic_session(hz=20, duration=600.0, seed=0, units_row=True, extra_channels=True, venue="Lonato", driver="Driver X"):
+    """
+    AiM CSV export of a synthetic session.
+
+    Args:
+        hz (int): Sample rate.
+        duration (float): Session length in seconds (the last lap may be incomplete).
+        seed (int): Random seed (noise and lap-to-lap variation).
+        units_row (bool): Write the units line Race Studio puts under the channel names.
+        extra_channels (bool): Also write the EXTRA_CHANNELS of a full export.
+
+    Returns:
+        bytes: CSV content, as exported by Race Studio.
+    """
+    rng = np.random.default_rng(seed)
+    s, tx, ty, curvature, length = track_centerline()
+    speed = speed_profile(curvature)
+    ds = np.diff(s, append=length)
+
+    # Time at every centerline point of every lap, each lap slightly faster or slower
+    base_lap = float(np.sum(ds / speed))
+    n_laps = int(np.ceil(duration / base_lap)) + 1
+    factors = 1 + 0.01 * rng.standard_normal(n_laps)
+    lap_times = base_lap * factors
+    point_times = np.concatenate([
+        start + np.cumsum(np.concatenate([[0.0], ds[:-1] / speed[:-1]])) * factor
+        for start, factor in zip(np.concatenate([[0.0], np.cumsum(lap_times)[:-1]]), factors)
+    ])
+    distance = np.concatenate([lap * length + s for lap in range(n_laps)])
+
+    t = np.arange(0.0, duration, 1.0 / hz)
+    travelled = np.interp(t, point_times, distance)
+    along = travelled % length
+    lap_of_sample = np.minimum((travelled // length).astype(int), n_laps - 1)
+
+    x = np.interp(along, s, tx) + 0.3 * rng.standard_normal(len(t))
+    y = np.interp(along, s, ty) + 0.3 * rng.standard_normal(len(t))
+    v = np.interp(along, s, speed) / factors[lap_of_sample]
+    k = np.interp(along, s, curvature)
+
+    lat = ORIGIN[0] + y / 111132.92
+    lon = ORIGIN[1] + x / (111412.84 * np.cos(np.deg2rad(ORIGIN[0])))
+    heading = np.degrees(np.arctan2(np.gradient(x), np.gradient(y))) % 360
+    lat_g = v ** 2 * k / 9.81 + 0.05 * rng.standard_normal(len(t))
+    lon_g = np.gradient(v, t) / 9.81 + 0.05 * rng.standard_normal(len(t))
+    rpm = RPM_PER_MS * v + 80 * rng.standard_normal(len(t))
+    water = 48 + 6 * t / max(duration, 1.0) + 0.3 * rng.standard_normal(len(t))
+
+    data = np.column_stack([
+        t, v * 3.6 + 0.5 * rng.standard_normal(len(t)), np.full(len(t), 9.0), lat_g, lon_g,
+        np.zeros(len(t)), heading, lat, lon, np.full(len(t), 120.0), rpm, water, water + 520
+    ])
+
+    channels, units = list(CHANNELS), list(UNITS)
+    if extra_channels:
+        extras = np.column_stack([level * (1 + 0.1 * rng.standard_normal(len(t))) for _, _, level in EXTRA_CHANNELS])
+        data = np.column_stack([data, extras])
+        channels += [name for name, _, _ in EXTRA_CHANNELS]
+        units += [unit for _, unit, _ in EXTRA_CHANNELS]
+
+    beacons = np.cumsum(lap_times)
+    beacons = beacons[beacons < t[-1]]
+    segments = np.diff(np.concatenate([[0.0], beacons]))
+
+    out = io.StringIO()
+    def row(*values):
+        out.write(",".join(f'"{v}"' for v in values) + "\n")
+
+    row("Format", "AiM CSV File")
+    row("Venue", venue)
+    row("Vehicle", "Kart")
+    row("User", driver)
+    row("Data Source", "AiM GPS")
+    row("Comment", "synthetic")
+    row("Date", "Saturday, May 4, 2024")
+    row("Time", "10:30 AM")
+    row("Sample Rate", str(hz))
+    row("Duration", f"{t[-1]:.3f}")
+    row("Segment", "Session")
+    row("Beacon Markers", *[f"{b:.3f}" for b in beacons])
+    row("Segment Times", *[f"{int(d // 60)}:{d % 60:06.3f}" for d in segments])
+    out.write("\n")
+    row(*channels)
+    if units_row:
+        row(*units)
+    out.write("\n")
+    formats = ['"%.3f"'] + ['"%.7f"' if c in ("GPS Latitude", "GPS Longitude") else '"%.3f"' for c in channels[1:]]
+    np.savetxt(out, data, delimiter=",", fmt=formats)
+    return out.getvalue().encode("utf-8")
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic AiM CSV session.")
+    parser.add_argument("output")
+    parser.add_argument("--hz", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=600.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with open(args.output, "wb") as f:
+        f.write(synthetic_session(args.hz, args.duration, args.seed))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Batch ingestion of archived AiM CSV sessions into a local catalog.
+
+Usage:
+    python ingest.py <archive_dir> <catalog_dir> [--workers N] [--pattern "*.csv"]
+
+For every CSV under archive_dir (recursively) the catalog receives:
+    sessions/<relative path>.parquet   typed columnar session (same format as the upload sidecar)
+    results/<relative path>.json       metadata, lap metrics, circuit characteristics, per-corner features
+    manifest.jsonl                     one line per processed file, used to resume after a crash
+    catalog.db                         indexed SQLite catalog (same schema as the backend's CATALOG_DB)
+
+Re-running the command skips files already in the manifest with the same size and mtime.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import fnmatch
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from app.core.data_loader import load_csv
+from app.core.analyzer import compute_lap_metrics, compute_circuit_characteristics
+from app.core.binding_analyzer import build_track_geometry, corner_feature_table
+from app.core.lap_index import LapIndex
+from app.core.session_store import write_session_parquet, SIDECAR_SUFFIX
+from app.core.catalog import Catalog
+
+MANIFEST_NAME = "manifest.jsonl"
+CATALOG_NAME = "catalog.db"
+
+def _json_default(value):
+    # numpy scalars / arrays in analysis results
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return str(value)
+
+def _write_atomic(path, data):
+    """Writes to a temporary file then renames it, so a crash never leaves a truncated output."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def find_sessions(archive_dir, pattern="*.csv"):
+    """Relative paths of the files matching pattern under archive_dir, sorted."""
+    found = []
+    for root, _, files in os.walk(archive_dir):
+        for name in files:
+            if fnmatch.fnmatch(name.lower(), pattern.lower()):
+                found.append(os.path.relpath(os.path.join(root, name), archive_dir))
+    return sorted(found)
+
+def load_manifest(catalog_dir):
+    """Manifest entries of successfully ingested files, keyed by relative path."""
+    done = {}
+    path = os.path.join(catalog_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # Last line cut by a crash
+                continue
+            if entry.get("status") == "ok":
+                done[entry["path"]] = entry
+    return done
+
+def ingest_file(archive_dir, catalog_dir, rel_path):
+    """
+    Parses one session and writes its Parquet and results files to the catalog.
+
+    Runs in a worker process.
+
+    Returns:
+        dict: Manifest entry (path, size, mtime, status, rows, seconds[, error]).
+    """
+    src = os.path.join(archive_dir, rel_path)
+    stat = os.stat(src)
+    entry = {"path": rel_path, "size": stat.st_size, "mtime": stat.st_mtime}
+    start = time.perf_counter()
+    try:
+        df, metadata = load_csv(src)
+        if "Time" not in df.columns or df.empty:
+            raise ValueError("no telemetry rows with a Time channel")
+        # Lap index and geometry shared by the sector timing and the corner table
+        lap_index = LapIndex.from_metadata(df, metadata)
+        geometry = None
+        if "GPS Latitude" in df.columns and "GPS Longitude" in df.columns:
+            geometry = build_track_geometry(lap_index)
+        result = {
+            "path": rel_path,
+            "metadata": metadata,
+            "rows": len(df),
+            "lap_metrics": compute_lap_metrics(df, metadata, lap_index, geometry),
+            "characteristics": compute_circuit_characteristics(df),
+            "corners": corner_feature_table(df, metadata, lap_index, geometry) if geometry is not None else []
+        }
+        _write_atomic(
+            os.path.join(catalog_dir, "sessions", rel_path + SIDECAR_SUFFIX),
+            write_session_parquet(df, metadata)
+        )
+        _write_atomic(
+            os.path.join(catalog_dir, "results", rel_path + ".json"),
+            json.dumps(result, default=_json_default).encode("utf-8")
+        )
+        entry.update(status="ok", rows=len(df), result=result)
+    except Exception as e:
+        entry.update(status="error", error=str(e))
+    entry["seconds"] = round(time.perf_counter() - start, 3)
+    return entry
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest archived AiM CSV sessions into a local catalog.")
+    parser.add_argument("archive_dir")
+    parser.add_argument("catalog_dir")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--pattern", default="*.csv")
+    args = parser.parse_args()
+
+    os.makedirs(args.catalog_dir, exist_ok=True)
+    done = load_manifest(args.catalog_dir)
+    pending = []
+    for rel_path in find_sessions(args.archive_dir, args.pattern):
+        stat = os.stat(os.path.join(args.archive_dir, rel_path))
+        previous = done.get(rel_path)
+        if previous and previous["size"] == stat.st_size and previous["mtime"] == stat.st_mtime:
+            continue
+        pending.append(rel_path)
+
+    print(f"{len(pending)} files to ingest ({len(done)} already in the catalog)")
+    if not pending:
+        return
+
+    session_catalog = Catalog(os.path.join(args.catalog_dir, CATALOG_NAME))
+    ok = failed = 0
+    total_bytes = 0
+    start = time.perf_counter()
+    with open(os.path.join(args.catalog_dir, MANIFEST_NAME), "a", encoding="utf-8") as manifest, \
+            ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(ingest_file, args.archive_dir, args.catalog_dir, p) for p in pending]
+        for i, future in enumerate(as_completed(futures), 1):
+            entry = future.result()
+            result = entry.pop("result", None)
+            if result is not None:
+                session_catalog.upsert_session(
+                    result["path"],
+                    result["metadata"],
+                    lap_metrics=result["lap_metrics"],
+                    characteristics=result["characteristics"],
+                    uploaded_at=entry["mtime"],
+                    corners=result["corners"]
+                )
+            manifest.write(json.dumps(entry) + "\n")
+            manifest.flush()
+            os.fsync(manifest.fileno())
+
+            total_bytes += entry["size"]
+            if entry["status"] == "ok":
+                ok += 1
+            else:
+                failed += 1
+                print(f"FAILED {entry['path']}: {entry['error']}")
+
+            if i % 50 == 0 or i == len(futures):
+                elapsed = time.perf_counter() - start
+                print(f"[{i}/{len(futures)}] {i / elapsed:.1f} files/s, {total_bytes / 1e6 / elapsed:.1f} MB/s")
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"Done: {ok} ingested, {failed} failed, {total_bytes / 1e6:.1f} MB in {elapsed:.1f}s "
+        f"({(ok + failed) / elapsed:.1f} files/s, {total_bytes / 1e6 / elapsed:.1f} MB/s)"
+    )
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Load test of the binding endpoints (init + corner clicks by baseline_id).
+
+Usage:
+    python load_test.py <storage_path> [--concurrency 1 4 16 32] [--requests 64]
+    python load_test.py <storage_path> --workers 1 2 4 [--port 8100]
+
+Without --workers the backend at API_URL (default http://localhost:8000) is measured
+as it runs; pass --label to record its worker count in the output. With --workers the
+script starts `uvicorn main:app --workers N` on --port for each count in turn, so the
+same client load is compared across server worker processes.
+
+Corner requests name the baseline returned by /analyze/binding/init (baseline_id)
+instead of posting its arrays back, as the frontend does.
+"""
+import os
+import sys
+import time
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+# Seconds a started server has to answer its health check
+STARTUP_TIMEOUT = 60.0
+
+def init_baseline(base_url, body):
+    response = requests.post(f"{base_url}/api/v1/analyze/binding/init", json=body)
+    response.raise_for_status()
+    return response.json()
+
+def run_level(base_url, body, baseline, concurrency, n_requests):
+    """
+    Fires n_requests requests (one init for three corner clicks) with `concurrency` clients.
+
+    Returns:
+        tuple: (requests per second, p50 seconds, p95 seconds, errors).
+    """
+    # Mix of clicks spread around the baseline lap
+    step = max(1, len(baseline["x"]) // 16)
+    clicks = [(baseline["x"][i], baseline["y"][i]) for i in range(0, len(baseline["x"]), step)]
+
+    def one_request(i):
+        start = time.perf_counter()
+        if i % 4 == 0:
+            r = requests.post(f"{base_url}/api/v1/analyze/binding/init", json=body)
+        else:
+            click_x, click_y = clicks[i % len(clicks)]
+            r = requests.post(
+                f"{base_url}/api/v1/analyze/binding/corner",
+                json={**body, "baseline_id": baseline["baseline_id"], "click_x": click_x, "click_y": click_y}
+            )
+        return r.status_code, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one_request, range(n_requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for _, latency in results)
+    errors = sum(1 for status, _ in results if status != 200)
+    p50 = latencies[len(latencies) // 2]
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    return len(results) / elapsed, p50, p95, errors
+
+def measure(base_url, storage_path, levels, n_requests, label):
+    body = {
+        "file_url": f"{base_url}/api/v1/sessions/download?storage_path={storage_path}",
+        "storage_path": storage_path
+    }
+    baseline = init_baseline(base_url, body)
+    if not baseline.get("baseline_id"):
+        raise RuntimeError("binding/init returned no baseline_id (session not stored in GCS?)")
+
+    for concurrency in levels:
+        throughput, p50, p95, errors = run_level(base_url, body, baseline, concurrency, n_requests)
+        print(
+            f"{label}  concurrency={concurrency:3d}  {throughput:7.1f} req/s  "
+            f"p50={p50 * 1000:7.1f}ms  p95={p95 * 1000:7.1f}ms  errors={errors}"
+        )
+
+def start_server(workers, port):
+    """Starts `uvicorn main:app --workers N` and waits for its health check."""
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)],
+        cwd=BACKEND_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/").status_code == 200:
+                return server
+        except requests.ConnectionError:
+            pass
+        if server.poll() is not None:
+            break
+        time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError(f"uvicorn with {workers} worker(s) did not start on port {port}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test of the binding init and corner endpoints.")
+    parser.add_argument("storage_path", nargs="?", default=os.getenv("LOAD_TEST_STORAGE_PATH"))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 32], help="Client concurrency levels")
+    parser.add_argument("--requests", type=int, default=int(os.getenv("LOAD_TEST_REQUESTS", "64")), help="Requests per level")
+    parser.add_argument("--workers", type=int, nargs="+", help="Server worker counts to start and compare")
+    parser.add_argument("--port", type=int, default=8100, help="Port of the servers started for --workers")
+    parser.add_argument("--label", default="workers=?", help="Label of the running server (e.g. its worker count)")
+    args = parser.parse_args()
+
+    if not args.storage_path:
+        parser.print_usage()
+        sys.exit(1)
+
+    try:
+        if not args.workers:
+            measure(os.getenv("API_URL", "http://localhost:8000"), args.storage_path, args.concurrency, args.requests, args.label)
+            return
+        for workers in args.workers:
+            server = start_server(workers, args.port)
+            try:
+                measure(f"http://127.0.0.1:{args.port}", args.storage_path, args.concurrency, args.requests, f"workers={workers}")
+            finally:
+                server.terminate()
+                server.wait()
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
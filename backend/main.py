@@ -1,35 +1,42 @@
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
-import shutil
 import os
 
 # Load environment variables
 load_dotenv()
-import json
-import pandas as pd
-import numpy as np
-from typing import List, Optional
-import io
-import traceback
-import urllib.parse
-import uuid
-from google.cloud import storage
-import requests
 import time
-from pydantic import BaseModel
-
-# Import core logic
-from app.core.data_loader import load_csv
-from app.core.analyzer import compute_circuit_characteristics, compute_lap_metrics
-from app.core.ai_interpreter import analyze_comparison, analyze_voice_command, analyze_binding_ai, analyze_lap_comparison
-from app.core.binding_analyzer import analyze_binding, analyze_binding_selection, analyze_reference_fastest_lap
-from app.routers import budget
-
-app = FastAPI(title="Karting Analysis Platform")
+import asyncio
+
+# Only light modules are imported here: pandas, numpy, scipy, GCS and Mistral are loaded
+# by the routers on first use, or earlier by the background warm-up
+from app.core.executors import run_io, shutdown_executors
+from app.core.metrics import registry as metrics_registry, REQUEST_LATENCY, PROFILE_HEADER, start_trace, end_trace, profile_requested
+from app.core.gcs import close_gcs_client
+from app.core.jobs import job_queue
+from app.core.warmup import warm_up
+from app.routers import budget, jobs, sessions, analysis
+from contextlib import asynccontextmanager
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Not awaited: startup completes (and the port is bound) while the heavy modules,
+    # the GCS bucket and the parsing processes load in the background
+    warm_up_task = asyncio.create_task(warm_up())
+    yield
+    warm_up_task.cancel()
+    await job_queue.shutdown()
+    close_gcs_client()
+    shutdown_executors()
+
+app = FastAPI(title="Karting Analysis Platform", lifespan=lifespan)
 
 # Include Routers
 app.include_router(budget.router, prefix="/api/v1/budget", tags=["budget"])
+app.include_router(jobs.router, prefix="/api/v1/jobs", tags=["jobs"])
+app.include_router(sessions.router, prefix="/api/v1", tags=["sessions"])
+app.include_router(analysis.router, prefix="/api/v1/analyze", tags=["analysis"])
 
 # CORS Configuration
 # Allow frontend URL from env, defaulting to localhost for dev
@@ -50,436 +57,63 @@ app.add_middleware(
     allow_headers=["Content-Type", "Authorization"],
 )
 
-# API Key (In production, use env vars)
-# For this rebuild, we'll try to load from env, fallback to hardcoded (dev only)
-MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY", "9WzPqRnYfvFcH6Osj6KVQOIK1gPjNfrH")
-# GCS bucket configuration
-GCS_BUCKET_NAME = os.getenv("GCS_BUCKET_NAME", "karting-sessions-483220")
-
-def get_gcs_client():
-    # Try to load from environment variable (JSON string) first - useful for Render
-    creds_json = os.getenv("GOOGLE_CREDENTIALS_JSON")
-    if creds_json:
-        try:
-            from google.oauth2 import service_account
-            creds_dict = json.loads(creds_json)
-            credentials = service_account.Credentials.from_service_account_info(creds_dict)
-            return storage.Client(credentials=credentials)
-        except Exception as e:
-            print(f"Error loading credentials from env: {e}")
-            # Fallback to file if env loading fails
-            
-    # Fallback to local file
-    try:
-        return storage.Client.from_service_account_json("service-account-key.json")
-    except Exception as e:
-        print(f"Error loading credentials from file: {e}")
-        # Last resort: default credentials (if running on GCP)
-        return storage.Client()
-
-@app.post("/api/v1/upload-session-gcs")
-async def upload_session_gcs(
-    file: UploadFile = File(...),
-    track_id: str = Form(...),
-    user_id: str = Form(...)
-):
+def route_template(request):
+    """Path template of the matched route, router prefix included (e.g. /api/v1/jobs/{job_id})."""
+    route = request.scope.get("route")
+    path_format = getattr(route, "path_format", None)
+    if path_format is None:
+        return "unmatched"
+    # Recent FastAPI versions keep included routes relative to their router prefix:
+    # the prefix is what the request path has in front of the rendered route path
     try:
-        # 1. Initialize Client
-        storage_client = get_gcs_client()
-        
-        # Ensure bucket exists
-        bucket = storage_client.bucket(GCS_BUCKET_NAME)
-        if not bucket.exists():
-            try:
-                bucket = storage_client.create_bucket(GCS_BUCKET_NAME)
-                print(f"Created bucket {GCS_BUCKET_NAME}")
-            except Exception as e:
-                print(f"Error creating bucket: {e}")
-                pass
-        
-        # 2. Define Path
-        blob_name = f"sessions/{user_id}/{track_id}/{int(time.time())}_{file.filename}"
-        blob = bucket.blob(blob_name)
-        
-        # 3. Upload content
-        content = await file.read()
-        blob.upload_from_string(
-            content, 
-            content_type=file.content_type or "application/octet-stream"
-        )
-        
-        # 4. Generate Backend Download URL
-        backend_url = os.getenv("VITE_API_URL", "http://localhost:8000")
-        url = f"{backend_url}/api/v1/sessions/download?storage_path={urllib.parse.quote(blob_name)}"
-        
-        return {
-            "name": blob_name,
-            "bucket": GCS_BUCKET_NAME,
-            "url": url
-        }
-    except Exception as e:
-        print(f"DEBUG: GCS Upload failed. Bucket: {GCS_BUCKET_NAME}")
-        traceback.print_exc()
-        if "404" in str(e) and "bucket does not exist" in str(e):
-             raise HTTPException(
-                status_code=404, 
-                detail=f"Bucket '{GCS_BUCKET_NAME}' not found. Verify credentials."
-            )
-        raise HTTPException(status_code=500, detail=f"GCS Upload Error: {str(e)}")
-
-@app.get("/api/v1/sessions/download")
-async def download_session(storage_path: str):
+        rendered = path_format.format(**{k: str(v) for k, v in request.scope.get("path_params", {}).items()})
+    except (KeyError, IndexError, ValueError):
+        return path_format
+    path = request.scope.get("path", "")
+    if rendered and path.endswith(rendered):
+        return path[:len(path) - len(rendered)] + path_format
+    return path_format
+
+@app.middleware("http")
+async def request_timing(request: Request, call_next):
+    """
+    Times every request into the latency histogram (by route template) and returns its
+    stages in a Server-Timing header. A request whose X-Profile header matches
+    PROFILE_TOKEN also gets its worker-thread stages profiled and dumped to PROFILE_DIR.
+    """
+    trace, token = start_trace(profile_requested(request.headers.get(PROFILE_HEADER)))
+    start = time.perf_counter()
+    status = 500
     try:
-        storage_client = get_gcs_client()
-        bucket = storage_client.bucket(GCS_BUCKET_NAME)
-        blob = bucket.blob(storage_path)
-        
-        if not blob.exists():
-             raise HTTPException(status_code=404, detail="File not found in GCS")
-             
-        content = blob.download_as_bytes()
-        filename = storage_path.split("/")[-1]
-        
-        from fastapi.responses import Response
-        return Response(
-            content=content,
-            media_type="application/octet-stream",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - start
+        REQUEST_LATENCY.observe(
+            elapsed,
+            method=request.method,
+            route=route_template(request),
+            status=str(status)
         )
-    except HTTPException as he:
-        raise he
-    except Exception as e:
-        print(f"Download Error: {e}")
-        raise HTTPException(status_code=500, detail="Error downloading file")
-
-@app.get("/")
-def read_root():
-    return {"message": "Karting Analysis API is running"}
-
-class AnalyzeMetricsRequest(BaseModel):
-    urls: List[str]
-    storage_paths: Optional[List[str]] = None
-    labels: List[str] = []
+        end_trace(token)
 
-class ProcessSessionRequest(BaseModel):
-    file_url: str
-    storage_path: Optional[str] = None
-
-@app.post("/api/v1/sessions/process-csv")
-async def process_session_csv(request: ProcessSessionRequest):
-    try:
-        # Download file using helper (handles URL + GCS fallback)
-        file_obj = await download_file_content(request.file_url, request.storage_path)
-        
-        # Load Data
+    timing = trace.server_timing()
+    response.headers["Server-Timing"] = f"{timing}, total;dur={elapsed * 1000:.1f}" if timing else f"total;dur={elapsed * 1000:.1f}"
+    if trace.profile:
+        name = f"{int(time.time() * 1000)}_{request.method}_{request.url.path.strip('/').replace('/', '_') or 'root'}"
         try:
-            df, metadata = load_csv(file_obj)
+            path = await run_io(trace.dump_profile, name)
+            if path:
+                response.headers["X-Profile-File"] = path
         except Exception as e:
-            traceback.print_exc()
-            raise HTTPException(status_code=400, detail="Invalid CSV format")
-
-        # Compute Metrics
-        metrics = compute_lap_metrics(df, metadata)
-        
-        # Merge metadata into response
-        response_data = {
-            "metrics": metrics,
-            "metadata": metadata
-        }
-        
-        return response_data
-            
-    except Exception as e:
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Error processing session file: {str(e)}")
-
-class AnalyzeAIRequest(BaseModel):
-    features1: dict
-    features2: dict
-    label1: str
-    label2: str
-    language: str = "en"
-
-class LapComparisonRequest(BaseModel):
-    url1: str
-    url2: str
-    label1: str
-    label2: str
-    storage_path1: Optional[str] = None
-    storage_path2: Optional[str] = None
-
-@app.post("/api/v1/analyze/lap-comparison")
-async def analyze_lap_comparison_endpoint(request: LapComparisonRequest):
-    try:
-        # Download files
-        file_obj1 = await download_file_content(request.url1, request.storage_path1)
-        file_obj2 = await download_file_content(request.url2, request.storage_path2)
-        
-        # Read content as string (assuming utf-8 or similar)
-        # Note: AiM CSVs might have different encodings. load_csv handles it, but here we want raw text?
-        # Or maybe we should use load_csv to clean it first?
-        # The prompt says "AiM CSV files". Raw text is safer for the AI to interpret "metadata" if it's in header.
-        # But we need to handle encoding.
-        
-        def read_file_content(f):
-            try:
-                return f.read().decode('utf-8')
-            except UnicodeDecodeError:
-                f.seek(0)
-                return f.read().decode('latin-1')
-        
-        content1 = read_file_content(file_obj1)
-        content2 = read_file_content(file_obj2)
-        
-        result = analyze_lap_comparison(
-            content1,
-            content2,
-            request.label1,
-            request.label2,
-            MISTRAL_API_KEY
-        )
-        
-        return result
-            
-    except Exception as e:
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Error analyzing lap comparison: {str(e)}")
-
-@app.post("/api/v1/analyze/metrics")
-async def analyze_metrics(request: AnalyzeMetricsRequest):
-    if len(request.urls) != 2:
-        raise HTTPException(status_code=400, detail="Exactly two file URLs are required.")
-    
-    results = []
-    
-    try:
-        for idx, url in enumerate(request.urls):
-            storage_path = request.storage_paths[idx] if request.storage_paths and idx < len(request.storage_paths) else None
-            
-            # Download file using helper (handles URL + GCS fallback)
-            file_obj = await download_file_content(url, storage_path)
-            
-            # Load Data
-            try:
-                df, _ = load_csv(file_obj)
-            except UnicodeDecodeError:
-                file_obj.seek(0)
-                df = pd.read_csv(file_obj, skiprows=range(0, 14), encoding='latin-1')
-                df.columns = df.columns.str.strip()
-                df = df.apply(pd.to_numeric, errors='coerce')
-
-            # Compute Metrics (now includes track_path)
-            feats = compute_circuit_characteristics(df)
-            
-            results.append({
-                "features": feats,
-                "label": request.labels[idx] if idx < len(request.labels) else f"Track {idx+1}"
-            })
-            
-        return results
-        
-    except Exception as e:
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Error analyzing metrics: {str(e)}")
-
-class VoiceCommandRequest(BaseModel):
-    text: str
-
-@app.post("/api/v1/analyze/voice-command")
-async def process_voice_command(request: VoiceCommandRequest):
-    try:
-        result = analyze_voice_command(request.text, MISTRAL_API_KEY)
-        return result
-    except Exception as e:
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Error processing voice command: {str(e)}")
-
-
-@app.post("/api/v1/analyze/ai")
-async def analyze_ai(request: AnalyzeAIRequest):
-    try:
-        # Strip track_path if present to save tokens and avoid errors
-        f1 = request.features1.copy()
-        f2 = request.features2.copy()
-        f1.pop('track_path', None)
-        f2.pop('track_path', None)
-
-        ai_analysis = analyze_comparison(
-            f1, 
-            f2, 
-            request.label1, 
-            request.label2, 
-            MISTRAL_API_KEY, 
-            request.language
-        )
-        return ai_analysis
-    except Exception as e:
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"AI Analysis Error: {str(e)}")
-
-class BindingInitRequest(BaseModel):
-    file_url: str
-    storage_path: Optional[str] = None
-
-class BindingCornerRequest(BaseModel):
-    file_url: str
-    storage_path: Optional[str] = None
-    baseline: dict
-    click_x: float
-    click_y: float
-    search_radius: float = 30.0
-
-class ReferenceAnalysisRequest(BaseModel):
-    file_url: str
-    storage_path: Optional[str] = None
-
-class BindingAIRequest(BaseModel):
-    target_corner_data: List[dict]
-    reference_corners: List[dict]
-    click_x: float
-    click_y: float
-
-async def download_file_content(file_url: str, storage_path: Optional[str] = None) -> io.BytesIO:
-    if storage_path:
-        try:
-            storage_client = get_gcs_client()
-            bucket = storage_client.bucket(GCS_BUCKET_NAME)
-            blob = bucket.blob(storage_path)
-            content = blob.download_as_bytes()
-            return io.BytesIO(content)
-        except Exception as e:
-            print(f"GCS Download failed for {storage_path}: {e}")
-            # Fallback to URL if GCS fails (though unlikely if path is correct)
-    
-    # URL Fallback
-    # If the URL is our own backend download URL, we could potentially optimize, but requests.get works fine.
-    response = requests.get(file_url)
-    if response.status_code != 200:
-        raise HTTPException(status_code=400, detail=f"Failed to download file from {file_url}")
-    return io.BytesIO(response.content)
-
-@app.post("/api/v1/analyze/binding/init")
-async def analyze_binding_init(request: BindingInitRequest):
-    try:
-        file_obj = await download_file_content(request.file_url, request.storage_path)
-        
-        # Load Data
-        try:
-            df, metadata = load_csv(file_obj)
-        except Exception as e:
-            traceback.print_exc()
-            raise HTTPException(status_code=400, detail="Invalid CSV format")
-
-        # Analyze
-        baseline = analyze_binding(df, metadata)
-        return baseline
-            
-    except HTTPException as he:
-        raise he
-    except Exception as e:
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Error initializing binding analysis: {str(e)}")
-
-@app.post("/api/v1/analyze/binding/corner")
-async def analyze_binding_corner(request: BindingCornerRequest):
-    try:
-        file_obj = await download_file_content(request.file_url, request.storage_path)
-        
-        # Load Data
-        try:
-            df, metadata = load_csv(file_obj)
-        except Exception as e:
-            traceback.print_exc()
-            raise HTTPException(status_code=400, detail="Invalid CSV format")
-
-        # Analyze Corner
-        results = analyze_binding_selection(
-            df, 
-            request.baseline, 
-            request.click_x, 
-            request.click_y, 
-            request.search_radius
-        )
-        return results
-            
-    except HTTPException as he:
-        raise he
-    except Exception as e:
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Error analyzing corner: {str(e)}")
-
-@app.post("/api/v1/analyze/reference")
-async def analyze_reference(request: ReferenceAnalysisRequest):
-    try:
-        file_obj = await download_file_content(request.file_url, request.storage_path)
-        
-        # Load Data
-        try:
-            df, metadata = load_csv(file_obj)
-        except Exception as e:
-            traceback.print_exc()
-            raise HTTPException(status_code=400, detail="Invalid CSV format")
-
-        # Analyze Reference
-        results = analyze_reference_fastest_lap(df, metadata)
-        return results
-            
-    except HTTPException as he:
-        raise he
-    except Exception as e:
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Error analyzing reference: {str(e)}")
-
-@app.post("/api/v1/analyze/binding/ai")
-async def analyze_binding_ai_endpoint(request: BindingAIRequest):
-    try:
-        # 1. Find Matching Reference Corner
-        click_point = np.array([request.click_x, request.click_y])
-        
-        min_dist = float('inf')
-        ref_corner = None
-        
-        for rc in request.reference_corners:
-            rc_point = np.array([rc['apex_x'], rc['apex_y']])
-            dist = np.linalg.norm(click_point - rc_point)
-            if dist < min_dist:
-                min_dist = dist
-                ref_corner = rc
-        
-        # Threshold for valid match (e.g. 50m)
-        if min_dist > 50.0 or ref_corner is None:
-            return {"error": "No matching reference corner found near selection."}
-            
-        # 2. Format Reference Data (Prompt Key Mapping)
-        reference_data = {
-            "Corner_ID": ref_corner['corner_index'],
-            "RPM_slope_ref": ref_corner['rpm_slope'],
-            "Speed_gain_ref": ref_corner['speed_gain'],
-            "Time_to_DeltaV_ref": ref_corner.get('time_to_deltav', 0.0), # Use .get for backward compatibility
-            "RPM_vs_Speed_corr_ref": ref_corner.get('rpm_speed_corr', 0.0),
-            "LatG_decay_ref": ref_corner['lat_g_decay'],
-            "Longitudinal_efficiency_ref": ref_corner['long_efficiency']
-        }
-        
-        # 3. Format Target Data (Prompt Key Mapping)
-        target_data = []
-        for lap in request.target_corner_data:
-            target_data.append({
-                "Lap": lap['lap'],
-                "RPM_slope": lap['rpm_slope'],
-                "Speed_gain": lap['speed_gain'],
-                "Time_to_DeltaV": lap.get('time_to_deltav', 0.0),
-                "RPM_vs_Speed_corr": lap.get('rpm_speed_corr', 0.0),
-                "LatG_decay": lap['lat_g_decay'],
-                "Longitudinal_efficiency": lap['long_efficiency']
-            })
-            
-        # 4. Call AI
-        result = analyze_binding_ai(target_data, reference_data, MISTRAL_API_KEY)
-        return result
-        
-    except Exception as e:
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Error running AI analysis: {str(e)}")
+            print(f"Profile dump failed for {request.url.path}: {e}")
+    return response
 
+@app.get("/metrics")
+def prometheus_metrics():
+    """Request and stage latency histograms and byte counters, in Prometheus text format."""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
 
+@app.get("/")
+def read_root():
+    return {"message": "Karting Analysis API is running"}
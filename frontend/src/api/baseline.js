@@ -0,0 +1,39 @@
+// Compact /analyze/binding/init payload (see backend/app/core/baselines.py)
+export const BASELINE_COMPACT_TYPE = 'application/x-baseline-compact+json';
+
+const inflate = async (b64) => {
+    const bytes = Uint8Array.from(atob(b64), (c) => c.charCodeAt(0));
+    const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('deflate'));
+    return new Uint8Array(await new Response(stream).arrayBuffer());
+};
+
+const decodeArray = async (field) => {
+    if (!field || Array.isArray(field)) return field;
+    const bytes = await inflate(field.data);
+    const out = new Array(field.length);
+    if (field.encoding === 'cm-delta-deflate') {
+        // Little-endian int32 centimetre deltas
+        const view = new DataView(bytes.buffer);
+        let cm = 0;
+        for (let i = 0; i < field.length; i++) {
+            cm += view.getInt32(i * 4, true);
+            out[i] = cm / 100;
+        }
+    } else if (field.encoding === 'bits-deflate') {
+        // np.packbits order: most significant bit first
+        for (let i = 0; i < field.length; i++) {
+            out[i] = ((bytes[i >> 3] >> (7 - (i & 7))) & 1) === 1;
+        }
+    }
+    return out;
+};
+
+export const decodeBaseline = async (data) => {
+    const decoded = { ...data };
+    for (const [key, value] of Object.entries(data)) {
+        if (value && value.encoding) {
+            decoded[key] = await decodeArray(value);
+        }
+    }
+    return decoded;
+};
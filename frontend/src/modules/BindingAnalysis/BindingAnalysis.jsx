@@ -7,6 +7,7 @@ import { db } from '../../firebase';
 import { useAuth } from '../../contexts/AuthContext';
 import { useTeam } from '../../contexts/TeamContext';
 import { API_URL } from '../../api/config';
+import { BASELINE_COMPACT_TYPE, decodeBaseline } from '../../api/baseline';
 import { ScatterChart, Scatter, XAxis, YAxis, Tooltip, ResponsiveContainer, Cell } from 'recharts';
 
 const BindingAnalysis = () => {
@@ -97,8 +98,10 @@ const BindingAnalysis = () => {
             const response = await axios.post(`${API_URL}/api/v1/analyze/binding/init`, {
                 file_url: selectedSession.storageUrl,
                 storage_path: selectedSession.storagePath
+            }, {
+                headers: { Accept: `${BASELINE_COMPACT_TYPE}, application/json;q=0.9` }
             });
-            setBaselineData(response.data);
+            setBaselineData(await decodeBaseline(response.data));
         } catch (error) {
             console.error("Error initializing analysis:", error);
             alert("Failed to analyze session. Check console.");
@@ -140,7 +143,10 @@ const BindingAnalysis = () => {
             const response = await axios.post(`${API_URL}/api/v1/analyze/binding/corner`, {
                 file_url: selectedSession.storageUrl,
                 storage_path: selectedSession.storagePath,
-                baseline: baselineData,
+                // Sessions outside GCS have no server-side baseline: post the arrays back
+                ...(baselineData.baseline_id
+                    ? { baseline_id: baselineData.baseline_id }
+                    : { baseline: baselineData }),
                 click_x: clickX,
                 click_y: clickY,
                 search_radius: 30.0
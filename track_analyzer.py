@@ -104,6 +104,15 @@ class TrackAnalyzer:
         self.df = pd.read_csv(filepath, skiprows=self.header_idx)
         self.df.columns = [c.strip() for c in self.df.columns]
         
+        # Lap row bounds, found once on the sorted Time column
+        self.lap_bounds = np.searchsorted(self.df['Time'].values, self.beacons, side='left')
+        
+    def _lap_data(self, lap_number):
+        """Rows of a 1-based lap (beacon[i-1] <= Time < beacon[i]) as a view, no boolean mask."""
+        start = self.lap_bounds[lap_number-1]
+        end = max(start, self.lap_bounds[lap_number])
+        return self.df.iloc[start:end]
+        
     def build_baseline(self, lap_number=None, width=8.0, corner_threshold=0.03):
         if self.df is None:
             raise ValueError("File not loaded")
@@ -119,10 +128,7 @@ class TrackAnalyzer:
             else:
                 lap_number = np.argmin(durations) + 1
         
-        start_time = self.beacons[lap_number-1]
-        end_time = self.beacons[lap_number]
-        
-        lap_data = self.df[(self.df['Time'] >= start_time) & (self.df['Time'] < end_time)].copy()
+        lap_data = self._lap_data(lap_number)
         
         lat = lap_data['GPS Latitude'].values
         lon = lap_data['GPS Longitude'].values
@@ -223,10 +229,8 @@ class TrackAnalyzer:
         
         for i in range(len(self.beacons) - 1):
             lap_num = i + 1
-            start_t = self.beacons[i]
-            end_t = self.beacons[i+1]
             
-            lap_data = self.df[(self.df['Time'] >= start_t) & (self.df['Time'] < end_t)].copy()
+            lap_data = self._lap_data(lap_num)
             if len(lap_data) < 10:
                 continue
                 